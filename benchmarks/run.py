@@ -0,0 +1,242 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 与 src/main.py 一样以 src 为导入根目录
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(ROOT_DIR))
+
+import numpy as np  # noqa: E402
+from core.annotation import AnnotationFile  # noqa: E402
+from core.checker import AnnotationChecker  # noqa: E402
+from core.dataset import scan_directory  # noqa: E402
+from core.packed_store import PackedLabelStore  # noqa: E402
+from core.rules import issue_counts, summarize_issues  # noqa: E402
+from core.statistics import DatasetStats  # noqa: E402
+from core.profiling import TRACER  # noqa: E402
+from benchmarks.synthetic import generate_dataset  # noqa: E402
+
+
+def git_commit() -> str:
+    """当前提交，用于对比不同提交的结果"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=str(SRC_DIR),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return ""
+
+
+def timed(func, repeat: int) -> dict:
+    """重复执行并记录耗时，返回最后一次的结果和耗时统计"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return dict(summarize(times), result=result)
+
+
+def summarize(times: list) -> dict:
+    return {'min_s': min(times), 'median_s': statistics.median(times), 'runs': times}
+
+
+class Bench:
+    """各阶段基准测试，均通过真实的 core/ui 代码路径执行
+
+    解析、检查和统计逐个文件流式进行，只保留每个文件的问题数和累计耗时，
+    内存占用与数据集的总框数无关。
+    """
+
+    def __init__(self, data_dir: str, repeat: int, work_dir: str):
+        self.data_dir = data_dir
+        self.repeat = repeat
+        self.work_dir = work_dir
+        self.image_files = []
+        self.annotation_files = {}
+        self.counts = []  # 每个文件的问题数
+        self.dataset_stats = None
+        self.checker = AnnotationChecker()
+        self.checker.set_labels(os.path.join(data_dir, "classes.txt"))
+        self.results = {}
+
+    def record(self, stage: str, timing: dict, items: int):
+        entry = {k: v for k, v in timing.items() if k != 'result'}
+        entry['items'] = items
+        entry['per_item_us'] = timing['min_s'] / items * 1e6 if items else 0.0
+        self.results[stage] = entry
+        print(f"{stage:<16} {timing['min_s']:>10.3f}s  {entry['per_item_us']:>10.1f}us/item",
+              file=sys.stderr)
+
+    def scan(self):
+        timing = timed(lambda: scan_directory(self.data_dir), self.repeat)
+        self.image_files, self.annotation_files = timing['result']
+        self.record('scan', timing, len(self.image_files))
+
+    def pipeline(self):
+        """逐个文件解析、检查和统计，分别累计三个阶段的耗时，处理完的标注随即丢弃"""
+        paths = [self.annotation_files[Path(p).stem] for p in self.image_files]
+        runs = {'parse': [], 'check': [], 'stats': []}
+        for _ in range(self.repeat):
+            elapsed = dict.fromkeys(runs, 0.0)
+            stats = DatasetStats()
+            counts = []
+            for path in paths:
+                t0 = time.perf_counter()
+                anno = AnnotationFile(path)
+                t1 = time.perf_counter()
+                issues = self.checker.check_annotation(anno)
+                t2 = time.perf_counter()
+                stats.add(anno)
+                stats.add_issues(issues)
+                t3 = time.perf_counter()
+                elapsed['parse'] += t1 - t0
+                elapsed['check'] += t2 - t1
+                elapsed['stats'] += t3 - t2
+                counts.append(issue_counts(issues))
+            for stage, total in elapsed.items():
+                runs[stage].append(total)
+        self.counts, self.dataset_stats = counts, stats
+        for stage, times in runs.items():
+            self.record(stage, summarize(times), len(paths))
+
+    def check_worker(self):
+        """在当前线程中直接执行 CheckWorker.run(包含读取、检查、统计和信号发送)"""
+        try:
+            from ui.workers import CheckWorker
+        except ImportError:
+            return  # 没有安装 PySide6
+
+        def run():
+            worker = CheckWorker(self.image_files, self.annotation_files, self.checker)
+            worker.run()
+            return worker.stats
+        self.record('check_worker', timed(run, self.repeat), len(self.image_files))
+
+    def packed_store(self):
+        store_path = os.path.join(self.work_dir, "labels.pack")
+        timing = timed(lambda: PackedLabelStore.build(self.annotation_files, store_path),
+                       self.repeat)
+        self.record('store_build', timing, len(self.annotation_files))
+        store = timing['result']
+
+        names = [Path(p).stem for p in self.image_files]
+
+        def run():
+            for name in names:
+                self.checker.check_annotation(store.annotation(name))
+        self.record('store_check', timed(run, self.repeat), len(names))
+        store.close()
+
+    def export(self):
+        csv_path = os.path.join(self.work_dir, "results.csv")
+        json_path = os.path.join(self.work_dir, "stats.json")
+
+        def run():
+            # 与 MainWindow.export_results 相同的 CSV 格式
+            with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(["文件名", "状态", "问题详情"])
+                for image_path, counts in zip(self.image_files, self.counts):
+                    status, details, _ = summarize_issues(counts)
+                    writer.writerow([os.path.basename(image_path), status, details])
+            self.dataset_stats.export(json_path)
+        self.record('export', timed(run, self.repeat), len(self.image_files))
+
+    def preview(self, samples: int):
+        """通过 MainWindow.load_preview 加载图片(需要 PySide6，使用 offscreen 平台)"""
+        try:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PySide6.QtWidgets import QApplication
+            from ui.main_window import MainWindow
+        except ImportError:
+            return
+        app = QApplication.instance() or QApplication(sys.argv)
+        window = MainWindow()
+        window.image_files = list(self.image_files)
+        window.annotation_files = dict(self.annotation_files)
+        window.checker = self.checker
+        sample = self.image_files[:samples]
+
+        def run():
+            for image_path in sample:
+                window.load_preview(image_path)
+        self.record('preview', timed(run, self.repeat), len(sample))
+        window.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 标注检查工具基准测试")
+    parser.add_argument("--data", help="使用已有数据目录，不生成合成数据")
+    parser.add_argument("--files", type=int, default=1000, help="文件数")
+    parser.add_argument("--boxes", type=int, default=20, help="每个文件的标注框数")
+    parser.add_argument("--overlap", type=float, default=0.1, help="重叠框比例")
+    parser.add_argument("--classes", type=int, default=80, help="类别数")
+    parser.add_argument("--image-size", type=int, default=640, help="图片边长")
+    parser.add_argument("--no-images", action="store_true", help="只写入空图片文件，跳过预览测试")
+    parser.add_argument("--preview-samples", type=int, default=50, help="预览测试的图片数")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", action="store_true", help="同时记录各 span 的耗时统计")
+    parser.add_argument("--output", "-o", help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="yolo_bench_")
+    try:
+        params = {'files': args.files, 'boxes': args.boxes, 'overlap': args.overlap,
+                  'classes': args.classes, 'image_size': args.image_size,
+                  'seed': args.seed, 'repeat': args.repeat}
+        if args.data:
+            data_dir = args.data
+            params = {'data': args.data, 'repeat': args.repeat}
+        else:
+            start = time.perf_counter()
+            data_dir = generate_dataset(os.path.join(work_dir, "data"), args.files, args.boxes,
+                                        args.overlap, args.classes, args.image_size,
+                                        write_images=not args.no_images, seed=args.seed)
+            print(f"{'generate':<16} {time.perf_counter() - start:>10.3f}s", file=sys.stderr)
+
+        TRACER.enable(args.trace)
+        bench = Bench(data_dir, args.repeat, work_dir)
+        bench.scan()
+        bench.pipeline()
+        bench.check_worker()
+        bench.packed_store()
+        bench.export()
+        if not args.no_images:
+            bench.preview(args.preview_samples)
+
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'params': params,
+            'results': bench.results,
+        }
+        if args.trace:
+            report['spans'] = TRACER.summary()
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            print(output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,26 @@
 import numpy as np
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from .profiling import traced
+from .geometry import box_corners, Polygons
+
+# 9 个值的行(类别 + 4 个点)既可能是 OBB 也可能是 4 顶点的分割多边形，数值上无法区分，
+# 由数据集设置决定按哪种解析(界面中的设置或命令行参数)
+QUAD_OBB = 'obb'
+QUAD_POLYGON = 'polygon'
+_quad_format = QUAD_OBB
+
+
+def set_quad_format(quad_format: str):
+    """设置 9 个值的行的解析方式；进程池在初始化时调用以使用相同的设置"""
+    global _quad_format
+    if quad_format not in (QUAD_OBB, QUAD_POLYGON):
+        raise ValueError(f"未知的四点标注格式: {quad_format}")
+    _quad_format = quad_format
+
+
+def get_quad_format() -> str:
+    return _quad_format
 
 @dataclass
 class BBox:
@@ -9,7 +29,46 @@ class BBox:
     y: float  # center y
     w: float  # width
     h: float  # height
-    
+    corners: Optional[Tuple[float, ...]] = None  # 旋转框(OBB)的四个角点 x1 y1 ... x4 y4，x/y/w/h 为其外接矩形
+    polygon: Optional[Tuple[float, ...]] = None  # 分割多边形的顶点 x1 y1 x2 y2 ...，x/y/w/h 为其外接矩形
+
+    @classmethod
+    def from_corners(cls, class_id: int, corners) -> 'BBox':
+        """由 OBB 的四个角点构建，x/y/w/h 取外接矩形"""
+        xs, ys = corners[0::2], corners[1::2]
+        x1, x2, y1, y2 = min(xs), max(xs), min(ys), max(ys)
+        return cls(class_id, (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1,
+                   tuple(float(v) for v in corners))
+
+    @classmethod
+    def from_polygon(cls, class_id: int, points) -> 'BBox':
+        """由分割多边形的顶点构建，x/y/w/h 取外接矩形"""
+        box = cls.from_corners(class_id, points)
+        box.polygon, box.corners = box.corners, None
+        return box
+
+    @classmethod
+    def parse(cls, line: str) -> Optional['BBox']:
+        """解析 YOLO 格式的一行，值的个数不符合任何格式时返回 None，数值无效时抛出 ValueError"""
+        values = list(map(float, line.strip().split()))
+        if len(values) == 5:
+            return cls(class_id=int(values[0]), x=values[1], y=values[2], w=values[3], h=values[4])
+        if len(values) == 9 and _quad_format == QUAD_OBB:
+            # YOLO-OBB: class x1 y1 x2 y2 x3 y3 x4 y4
+            return cls.from_corners(int(values[0]), values[1:])
+        if len(values) >= 7 and len(values) % 2 == 1:
+            # YOLO 分割: class x1 y1 x2 y2 ... (至少 3 个顶点)
+            return cls.from_polygon(int(values[0]), values[1:])
+        return None
+
+    def to_line(self) -> str:
+        """YOLO 格式的一行，旋转框输出四个角点，分割标注输出多边形顶点"""
+        if self.polygon is not None:
+            return f"{self.class_id} " + " ".join(f"{v:.6f}" for v in self.polygon)
+        if self.corners is not None:
+            return f"{self.class_id} " + " ".join(f"{v:.6f}" for v in self.corners)
+        return f"{self.class_id} {self.x:.6f} {self.y:.6f} {self.w:.6f} {self.h:.6f}"
+
     def to_xyxy(self) -> Tuple[float, float, float, float]:
         """Convert from center format to corner format"""
         x1 = self.x - self.w/2
@@ -42,25 +101,116 @@ class BBox:
         
         return intersection / union if union > 0 else 0.0
 
+
+def xywh_to_xyxy(xywh: np.ndarray) -> np.ndarray:
+    """将 (N, 4) 的中心格式数组转换为角点格式"""
+    half = xywh[:, 2:4] / 2
+    return np.concatenate([xywh[:, 0:2] - half, xywh[:, 0:2] + half], axis=1)
+
+
+def iou_matrix(xyxy: np.ndarray, other: Optional[np.ndarray] = None) -> np.ndarray:
+    """向量化计算 (N, 4) 角点数组两两之间的 IoU，返回 (N, N) 矩阵；
+    给定 other (M, 4) 时计算两组框之间的 (N, M) 矩阵"""
+    if other is None:
+        other = xyxy
+    x1 = np.maximum(xyxy[:, None, 0], other[None, :, 0])
+    y1 = np.maximum(xyxy[:, None, 1], other[None, :, 1])
+    x2 = np.minimum(xyxy[:, None, 2], other[None, :, 2])
+    y2 = np.minimum(xyxy[:, None, 3], other[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    other_area = (other[:, 2] - other[:, 0]) * (other[:, 3] - other[:, 1])
+    union = area[:, None] + other_area[None, :] - intersection
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = np.where(union > 0, intersection / union, 0.0)
+    return iou
+
+
 class AnnotationFile:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 corners: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 polygons: Optional[Polygons] = None):
         self.file_path = file_path
-        self.boxes: List[BBox] = []
-        self.load_file()
+        self._boxes: Optional[List[BBox]] = None
+        self._arrays = arrays
+        self._corners = corners
+        self._polygons = polygons
+        if arrays is None:
+            self._boxes = []
+            self.load_file()
+
+    @classmethod
+    def from_arrays(cls, file_path: str, class_ids: np.ndarray, xywh: np.ndarray,
+                    corners: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                    polygons: Optional[Polygons] = None) -> 'AnnotationFile':
+        """直接使用列式数组(例如打包标注库中的内存映射视图)构建，不读取文件"""
+        return cls(file_path, (class_ids, xywh), corners, polygons)
+
+    @classmethod
+    def from_boxes(cls, file_path: str, boxes: List[BBox]) -> 'AnnotationFile':
+        """使用已有的 BBox 列表构建(例如修改后尚未写入的标注)，不读取文件"""
+        anno = cls(file_path, arrays=(None, None))
+        anno._boxes = list(boxes)
+        anno._arrays = None
+        return anno
+
+    @property
+    def boxes(self) -> List[BBox]:
+        """BBox 列表，由列式数组构建时按需生成"""
+        if self._boxes is None:
+            class_ids, xywh = self._arrays
+            self._boxes = [BBox(int(c), float(x), float(y), float(w), float(h))
+                           for c, (x, y, w, h) in zip(class_ids.tolist(), xywh.tolist())]
+            if self._corners is not None:
+                points, rotated = self._corners
+                for i in np.flatnonzero(rotated).tolist():
+                    self._boxes[i].corners = tuple(points[i].reshape(-1).tolist())
+            if self._polygons is not None:
+                for i in np.flatnonzero(self._polygons.mask()).tolist():
+                    self._boxes[i].polygon = tuple(self._polygons[i].reshape(-1).tolist())
+        return self._boxes
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回列式数据 (class_ids, xywh)，结果会被缓存"""
+        if self._arrays is None:
+            class_ids = np.fromiter((b.class_id for b in self.boxes),
+                                    dtype=np.int64, count=len(self.boxes))
+            xywh = np.array([(b.x, b.y, b.w, b.h) for b in self.boxes],
+                            dtype=np.float64).reshape(-1, 4)
+            self._arrays = (class_ids, xywh)
+        return self._arrays
+
+    def to_corners(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """含旋转框时返回 ((N, 4, 2) 角点, (N,) 是否旋转)，否则返回 None；结果会被缓存"""
+        if self._corners is None and self._boxes is not None:
+            rotated = np.array([b.corners is not None for b in self._boxes], dtype=bool)
+            if rotated.any():
+                points = box_corners(self.to_arrays()[1])
+                for i in np.flatnonzero(rotated).tolist():
+                    points[i] = np.array(self._boxes[i].corners).reshape(4, 2)
+                self._corners = (points, rotated)
+        return self._corners
+
+    def to_polygons(self) -> Optional[Polygons]:
+        """含分割多边形时返回变长多边形存储，否则返回 None；结果会被缓存"""
+        if self._polygons is None and self._boxes is not None:
+            if any(b.polygon is not None for b in self._boxes):
+                self._polygons = Polygons.from_list([b.polygon for b in self._boxes])
+        return self._polygons
+
+    def has_shapes(self) -> bool:
+        """是否含有旋转框或分割多边形"""
+        return self.to_corners() is not None or self.to_polygons() is not None
     
+    @traced("AnnotationFile.load_file")
     def load_file(self):
         """Load YOLO format annotation file"""
         try:
             with open(self.file_path, 'r') as f:
                 for line in f:
-                    values = list(map(float, line.strip().split()))
-                    if len(values) == 5:
-                        self.boxes.append(BBox(
-                            class_id=int(values[0]),
-                            x=values[1],
-                            y=values[2],
-                            w=values[3],
-                            h=values[4]
-                        ))
+                    box = BBox.parse(line)
+                    if box is not None:
+                        self.boxes.append(box)
         except Exception as e:
             pass  # 静默处理错误
\ No newline at end of file
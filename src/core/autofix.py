@@ -0,0 +1,220 @@
+import difflib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .annotation import AnnotationFile, BBox, get_quad_format, set_quad_format
+from .file_cache import file_signature
+from .rules import RuleContext, OutOfRangeRule
+
+# 批量修复操作
+FIX_DEDUPE = 'dedupe'
+FIX_CLIP = 'clip'
+FIX_DEGENERATE = 'drop_degenerate'
+FIX_NAMES = {
+    FIX_DEDUPE: "删除重复框",
+    FIX_CLIP: "裁剪越界坐标",
+    FIX_DEGENERATE: "删除零面积框",
+}
+# 修复操作可能涉及的检查规则，检查完成后只需处理这些规则有问题的文件
+FIX_RULES = {
+    FIX_DEDUPE: ('duplicates', 'overlaps'),
+    FIX_CLIP: ('out_of_range',),
+    FIX_DEGENERATE: ('zero_area',),
+}
+DEFAULT_DEDUPE_IOU = 0.95
+
+
+class FileFix:
+    """一个标注文件的修复计划：修复前后的内容和各操作的修改数"""
+
+    def __init__(self, path: str, signature: Optional[list], old_lines: List[str],
+                 new_lines: List[str], counts: Dict[str, int], final_newline: bool = False):
+        self.path = path
+        self.signature = signature  # 预览时的文件签名，应用前据此判断文件是否已被修改
+        self.old_lines = old_lines
+        self.new_lines = new_lines
+        self.counts = counts
+        self.final_newline = final_newline  # 原文件以换行结尾时保持不变
+
+    def diff(self) -> List[str]:
+        """不含上下文的统一格式差异"""
+        lines = difflib.unified_diff(self.old_lines, self.new_lines, n=0, lineterm='')
+        return [f"=== {self.path}"] + [line for line in lines
+                                       if not line.startswith(('---', '+++'))]
+
+
+def clip_box(box: BBox) -> BBox:
+    """将框的坐标裁剪到 [0, 1]，多边形逐顶点裁剪"""
+    if box.polygon is not None:
+        return BBox.from_polygon(box.class_id, np.clip(box.polygon, 0, 1).tolist())
+    x1, y1, x2, y2 = np.clip(box.to_xyxy(), 0, 1).tolist()
+    return BBox(box.class_id, (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1)
+
+
+def fix_boxes(boxes: List[BBox], ops: Sequence[str],
+              iou_threshold: float = DEFAULT_DEDUPE_IOU,
+              file_path: str = "") -> Tuple[Dict[int, Optional[BBox]], Dict[str, int]]:
+    """对一个文件的框依次执行裁剪、删除零面积框和去重
+
+    返回 (修改, 各操作的修改数)，修改为 原下标 -> 新框，被删除的框为 None。
+    """
+    current: Dict[int, BBox] = dict(enumerate(boxes))  # 原下标 -> 当前的框
+    changes: Dict[int, Optional[BBox]] = {}
+    counts: Dict[str, int] = {}
+
+    if FIX_CLIP in ops and boxes:
+        # 旋转框裁剪角点会破坏矩形形状，保持不变
+        xyxy = np.array([b.to_xyxy() for b in boxes])
+        eps = OutOfRangeRule.EPS
+        outside = ((xyxy < -eps) | (xyxy > 1 + eps)).any(axis=1)
+        clipped = [i for i in np.flatnonzero(outside).tolist() if boxes[i].corners is None]
+        for i in clipped:
+            current[i] = changes[i] = clip_box(boxes[i])
+        if clipped:
+            counts[FIX_CLIP] = len(clipped)
+
+    if FIX_DEGENERATE in ops:
+        degenerate = [i for i, b in current.items() if not (b.w > 0 and b.h > 0)]
+        for i in degenerate:
+            del current[i]
+            changes[i] = None
+        if degenerate:
+            counts[FIX_DEGENERATE] = len(degenerate)
+
+    if FIX_DEDUPE in ops and len(current) > 1:
+        # 同类别且 IoU 超过阈值的框对保留靠前的一个，IoU 与检查时相同(旋转框和多边形精确计算)
+        index = list(current)
+        ctx = RuleContext(AnnotationFile.from_boxes(file_path, list(current.values())), None)
+        i, j = ctx.pairs
+        hit = (ctx.iou[i, j] > iou_threshold) & (ctx.class_ids[i] == ctx.class_ids[j])
+        keep = np.ones(len(index), dtype=bool)
+        for a, b in zip(i[hit].tolist(), j[hit].tolist()):
+            if keep[a]:
+                keep[b] = False
+        for k in np.flatnonzero(~keep).tolist():
+            changes[index[k]] = None
+        if not keep.all():
+            counts[FIX_DEDUPE] = int((~keep).sum())
+
+    return changes, counts
+
+
+def plan_file(path: str, ops: Sequence[str],
+              iou_threshold: float = DEFAULT_DEDUPE_IOU) -> Optional[FileFix]:
+    """生成单个文件的修复计划，不需要修改时返回 None；未修改的行保持原样"""
+    signature = file_signature(path)
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+        old_lines = text.splitlines()
+    except Exception:
+        return None
+
+    # 记录每个框所在的行，无法解析的行不参与修复
+    box_lines = []
+    boxes = []
+    for n, line in enumerate(old_lines):
+        try:
+            box = BBox.parse(line)
+        except ValueError:
+            box = None
+        if box is not None:
+            box_lines.append(n)
+            boxes.append(box)
+
+    changes, counts = fix_boxes(boxes, ops, iou_threshold, path)
+    if not counts:
+        return None
+    replaced = {box_lines[i]: box for i, box in changes.items()}
+    new_lines = []
+    for n, line in enumerate(old_lines):
+        if n not in replaced:
+            new_lines.append(line)
+        elif replaced[n] is not None:
+            new_lines.append(replaced[n].to_line())
+    return FileFix(path, signature, old_lines, new_lines, counts, text.endswith('\n'))
+
+
+def _plan_chunk(paths: List[str], ops: Sequence[str], iou_threshold: float) -> List[FileFix]:
+    return [fix for fix in (plan_file(path, ops, iou_threshold) for path in paths)
+            if fix is not None]
+
+
+def map_chunks(func: Callable[..., list], paths: List[str], args: tuple = (),
+               max_workers: Optional[int] = None,
+               progress: Optional[Callable[[int, int], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> Optional[list]:
+    """将文件分块后在进程池中执行 func(块, *args)，合并各块返回的列表；被中断时返回 None"""
+    results = []
+    total = len(paths)
+    if progress:
+        progress(0, total)
+    if not paths:
+        return results
+    chunksize = max(1, total // 256)
+    # 子进程使用与界面相同的四点标注解析方式
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=set_quad_format,
+                             initargs=(get_quad_format(),)) as executor:
+        futures = [executor.submit(func, paths[i:i + chunksize], *args)
+                   for i in range(0, total, chunksize)]
+        for k, future in enumerate(futures):
+            if should_stop and should_stop():
+                for pending in futures[k:]:
+                    pending.cancel()
+                return None
+            results.extend(future.result())
+            if progress:
+                progress(min((k + 1) * chunksize, total), total)
+    return results
+
+
+def plan_fixes(paths: List[str], ops: Sequence[str],
+               iou_threshold: float = DEFAULT_DEDUPE_IOU,
+               max_workers: Optional[int] = None,
+               progress: Optional[Callable[[int, int], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> List[FileFix]:
+    """在进程池中为所有文件生成修复计划(试运行，不修改文件)"""
+    fixes = map_chunks(_plan_chunk, paths, (tuple(ops), iou_threshold),
+                       max_workers, progress, should_stop)
+    return fixes or []
+
+
+def write_atomic(path: str, text: str):
+    """先写同目录下的临时文件再替换，写入中断不会留下半个标注文件"""
+    tmp_path = str(Path(path).with_name(Path(path).name + ".tmp"))
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def apply_fixes(fixes: List[FileFix],
+                progress: Optional[Callable[[int, int], None]] = None
+                ) -> Tuple[List[FileFix], List[FileFix]]:
+    """应用修复计划，返回 (已应用, 跳过)；预览后又被修改的文件会被跳过"""
+    applied, skipped = [], []
+    for done, fix in enumerate(fixes, 1):
+        if file_signature(fix.path) != fix.signature:
+            skipped.append(fix)
+        else:
+            try:
+                text = '\n'.join(fix.new_lines)
+                write_atomic(fix.path, text + '\n' if fix.final_newline and text else text)
+                applied.append(fix)
+            except OSError:
+                skipped.append(fix)
+        if progress and (done % 1000 == 0 or done == len(fixes)):
+            progress(done, len(fixes))
+    return applied, skipped
+
+
+def summarize_fixes(fixes: List[FileFix]) -> Dict[str, int]:
+    """各操作的修改总数"""
+    totals: Dict[str, int] = {}
+    for fix in fixes:
+        for op, n in fix.counts.items():
+            totals[op] = totals.get(op, 0) + n
+    return totals
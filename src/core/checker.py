@@ -1,10 +1,33 @@
-from typing import List, Dict, Tuple
+import copy
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
 from .annotation import AnnotationFile, BBox
+from .rules import RULES, RuleContext
+from .profiling import traced
+
+# 类别对重叠阈值配置文件，与 classes.txt 放在同一目录
+PAIR_THRESHOLDS_FILE = "overlap_thresholds.txt"
 
 class AnnotationChecker:
-    def __init__(self, overlap_threshold: float = 0.6):
+    def __init__(self, overlap_threshold: float = 0.6, rules: Optional[List[str]] = None):
         self.overlap_threshold = overlap_threshold
         self.max_class_id = -1  # Will be set when loading labels file
+        self.label_names: List[str] = []
+        self.pair_overrides: Dict[Tuple[int, int], float] = {}  # (a, b) -> 阈值, a <= b
+        self.rules = list(rules) if rules is not None else list(RULES)
+        # 预测对比：预测目录中与标注文件同名的 YOLO 预测文件(每行末尾为置信度)
+        self.prediction_dir: Optional[str] = None
+        self.prediction_conf = 0.5  # 低于该置信度的预测不参与判断
+        self.match_iou = 0.5  # 真值与预测匹配所需的最小 IoU
+        # 图片完整性扫描的结果：图片名(不含扩展名) -> 问题类型
+        self.image_problems: Dict[str, str] = {}
+        # 重复图片查找的结果：图片名 -> (重复组序号, 同组的其他图片路径)
+        self.duplicate_images: Dict[str, Tuple[int, List[str]]] = {}
+        # 时序检查的结果：图片名 -> TemporalIssues，保留到下次时序检查
+        self.temporal_issues: Dict[str, object] = {}
+        self._matrix = None
+        self._matrix_key = None
         
     def set_labels(self, labels_file: str):
         """Load and set labels from file"""
@@ -12,28 +35,102 @@ class AnnotationChecker:
             with open(labels_file, 'r') as f:
                 labels = f.readlines()
                 self.max_class_id = len(labels) - 1
+                self.label_names = [line.strip() for line in labels]
         except Exception:
             pass  # 静默处理错误
+
+        # 同目录下存在类别对阈值配置时一并加载
+        thresholds_file = Path(labels_file).parent / PAIR_THRESHOLDS_FILE
+        if thresholds_file.exists():
+            self.load_pair_thresholds(str(thresholds_file))
+        else:
+            self.pair_overrides.clear()
+            self._matrix = None
+
+    def load_pair_thresholds(self, path: str) -> int:
+        """加载类别对重叠阈值配置
+
+        每行格式为 "类别A 类别B 阈值"，类别可以是名称或序号，# 开头为注释。
+        返回成功加载的条目数。
+        """
+        self.pair_overrides.clear()
+        self._matrix = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    parts = line.split()
+                    if len(parts) != 3:
+                        continue
+                    class_a = self.resolve_class(parts[0])
+                    class_b = self.resolve_class(parts[1])
+                    if class_a is None or class_b is None:
+                        continue
+                    self.set_pair_threshold(class_a, class_b, float(parts[2]))
+        except Exception:
+            pass  # 静默处理错误
+        return len(self.pair_overrides)
+
+    def resolve_class(self, token: str) -> Optional[int]:
+        """将类别名称或序号解析为类别 ID"""
+        if token in self.label_names:
+            return self.label_names.index(token)
+        if token.isdigit():
+            return int(token)
+        return None
+
+    def set_pair_threshold(self, class_a: int, class_b: int, threshold: float):
+        """设置两个类别之间的重叠阈值(对称)"""
+        self.pair_overrides[(min(class_a, class_b), max(class_a, class_b))] = threshold
+        self._matrix = None
+
+    def threshold_matrix(self) -> np.ndarray:
+        """预计算的 (C + 1, C + 1) 阈值矩阵，最后一行/列用于超出范围的类别"""
+        key = (self.overlap_threshold, self.max_class_id)
+        if self._matrix is None or self._matrix_key != key:
+            size = max([self.max_class_id + 1] +
+                       [b + 1 for _, b in self.pair_overrides]) + 1
+            matrix = np.full((size, size), self.overlap_threshold)
+            if self.pair_overrides:
+                pairs = np.array(list(self.pair_overrides), dtype=np.int64)
+                values = np.array(list(self.pair_overrides.values()))
+                matrix[pairs[:, 0], pairs[:, 1]] = values
+                matrix[pairs[:, 1], pairs[:, 0]] = values
+            self._matrix = matrix
+            self._matrix_key = key
+        return self._matrix
+
+    def snapshot(self) -> 'AnnotationChecker':
+        """供后台检查使用的副本，只复制阈值、标签和规则
+
+        扫描结果(图片问题、重复图片、时序问题)的字典只会被整体替换，不会原地修改，副本直接共享。
+        """
+        clone = copy.copy(self)
+        clone.label_names = list(self.label_names)
+        clone.pair_overrides = dict(self.pair_overrides)
+        clone.rules = list(self.rules)
+        return clone
+
+    def pair_thresholds(self, class_a: np.ndarray, class_b: np.ndarray):
+        """返回每个框对的重叠阈值，通过阈值矩阵的下标查找得到"""
+        if not self.pair_overrides:
+            return self.overlap_threshold
+        matrix = self.threshold_matrix()
+        other = len(matrix) - 1
+        index_a = np.where((class_a >= 0) & (class_a < other), class_a, other)
+        index_b = np.where((class_b >= 0) & (class_b < other), class_b, other)
+        return matrix[index_a, index_b]
+
+    def make_context(self, anno: AnnotationFile) -> RuleContext:
+        """构建规则共享的列式数据"""
+        return RuleContext(anno, self)
+
+    @traced("AnnotationChecker.check_context")
+    def check_context(self, ctx: RuleContext) -> Dict[str, List[Tuple]]:
+        """在同一份列式数据上依次执行所有启用的规则"""
+        return {name: RULES[name].check(ctx) for name in self.rules if name in RULES}
             
+    @traced("AnnotationChecker.check_annotation")
     def check_annotation(self, anno: AnnotationFile) -> Dict[str, List[Tuple]]:
         """Check annotation file for issues"""
-        issues = {
-            'overlaps': [],
-            'invalid_labels': []
-        }
-        
-        # Check for invalid class IDs
-        if self.max_class_id >= 0:
-            for i, box in enumerate(anno.boxes):
-                if box.class_id > self.max_class_id:
-                    issues['invalid_labels'].append(
-                        (i, box.class_id, self.max_class_id))
-        
-        # Check for overlapping boxes
-        for i, box1 in enumerate(anno.boxes):
-            for j, box2 in enumerate(anno.boxes[i+1:], i+1):
-                iou = BBox.calculate_iou(box1, box2)
-                if iou > self.overlap_threshold:
-                    issues['overlaps'].append((i, j, iou))
-        
-        return issues 
\ No newline at end of file
+        return self.check_context(self.make_context(anno))
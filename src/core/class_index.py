@@ -0,0 +1,120 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class ClassIndex:
+    """每个文件的类别信息：最大/最小类别 ID、各类别的框数以及框数和面积列
+
+    检查时顺带记录，更换标签文件后无需重新读取标注即可重新计算无效标签，
+    也用于按类别和框属性筛选文件。检查线程和界面线程都会写入，写入和重建倒排索引时持有 lock。
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.max_class = np.full(size, -1, dtype=np.int64)  # 没有框或尚未记录时为 -1
+        self.min_class = np.zeros(size, dtype=np.int64)
+        self.known = np.zeros(size, dtype=bool)  # 已记录的行
+        self.box_count = np.zeros(size, dtype=np.int64)
+        self.min_area = np.full(size, np.nan)  # 没有框时为 NaN，任何比较都不成立
+        self.max_area = np.full(size, np.nan)
+        # 每行出现的类别(升序)及对应框数
+        self.classes: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * size
+        self._inverted = None  # 类别 -> 包含该类别的行(升序)，数据变化后重建
+        self.lock = threading.RLock()
+
+    def update(self, row: int, class_ids: np.ndarray, xywh: Optional[np.ndarray] = None):
+        """记录某行的类别和框属性"""
+        with self.lock:
+            if len(class_ids):
+                unique, counts = np.unique(class_ids, return_counts=True)
+                self.max_class[row] = unique[-1]
+                self.min_class[row] = unique[0]
+            else:
+                unique = np.zeros(0, dtype=np.int64)
+                counts = np.zeros(0, dtype=np.int64)
+                self.max_class[row] = -1
+                self.min_class[row] = 0
+            self.classes[row] = (unique, counts)
+            self.known[row] = True
+            self.box_count[row] = len(class_ids)
+            if xywh is not None and len(xywh):
+                areas = xywh[:, 2] * xywh[:, 3]
+                self.min_area[row] = areas.min()
+                self.max_area[row] = areas.max()
+            else:
+                self.min_area[row] = self.max_area[row] = np.nan
+            self._inverted = None
+
+    def remove(self, row: int):
+        """标注文件被删除"""
+        self.update(row, np.zeros(0, dtype=np.int64))
+
+    def invalid_rows(self, max_class_id: int) -> np.ndarray:
+        """可能含有无效标签的行"""
+        return np.flatnonzero(self.known & ((self.max_class > max_class_id) | (self.min_class < 0)))
+
+    def invalid_counts(self, max_class_id: int) -> np.ndarray:
+        """按新的最大类别 ID 计算每行的无效标签数，与 invalid_labels 规则一致"""
+        result = np.zeros(self.size, dtype=np.int64)
+        if max_class_id < 0:
+            return result  # 没有标签文件时不检查
+        rows = self.invalid_rows(max_class_id)
+        if len(rows) == 0:
+            return result
+        with self.lock:
+            parts = [self.classes[row] for row in rows]
+        lengths = np.array([len(unique) for unique, _ in parts])
+        unique = np.concatenate([unique for unique, _ in parts])
+        counts = np.concatenate([counts for _, counts in parts])
+        owner = np.repeat(rows, lengths)
+        invalid = (unique > max_class_id) | (unique < 0)
+        np.add.at(result, owner[invalid], counts[invalid])
+        return result
+
+    def inverted(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """倒排索引 (类别, 起始位置, 行)：类别 classes[k] 的行为 rows[indptr[k]:indptr[k + 1]]"""
+        with self.lock:
+            if self._inverted is None:
+                self._inverted = self._build_inverted()
+            return self._inverted
+
+    def _build_inverted(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.flatnonzero(self.known)
+        parts = [self.classes[row][0] for row in rows]
+        if parts:
+            lengths = np.array([len(unique) for unique in parts])
+            classes = np.concatenate(parts)
+            owner = np.repeat(rows, lengths)
+        else:
+            classes = owner = np.zeros(0, dtype=np.int64)
+        order = np.argsort(classes, kind='stable')  # 稳定排序，同一类别的行保持升序
+        classes, owner = classes[order], owner[order]
+        unique, starts = np.unique(classes, return_index=True)
+        indptr = np.append(starts, len(classes))
+        return unique, indptr, owner
+
+    def rows_with_class(self, class_id: int) -> np.ndarray:
+        """包含指定类别的行(升序)"""
+        classes, indptr, rows = self.inverted()
+        k = np.searchsorted(classes, class_id)
+        if k >= len(classes) or classes[k] != class_id:
+            return np.zeros(0, dtype=np.int64)
+        return rows[indptr[k]:indptr[k + 1]]
+
+    def class_mask(self, class_ids) -> np.ndarray:
+        """包含任一指定类别的行"""
+        mask = np.zeros(self.size, dtype=bool)
+        for class_id in class_ids:
+            mask[self.rows_with_class(class_id)] = True
+        return mask
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """可用于筛选的列"""
+        return {
+            'boxes': self.box_count,
+            'min_area': self.min_area,
+            'max_area': self.max_area,
+            'max_class': self.max_class,
+            'min_class': self.min_class,
+        }
@@ -0,0 +1,106 @@
+import numpy as np
+from pathlib import Path
+from typing import Optional, Tuple
+from .annotation import xywh_to_xyxy, iou_matrix
+
+
+class Predictions:
+    """一个预测文件中的框：类别、中心格式坐标和置信度"""
+
+    def __init__(self, class_ids: np.ndarray, xywh: np.ndarray, confidence: np.ndarray):
+        self.class_ids = class_ids
+        self.xywh = xywh
+        self.confidence = confidence
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    @classmethod
+    def empty(cls) -> 'Predictions':
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, 4)), np.zeros(0))
+
+    @classmethod
+    def load(cls, file_path: str) -> 'Predictions':
+        """读取 YOLO 预测文件，每行为 "类别 x y w h 置信度"，没有置信度时视为 1"""
+        rows = []
+        try:
+            with open(file_path, 'r') as f:
+                for line in f:
+                    values = line.split()
+                    if len(values) == 5:
+                        values.append('1')
+                    if len(values) == 6:
+                        rows.append(list(map(float, values)))
+        except Exception:
+            pass  # 静默处理错误，与标注文件一致
+        if not rows:
+            return cls.empty()
+        data = np.array(rows)
+        return cls(data[:, 0].astype(np.int64), data[:, 1:5], data[:, 5])
+
+
+class Matching:
+    """真值框与预测框的一一匹配结果"""
+
+    def __init__(self, gt_index: np.ndarray, pred_index: np.ndarray, iou: np.ndarray,
+                 pred_matched: np.ndarray):
+        self.gt_index = gt_index
+        self.pred_index = pred_index
+        self.iou = iou
+        self.pred_matched = pred_matched  # 每个预测框是否匹配到真值
+
+
+def match_boxes(gt_xywh: np.ndarray, pred_xywh: np.ndarray, confidence: np.ndarray,
+                iou_threshold: float = 0.5) -> Matching:
+    """按置信度从高到低的贪心匹配(与 COCO 评估相同)，不区分类别
+
+    IoU 矩阵一次性向量化计算，每个预测框只需在其所在行上取一次最大值。
+    """
+    num_pred = len(pred_xywh)
+    if len(gt_xywh) == 0 or num_pred == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return Matching(empty, empty, np.zeros(0), np.zeros(num_pred, dtype=bool))
+
+    iou = iou_matrix(xywh_to_xyxy(pred_xywh), xywh_to_xyxy(gt_xywh))  # (预测, 真值)
+    iou[iou < iou_threshold] = -1
+    gt_free = np.ones(len(gt_xywh), dtype=bool)
+    pred_matched = np.zeros(num_pred, dtype=bool)
+    gt_index, pred_index, values = [], [], []
+    # 只有至少与一个真值框足够重叠的预测框需要参与匹配
+    order = np.argsort(-confidence, kind='stable')
+    order = order[(iou[order] >= 0).any(axis=1)]
+    for p in order.tolist():
+        row = np.where(gt_free, iou[p], -1)
+        g = int(row.argmax())
+        if row[g] < 0:
+            continue
+        gt_free[g] = False
+        pred_matched[p] = True
+        gt_index.append(g)
+        pred_index.append(p)
+        values.append(float(row[g]))
+    return Matching(np.array(gt_index, dtype=np.int64), np.array(pred_index, dtype=np.int64),
+                    np.array(values), pred_matched)
+
+
+def prediction_path(prediction_dir: str, annotation_path: str) -> str:
+    """标注文件对应的预测文件(同名，位于预测目录中)"""
+    return str(Path(prediction_dir) / Path(annotation_path).name)
+
+
+def load_prediction(prediction_dir: Optional[str], annotation_path: str) -> Optional[Predictions]:
+    """读取标注文件对应的预测，没有设置预测目录时返回 None，预测文件不存在时视为没有预测框"""
+    if not prediction_dir or not annotation_path:
+        return None
+    path = prediction_path(prediction_dir, annotation_path)
+    if not Path(path).exists():
+        return Predictions.empty()
+    return Predictions.load(path)
+
+
+def compare(class_ids: np.ndarray, xywh: np.ndarray, predictions: Predictions,
+            iou_threshold: float = 0.5) -> Tuple[Matching, np.ndarray]:
+    """匹配真值与预测，返回 (匹配结果, 匹配对中类别是否不同)"""
+    matching = match_boxes(xywh, predictions.xywh, predictions.confidence, iou_threshold)
+    wrong = class_ids[matching.gt_index] != predictions.class_ids[matching.pred_index]
+    return matching, wrong
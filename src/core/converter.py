@@ -0,0 +1,590 @@
+import argparse
+import codecs
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .annotation import (AnnotationFile, BBox, QUAD_OBB, QUAD_POLYGON, get_quad_format,
+                         set_quad_format)
+from .dataset import IMAGE_EXTENSIONS, scan_directory, image_size
+from .file_cache import cache_path_for
+
+COCO_CATEGORY_OFFSET = 1  # COCO 类别 ID 从 1 开始，YOLO 类别 0 对应 COCO 类别 1
+CHUNK_SIZE = 256  # 每个进程任务处理的文件数
+FLUSH_LINES = 100000  # 导入 COCO 时缓冲的标注行数上限
+READ_SIZE = 1 << 20
+MAX_ELEMENT_SIZE = 64 << 20  # 单个 JSON 元素的缓冲上限，超过视为文件损坏
+
+Progress = Optional[Callable[[int, int], None]]
+StopFlag = Optional[Callable[[], bool]]
+
+
+def _ordered_chunks(func: Callable[..., list], items: list, args: tuple = (),
+                    max_workers: Optional[int] = None, progress: Progress = None,
+                    should_stop: StopFlag = None) -> Iterator[list]:
+    """分块在进程池中执行 func(块, *args)，按顺序产出各块结果；在途的块数有上限，内存与数据量无关"""
+    total = len(items)
+    if progress:
+        progress(0, total)
+    window = 2 * (max_workers or os.cpu_count() or 4)
+    starts = iter(range(0, total, CHUNK_SIZE))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=set_quad_format,
+                             initargs=(get_quad_format(),)) as executor:
+        pending = deque(executor.submit(func, items[i:i + CHUNK_SIZE], *args)
+                        for i in islice(starts, window))
+        done = 0
+        while pending:
+            if should_stop and should_stop():
+                for future in pending:
+                    future.cancel()
+                return
+            result = pending.popleft().result()
+            for i in islice(starts, 1):
+                pending.append(executor.submit(func, items[i:i + CHUNK_SIZE], *args))
+            done = min(done + CHUNK_SIZE, total)
+            if progress:
+                progress(done, total)
+            yield result
+
+
+class JsonStream:
+    """增量 JSON 解析：按块读取文件，只缓冲当前正在解析的元素"""
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, f, progress: Progress = None):
+        self.f = f  # 以二进制方式打开的文件
+        self.progress = progress  # 按已读取的字节数报告进度
+        self.total = os.fstat(f.fileno()).st_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def fill(self) -> bool:
+        """读入下一块并丢弃已解析的部分，文件结束时返回 False"""
+        if self.eof:
+            return False
+        data = self.f.read(READ_SIZE)
+        self.bytes_read += len(data)
+        self.eof = not data
+        if self.progress:
+            self.progress(self.bytes_read, self.total)
+        self.buf = self.buf[self.pos:] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符"""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("JSON 文件意外结束")
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if c not in chars:
+            raise ValueError(f"JSON 格式错误: 期望 {chars!r}，实际为 {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """解析一个完整的值(对象、数组中的元素或键名)"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.json.raw_decode(self.buf, self.pos)
+                # 值恰好在缓冲末尾时可能不完整(例如被截断的数字)，需要读入更多再确认
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"JSON 格式错误: {e}") from None
+            if len(self.buf) - self.pos > MAX_ELEMENT_SIZE:
+                raise ValueError("JSON 元素过大或格式错误")
+            self.fill()
+
+    def array(self) -> Iterator:
+        """逐个产出数组元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+    def members(self) -> Iterator[str]:
+        """逐个产出顶层对象的键名，调用方须用 array()/value()/skip() 读取其值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def skip(self):
+        """跳过一个值，大数组逐个元素跳过"""
+        if self.peek() == '[':
+            for _ in self.array():
+                pass
+        else:
+            self.value()
+
+
+def polygon_area(points) -> float:
+    """多边形面积(鞋带公式)，points 为 x1 y1 x2 y2 ..."""
+    xs, ys = points[0::2], points[1::2]
+    n = len(xs)
+    return abs(sum(xs[i] * ys[(i + 1) % n] - xs[(i + 1) % n] * ys[i] for i in range(n))) / 2
+
+
+def coco_annotation(box: BBox, width: int, height: int) -> dict:
+    """YOLO 框转换为 COCO 标注(像素坐标，左上角 + 宽高)；多边形和旋转框同时输出 segmentation"""
+    x1, y1, _, _ = box.to_xyxy()
+    bbox = [round(x1 * width, 2), round(y1 * height, 2),
+            round(box.w * width, 2), round(box.h * height, 2)]
+    ann = {'category_id': box.class_id + COCO_CATEGORY_OFFSET, 'bbox': bbox,
+           'area': round(bbox[2] * bbox[3], 2), 'iscrowd': 0}
+    points = box.polygon if box.polygon is not None else box.corners
+    if points is not None:
+        pixels = [round(v * (width if k % 2 == 0 else height), 2) for k, v in enumerate(points)]
+        ann['segmentation'] = [pixels]
+        ann['area'] = round(polygon_area(pixels), 2)
+    return ann
+
+
+def _export_chunk(items: List[Tuple[str, Optional[str]]]) -> List[tuple]:
+    """读取一块图片的尺寸(只读文件头)和标注，返回 (图片路径, 尺寸, COCO 标注列表)"""
+    results = []
+    for image_path, label_path in items:
+        size = image_size(image_path)
+        anns = []
+        if size is not None and label_path:
+            anns = [coco_annotation(box, *size) for box in AnnotationFile(label_path).boxes]
+        results.append((image_path, size, anns))
+    return results
+
+
+def export_coco(image_files: List[str], annotation_files: Dict[str, str], output: str,
+                label_names: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                progress: Progress = None, should_stop: StopFlag = None
+                ) -> Optional[Tuple[int, int, int]]:
+    """将 YOLO 数据集流式导出为 COCO JSON，返回 (图片数, 标注数, 无法读取尺寸而跳过的图片数)
+
+    images 直接写入输出文件，annotations 先写入同目录的临时文件，最后拼接，
+    内存中只保留在途的若干块结果。被中断时删除未完成的输出并返回 None。
+    """
+    items = [(path, annotation_files.get(Path(path).stem)) for path in image_files]
+    tmp_path = output + ".tmp"
+    ann_path = output + ".annotations.tmp"
+    images = annotations = skipped = 0
+    max_class = len(label_names or []) - 1
+    completed = False
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as out, \
+                open(ann_path, 'w+', encoding='utf-8') as ann_out:
+            out.write('{"images": [')
+            for results in _ordered_chunks(_export_chunk, items, (), max_workers,
+                                           progress, should_stop):
+                for image_path, size, anns in results:
+                    if size is None:
+                        skipped += 1
+                        continue
+                    images += 1
+                    image = {'id': images, 'file_name': Path(image_path).name,
+                             'width': size[0], 'height': size[1]}
+                    out.write((',\n' if images > 1 else '\n') + json.dumps(image, ensure_ascii=False))
+                    for ann in anns:
+                        annotations += 1
+                        ann['id'] = annotations
+                        ann['image_id'] = images
+                        max_class = max(max_class, ann['category_id'] - COCO_CATEGORY_OFFSET)
+                        ann_out.write((',\n' if annotations > 1 else '\n') + json.dumps(ann))
+            if should_stop and should_stop():
+                return None
+
+            out.write('\n], "annotations": [')
+            ann_out.seek(0)
+            while True:
+                block = ann_out.read(READ_SIZE)
+                if not block:
+                    break
+                out.write(block)
+            names = list(label_names or [])
+            names += [str(i) for i in range(len(names), max_class + 1)]
+            categories = [{'id': i + COCO_CATEGORY_OFFSET, 'name': name}
+                          for i, name in enumerate(names)]
+            out.write('\n], "categories": ' + json.dumps(categories, ensure_ascii=False) + '}\n')
+        os.replace(tmp_path, output)
+        completed = True
+    finally:
+        for path in (ann_path,) if completed else (ann_path, tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return images, annotations, skipped
+
+
+def _write_labels(batch: Dict[str, List[str]], output_dir: str, append: Dict[str, bool]):
+    """写入一批标注行，append 指明文件是否已在本次导入中创建过"""
+    for stem, lines in batch.items():
+        with open(os.path.join(output_dir, stem + '.txt'), 'a' if append[stem] else 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+class LabelWriter:
+    """按文件缓冲 YOLO 标注行，攒够一批后分组由多个线程并行写入，同一文件只会出现在一个分组中"""
+
+    def __init__(self, output_dir: str, max_workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.workers = max_workers or min(8, os.cpu_count() or 4)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.batch: Dict[str, List[str]] = {}
+        self.pending = 0
+        self.written: set = set()  # 本次导入中已创建的文件，之后追加写入
+
+    def add(self, stem: str, line: str):
+        self.batch.setdefault(stem, []).append(line)
+        self.pending += 1
+        if self.pending >= FLUSH_LINES:
+            self.flush()
+
+    def flush(self):
+        append = {stem: stem in self.written for stem in self.batch}
+        self.written.update(self.batch)
+        stems = list(self.batch)
+        size = max(1, -(-len(stems) // self.workers))
+        groups = [{stem: self.batch[stem] for stem in stems[i:i + size]}
+                  for i in range(0, len(stems), size)]
+        for future in [self.executor.submit(_write_labels, group, self.output_dir, append)
+                       for group in groups]:
+            future.result()
+        self.batch, self.pending = {}, 0
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+
+
+def existing_labels(output_dir: str) -> List[str]:
+    """输出目录中已有的 .txt 文件，导入时其中的同名文件会被替换"""
+    try:
+        return sorted(entry.name for entry in os.scandir(output_dir)
+                      if entry.is_file() and entry.name.lower().endswith('.txt'))
+    except FileNotFoundError:
+        return []
+
+
+def staged_import(convert: Callable[[str], Optional[tuple]], output_dir: str
+                  ) -> Optional[Tuple[tuple, Optional[str]]]:
+    """先转换到输出目录下的临时目录，完成后再移入输出目录，返回 (转换结果, 备份目录)
+
+    被替换的同名文件(包括 classes.txt)移到 .yolo_checker 下的备份目录，没有被替换的文件时备份目录为 None。
+    转换被中断(convert 返回 None)或出错时删除临时目录，输出目录保持原样，被中断时返回 None。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.import-', dir=output_dir)
+    try:
+        result = convert(staging)
+        if result is None:
+            return None
+        backup_dir = None
+        for entry in os.scandir(staging):
+            target = os.path.join(output_dir, entry.name)
+            if os.path.exists(target):
+                if backup_dir is None:
+                    backup_dir = cache_path_for(output_dir,
+                                                time.strftime("import_backup_%Y%m%d_%H%M%S"))
+                    os.makedirs(backup_dir, exist_ok=True)
+                os.replace(target, os.path.join(backup_dir, entry.name))
+            os.replace(entry.path, target)
+        return result, backup_dir
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def coco_images(images: Iterator[dict]) -> Tuple[Dict, List[str]]:
+    """图片表 {id: (文件名主干, 宽, 高)} 和文件名冲突的图片
+
+    不同子目录中主干相同的图片会写入同一个标注文件，只保留第一张，其余作为冲突报告，其标注被跳过。
+    """
+    table = {}
+    owners: Dict[str, str] = {}  # 文件名主干 -> 首次出现的 file_name
+    collisions = []
+    for image in images:
+        stem = Path(image['file_name']).stem
+        if owners.setdefault(stem, image['file_name']) != image['file_name']:
+            collisions.append(image['file_name'])
+            continue
+        table[image['id']] = (stem, image['width'], image['height'])
+    return table, collisions
+
+
+def coco_row(ann: dict) -> list:
+    """标注中转换所需的字段 [image_id, category_id, iscrowd, bbox]"""
+    return [ann.get('image_id'), ann.get('category_id'), ann.get('iscrowd', 0), ann.get('bbox')]
+
+
+def import_coco(json_path: str, output_dir: str, max_workers: Optional[int] = None,
+                progress: Progress = None, should_stop: StopFlag = None
+                ) -> Optional[Tuple[int, int, int, List[str], List[str]]]:
+    """将 COCO JSON 流式转换为 YOLO 标注文件，返回 (文件数, 标注数, 跳过的标注数, 类别名, 文件名冲突的图片)
+
+    只读取一遍文件，内存中只保留图片表和一批待写入的标注行。categories 通常位于 annotations 之后，
+    此时先将标注的必要字段逐行暂存到输出目录下的临时文件，读完后再转换。
+    没有标注的图片生成空文件，类别按 COCO ID 排序后写入 classes.txt；群体标注(iscrowd)被跳过。
+    直接写入 output_dir，其中的同名文件会被覆盖，需要保护已有标注时通过 staged_import 调用。
+    被中断时返回 None。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    categories = images = None
+    collisions: List[str] = []
+    spool = None
+    writer = LabelWriter(output_dir, max_workers)
+    annotations = skipped = 0
+
+    def convert(rows: Iterator[list]) -> bool:
+        nonlocal annotations, skipped
+        for k, (image_id, category_id, iscrowd, bbox) in enumerate(rows):
+            image = images.get(image_id)
+            if (image is None or iscrowd or category_id not in class_map
+                    or not bbox or len(bbox) != 4 or bbox[2] <= 0 or bbox[3] <= 0):
+                skipped += 1
+                continue
+            stem, width, height = image
+            x, y, w, h = bbox
+            writer.add(stem, BBox(class_map[category_id], (x + w / 2) / width, (y + h / 2) / height,
+                                  w / width, h / height).to_line())
+            annotations += 1
+            if k % 10000 == 0 and should_stop and should_stop():
+                return False
+        return True
+
+    try:
+        with open(json_path, 'rb') as f:
+            stream = JsonStream(f, progress)
+            for key in stream.members():
+                if key == 'categories':
+                    categories = sorted(stream.array(), key=lambda c: c['id'])
+                    class_map = {c['id']: i for i, c in enumerate(categories)}
+                elif key == 'images':
+                    images, collisions = coco_images(stream.array())
+                elif key == 'annotations' and categories is not None and images is not None:
+                    if not convert(coco_row(ann) for ann in stream.array()):
+                        return None
+                elif key == 'annotations':
+                    spool = tempfile.TemporaryFile('w+', dir=output_dir)
+                    for ann in stream.array():
+                        spool.write(json.dumps(coco_row(ann)) + '\n')
+                else:
+                    stream.skip()
+        categories = categories or []
+        class_map = {c['id']: i for i, c in enumerate(categories)}
+        images = images or {}
+        if spool is not None:
+            spool.seek(0)
+            if not convert(json.loads(line) for line in spool):
+                return None
+    finally:
+        writer.close()
+        if spool is not None:
+            spool.close()
+
+    for stem, _, _ in images.values():
+        if stem not in writer.written:
+            open(os.path.join(output_dir, stem + '.txt'), 'w').close()
+    names = [str(c.get('name', c['id'])) for c in categories]
+    with open(os.path.join(output_dir, 'classes.txt'), 'w', encoding='utf-8') as f:
+        f.write(''.join(name + '\n' for name in names))
+    return len(images), annotations, skipped, names, collisions
+
+
+def _find_image(stem: str, directories: List[str]) -> Optional[str]:
+    for directory in directories:
+        for ext in IMAGE_EXTENSIONS:
+            path = os.path.join(directory, stem + ext)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def read_voc(xml_path: str) -> Tuple[Optional[Tuple[int, int]], List[tuple]]:
+    """用 iterparse 读取 VOC 标注，返回 (图片尺寸, [(类别名, xmin, ymin, xmax, ymax)])"""
+    size = None
+    objects = []
+    for _, elem in ET.iterparse(xml_path, events=('end',)):
+        if elem.tag == 'size':
+            width, height = (int(float(elem.findtext(k) or 0)) for k in ('width', 'height'))
+            size = (width, height) if width > 0 and height > 0 else None
+        elif elem.tag == 'object':
+            box = elem.find('bndbox')
+            if box is not None:
+                coords = tuple(float(box.findtext(k) or 'nan')
+                               for k in ('xmin', 'ymin', 'xmax', 'ymax'))
+                objects.append(((elem.findtext('name') or '').strip(),) + coords)
+            elem.clear()
+    return size, objects
+
+
+def _voc_names_chunk(paths: List[str]) -> List[str]:
+    names = set()
+    for path in paths:
+        try:
+            names.update(obj[0] for obj in read_voc(path)[1])
+        except (ET.ParseError, ValueError, OSError):
+            pass
+    return sorted(names)
+
+
+def _voc_convert_chunk(paths: List[str], names: List[str], output_dir: str,
+                       image_dirs: List[str]) -> List[int]:
+    """转换一块 VOC 文件，返回 [文件数, 标注数, 跳过的标注数, 失败的文件数]"""
+    index = {name: i for i, name in enumerate(names)}
+    counts = [0, 0, 0, 0]
+    for path in paths:
+        stem = Path(path).stem
+        try:
+            size, objects = read_voc(path)
+        except (ET.ParseError, ValueError, OSError):
+            counts[3] += 1
+            continue
+        if size is None:
+            # VOC 文件缺少尺寸时从图片文件头读取
+            image = _find_image(stem, image_dirs)
+            size = image_size(image) if image else None
+            if size is None:
+                counts[3] += 1
+                continue
+        width, height = size
+        lines = []
+        for name, xmin, ymin, xmax, ymax in objects:
+            if name not in index or not (xmax > xmin and ymax > ymin):
+                counts[2] += 1
+                continue
+            # VOC 像素坐标从 1 开始
+            box = BBox(index[name], ((xmin + xmax) / 2 - 1) / width, ((ymin + ymax) / 2 - 1) / height,
+                       (xmax - xmin) / width, (ymax - ymin) / height)
+            lines.append(box.to_line())
+        with open(os.path.join(output_dir, stem + '.txt'), 'w') as f:
+            f.write(''.join(line + '\n' for line in lines))
+        counts[0] += 1
+        counts[1] += len(lines)
+    return counts
+
+
+def import_voc(xml_dir: str, output_dir: str, label_names: Optional[List[str]] = None,
+               image_dir: Optional[str] = None, max_workers: Optional[int] = None,
+               progress: Progress = None, should_stop: StopFlag = None
+               ) -> Optional[Tuple[int, int, int, int, List[str]]]:
+    """在进程池中将 VOC XML 目录转换为 YOLO 标注，返回 (文件数, 标注数, 跳过的标注数, 失败的文件数, 类别名)
+
+    未给出类别列表时先扫描一遍收集所有类别名(按名称排序)；给出时不在列表中的类别被跳过。
+    直接写入 output_dir，需要保护已有标注时通过 staged_import 调用。被中断时返回 None。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = sorted(str(p) for p in Path(xml_dir).iterdir() if p.suffix.lower() == '.xml')
+    names = list(label_names or [])
+    if not names:
+        found = set()
+        for chunk in _ordered_chunks(_voc_names_chunk, paths, (), max_workers, None, should_stop):
+            found.update(chunk)
+        names = sorted(found)
+        with open(os.path.join(output_dir, 'classes.txt'), 'w', encoding='utf-8') as f:
+            f.write(''.join(name + '\n' for name in names))
+
+    image_dirs = [d for d in (image_dir, xml_dir, str(Path(xml_dir).parent / 'JPEGImages')) if d]
+    totals = [0, 0, 0, 0]
+    for counts in _ordered_chunks(_voc_convert_chunk, paths, (names, output_dir, image_dirs),
+                                  max_workers, progress, should_stop):
+        totals = [a + b for a, b in zip(totals, counts)]
+    if should_stop and should_stop():
+        return None
+    return (*totals, names)
+
+
+def read_label_names(path: Optional[str]) -> Optional[List[str]]:
+    if not path:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 与 COCO/VOC 格式转换")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    export = sub.add_parser("export-coco", help="将 YOLO 数据目录导出为 COCO JSON")
+    export.add_argument("directory", help="数据目录")
+    export.add_argument("output", help="输出的 JSON 文件")
+    export.add_argument("--quad-format", choices=(QUAD_OBB, QUAD_POLYGON), default=QUAD_OBB,
+                        help="9 个值的行按 OBB 还是 4 顶点分割多边形解析")
+    coco = sub.add_parser("import-coco", help="将 COCO JSON 转换为 YOLO 标注")
+    coco.add_argument("json", help="COCO 标注文件")
+    coco.add_argument("output", help="YOLO 标注输出目录")
+    voc = sub.add_parser("import-voc", help="将 VOC XML 目录转换为 YOLO 标注")
+    voc.add_argument("directory", help="VOC XML 目录")
+    voc.add_argument("output", help="YOLO 标注输出目录")
+    voc.add_argument("--images", help="图片目录，XML 中缺少尺寸时读取图片文件头")
+    for p in (coco, voc):
+        p.add_argument("--overwrite", action="store_true",
+                       help="输出目录中已有 .txt 文件时仍然导入(被替换的文件备份到 .yolo_checker 中)")
+    for p in (export, voc):
+        p.add_argument("--labels", help="类别文件，每行一个类别名")
+    for p in (export, coco, voc):
+        p.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    report = lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+
+    if args.mode == "export-coco":
+        set_quad_format(args.quad_format)
+        image_files, annotation_files = scan_directory(args.directory)
+        images, annotations, skipped = export_coco(
+            image_files, annotation_files, args.output, read_label_names(args.labels),
+            args.workers, report)
+        print(f"\n已导出 {images} 张图片，{annotations} 个标注" +
+              (f"，{skipped} 张图片无法读取尺寸已跳过" if skipped else ""))
+        return
+
+    existing = existing_labels(args.output)
+    if existing and not args.overwrite:
+        parser.error(f"输出目录中已有 {len(existing)} 个 .txt 文件，同名文件会被替换；"
+                     f"确认后加 --overwrite 重新运行，或选择新的输出目录")
+    if args.mode == "import-coco":
+        result, backup_dir = staged_import(
+            lambda staging: import_coco(args.json, staging, args.workers, report), args.output)
+        files, annotations, skipped, names, collisions = result
+        print(f"\n已转换 {files} 个文件，{annotations} 个标注，{len(names)} 个类别" +
+              (f"，跳过 {skipped} 个标注" if skipped else ""))
+        if collisions:
+            print(f"{len(collisions)} 张图片与其他子目录中的图片同名，其标注已跳过，例如: " +
+                  ", ".join(collisions[:5]))
+    else:
+        result, backup_dir = staged_import(
+            lambda staging: import_voc(args.directory, staging, read_label_names(args.labels),
+                                       args.images, args.workers, report), args.output)
+        files, annotations, skipped, failed, names = result
+        print(f"\n已转换 {files} 个文件，{annotations} 个标注，{len(names)} 个类别" +
+              (f"，跳过 {skipped} 个标注" if skipped else "") +
+              (f"，{failed} 个文件无法解析" if failed else ""))
+    if backup_dir:
+        print(f"被替换的文件已备份到: {backup_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import argparse
+import json
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, quote
+from urllib.request import Request, urlopen
+import numpy as np
+from .annotation import AnnotationFile, QUAD_OBB, QUAD_POLYGON, set_quad_format
+from .checker import AnnotationChecker
+from .geometry import Polygons
+from .dataset import scan_directory
+from .rules import issue_counts, summarize_issues
+from .statistics import DatasetStats
+from .watch import PollingWatcher
+from .profiling import traced
+
+DEFAULT_PORT = 8765
+
+
+class DatasetIndex:
+    """常驻内存的数据集索引：列式标注、检查结果和统计信息"""
+
+    def __init__(self, directory: str, overlap_threshold: float = 0.6):
+        self.directory = directory
+        self.checker = AnnotationChecker(overlap_threshold)
+        self.label_names: List[str] = []
+        self.image_files: List[str] = []
+        self.annotation_files: Dict[str, str] = {}
+        self.names: List[str] = []  # 与 image_files 对应的文件名
+        self.rows: Dict[str, int] = {}
+        self.arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.corners: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # 只保存含旋转框的文件
+        self.polygons: Dict[str, Polygons] = {}  # 只保存含分割多边形的文件
+        self.counts: List[Dict[str, int]] = []
+        self.generation = 0  # 每次检查结果变化时递增，客户端可据此判断是否需要刷新
+        self.versions: Dict[str, int] = {}  # 每个文件的数据版本，用于发现检查期间被更新的文件
+        self._check_seq = 0  # 最近一次开始的全量检查，较早开始的检查结果会被丢弃
+        self._stats: Optional[DatasetStats] = None
+        self._lock = threading.RLock()
+
+    @traced("DatasetIndex.load")
+    def load(self):
+        """扫描目录并读取、检查所有标注文件"""
+        with self._lock:
+            labels_file = Path(self.directory) / "classes.txt"
+            if labels_file.exists():
+                self.checker.set_labels(str(labels_file))
+                with open(labels_file, 'r', encoding='utf-8') as f:
+                    self.label_names = [line.strip() for line in f if line.strip()]
+
+            self.image_files, self.annotation_files = scan_directory(self.directory)
+            self.names = [Path(p).stem for p in self.image_files]
+            self.rows = {name: row for row, name in enumerate(self.names)}
+            self.arrays = {}
+            self.corners = {}
+            self.polygons = {}
+            self.versions = {}
+            for name in self.names:
+                self.store(name, AnnotationFile(self.annotation_files[name]))
+            self.check_all()
+
+    def store(self, name: str, anno: AnnotationFile):
+        """保存文件的列式数据"""
+        self.versions[name] = self.versions.get(name, 0) + 1
+        self.arrays[name] = anno.to_arrays()
+        corners = anno.to_corners()
+        if corners is not None:
+            self.corners[name] = corners
+        else:
+            self.corners.pop(name, None)
+        polygons = anno.to_polygons()
+        if polygons is not None:
+            self.polygons[name] = polygons
+        else:
+            self.polygons.pop(name, None)
+
+    def annotation(self, name: str, arrays=None, corners=None, polygons=None) -> AnnotationFile:
+        """以内存中的数组(或其快照)构建 AnnotationFile"""
+        if arrays is None:
+            arrays, corners, polygons = self.arrays, self.corners, self.polygons
+        class_ids, xywh = arrays[name]
+        return AnnotationFile.from_arrays(self.annotation_files[name], class_ids, xywh,
+                                          corners.get(name), polygons.get(name))
+
+    def check_all(self, overlap_threshold: Optional[float] = None):
+        """使用内存中的数据重新检查所有文件，不读取磁盘
+
+        在数据快照和检查器副本上检查，不持有锁，期间其他请求和文件更新照常处理；
+        完成后在锁内替换结果，检查期间被更新的文件用当前数据重新检查。
+        """
+        with self._lock:
+            if overlap_threshold is not None:
+                self.checker.overlap_threshold = overlap_threshold
+            checker = self.checker.snapshot()
+            self._check_seq += 1
+            seq = self._check_seq
+            names = self.names
+            versions = dict(self.versions)
+            arrays, corners, polygons = dict(self.arrays), dict(self.corners), dict(self.polygons)
+
+        counts = [issue_counts(checker.check_annotation(self.annotation(name, arrays, corners,
+                                                                        polygons)))
+                  for name in names]
+
+        with self._lock:
+            if seq != self._check_seq or names is not self.names:
+                return  # 已有更新的检查或重新加载了目录
+            for row, name in enumerate(names):
+                if self.versions.get(name) != versions.get(name):
+                    counts[row] = issue_counts(self.checker.check_annotation(self.annotation(name)))
+            self.counts = counts
+            self._stats = None
+            self.generation += 1
+
+    def update_files(self, changed, removed=()):
+        """重新读取并检查指定的文件(由监视器或客户端触发)"""
+        with self._lock:
+            updated = False
+            for name in changed:
+                if name not in self.rows:
+                    continue
+                anno = AnnotationFile(self.annotation_files[name])
+                self.store(name, anno)
+                self.counts[self.rows[name]] = issue_counts(self.checker.check_annotation(anno))
+                updated = True
+            for name in removed:
+                if name in self.rows:
+                    self.versions[name] = self.versions.get(name, 0) + 1
+                    self.arrays[name] = (np.zeros(0, np.int64), np.zeros((0, 4)))
+                    self.corners.pop(name, None)
+                    self.polygons.pop(name, None)
+                    self.counts[self.rows[name]] = {}
+                    updated = True
+            if updated:
+                self._stats = None
+                self.generation += 1
+
+    def stats(self) -> DatasetStats:
+        """数据集统计，数据变化后首次请求时重新计算"""
+        with self._lock:
+            if self._stats is None:
+                stats = DatasetStats()
+                for name, counts in zip(self.names, self.counts):
+                    stats.add(self.annotation(name))
+                    for key, n in counts.items():
+                        stats.issue_totals[key] = stats.issue_totals.get(key, 0) + n
+                self._stats = stats
+            return self._stats
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'num_files': len(self.names),
+                'num_boxes': int(sum(len(a[0]) for a in self.arrays.values())),
+                'overlap_threshold': self.checker.overlap_threshold,
+                'generation': self.generation,
+            }
+
+    def files(self) -> dict:
+        """所有文件及检查结果；结果按规则稀疏存储，只包含有问题的行"""
+        with self._lock:
+            issues: Dict[str, Dict[int, int]] = {}
+            for row, counts in enumerate(self.counts):
+                for key, n in counts.items():
+                    issues.setdefault(key, {})[row] = n
+            return {
+                'directory': self.directory,
+                'generation': self.generation,
+                'labels': self.label_names,
+                'image_files': self.image_files,
+                'annotation_files': [self.annotation_files[n] for n in self.names],
+                'issues': issues,
+            }
+
+    def file_detail(self, name: str) -> Optional[dict]:
+        """单个文件的标注框和检查结果"""
+        with self._lock:
+            if name not in self.rows:
+                return None
+            anno = self.annotation(name)
+            issues = self.checker.check_annotation(anno)
+            class_ids, xywh = anno.to_arrays()
+            status, details, color = summarize_issues(issue_counts(issues))
+            return {
+                'name': name,
+                'image': self.image_files[self.rows[name]],
+                'boxes': np.column_stack([class_ids, xywh]).tolist(),
+                'corners': [list(b.corners) if b.corners else None for b in anno.boxes],
+                'polygons': [list(b.polygon) if b.polygon else None for b in anno.boxes],
+                'issues': {k: [list(item) for item in v] for k, v in issues.items()},
+                'status': status,
+                'details': details,
+                'color': color,
+            }
+
+
+def parse_threshold(value) -> Optional[float]:
+    """校验请求中的重叠阈值(0~1 的数值，可省略)，无效时抛出 ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not math.isfinite(value) or not 0 <= value <= 1:
+        raise ValueError("threshold 必须是 0 到 1 之间的数值")
+    return float(value)
+
+
+def parse_names(value) -> List[str]:
+    """校验请求中的文件名列表，无效时抛出 ValueError"""
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError("names 必须是文件名字符串列表")
+    return value
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """本地 HTTP 接口，所有请求和响应均为 JSON"""
+    index: DatasetIndex = None
+
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志
+
+    def send_json(self, data, code: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/status":
+            self.send_json(self.index.status())
+        elif url.path == "/files":
+            self.send_json(self.index.files())
+        elif url.path == "/file":
+            detail = self.index.file_detail(query.get("name", [""])[0])
+            if detail is None:
+                self.send_json({'error': "文件不存在"}, 404)
+            else:
+                self.send_json(detail)
+        elif url.path == "/stats":
+            self.send_json(self.index.stats().to_dict(self.index.label_names))
+        else:
+            self.send_json({'error': "未知接口"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            data = self.read_json()
+        except ValueError:
+            self.send_json({'error': "请求不是有效的 JSON"}, 400)
+            return
+        if not isinstance(data, dict):
+            self.send_json({'error': "请求必须是 JSON 对象"}, 400)
+            return
+        try:
+            if url.path == "/check":
+                threshold = parse_threshold(data.get("threshold"))
+            elif url.path == "/refresh":
+                names = parse_names(data.get("names"))
+        except ValueError as e:
+            self.send_json({'error': str(e)}, 400)
+            return
+        if url.path == "/check":
+            self.index.check_all(threshold)
+            self.send_json(self.index.status())
+        elif url.path == "/refresh":
+            self.index.update_files(names)
+            self.send_json(self.index.status())
+        elif url.path == "/reload":
+            self.index.load()
+            self.send_json(self.index.status())
+        else:
+            self.send_json({'error': "未知接口"}, 404)
+
+
+class DaemonClient:
+    """检查服务的客户端"""
+
+    def __init__(self, base_url: str = f"http://127.0.0.1:{DEFAULT_PORT}", timeout: float = 600):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, path: str, data: Optional[dict] = None):
+        body = None if data is None else json.dumps(data).encode('utf-8')
+        req = Request(self.base_url + path, data=body,
+                      headers={"Content-Type": "application/json"})
+        with urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode('utf-8'))
+
+    def status(self) -> dict:
+        return self.request("/status")
+
+    def files(self) -> dict:
+        return self.request("/files")
+
+    def file_detail(self, name: str) -> dict:
+        return self.request("/file?name=" + quote(name))
+
+    def stats(self) -> dict:
+        return self.request("/stats")
+
+    def check(self, threshold: Optional[float] = None) -> dict:
+        return self.request("/check", {} if threshold is None else {'threshold': threshold})
+
+    def refresh(self, names: List[str]) -> dict:
+        return self.request("/refresh", {'names': list(names)})
+
+
+def serve(directory: str, port: int = DEFAULT_PORT, watch: bool = True,
+          overlap_threshold: float = 0.6, quad_format: str = QUAD_OBB):
+    """加载数据集并启动本地服务(阻塞运行)"""
+    set_quad_format(quad_format)
+    index = DatasetIndex(directory, overlap_threshold)
+    index.load()
+    print(f"已加载 {len(index.names)} 个文件，服务地址 http://127.0.0.1:{port}")
+
+    watcher = None
+    if watch:
+        watcher = PollingWatcher(directory, lambda changed, removed:
+                                 index.update_files(changed, removed))
+        watcher.start()
+
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {'index': index})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if watcher is not None:
+            watcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 标注检查服务")
+    parser.add_argument("directory", help="数据目录")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threshold", type=float, default=0.6, help="重叠阈值")
+    parser.add_argument("--no-watch", action="store_true", help="不监视标注文件变化")
+    parser.add_argument("--quad-format", choices=(QUAD_OBB, QUAD_POLYGON), default=QUAD_OBB,
+                        help="9 个值的行按 OBB 还是 4 顶点分割多边形解析")
+    args = parser.parse_args()
+    serve(os.path.abspath(args.directory), args.port, not args.no_watch, args.threshold,
+          args.quad_format)
+
+
+if __name__ == "__main__":
+    main()
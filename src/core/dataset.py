@@ -0,0 +1,84 @@
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def scan_directory(path: str) -> Tuple[List[str], Dict[str, str]]:
+    """扫描目录，返回排序后的图片列表和 {图片名: 标注文件路径}"""
+    image_files = []
+    annotation_files = {}
+    for file in Path(path).iterdir():
+        if file.suffix.lower() in IMAGE_EXTENSIONS:
+            # 查找对应的标注文件
+            anno_path = file.with_suffix('.txt')
+            if anno_path.exists():
+                image_files.append(str(file))
+                annotation_files[file.stem] = str(anno_path)
+
+    # 表格行号与 image_files 下标保持一致
+    image_files.sort()
+    return image_files, annotation_files
+
+
+def _jpeg_orientation(segment: bytes) -> int:
+    """从 APP1 Exif 段中读取方向标记，没有时返回 1"""
+    if not segment.startswith(b'Exif\0\0') or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    endian = '<' if tiff[:2] == b'II' else '>'
+    offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+    for k in range(count):
+        entry = tiff[offset + 2 + 12 * k: offset + 14 + 12 * k]
+        if len(entry) < 12:
+            break
+        if struct.unpack(endian + 'H', entry[:2])[0] == 0x0112:
+            return struct.unpack(endian + 'H', entry[8:10])[0]
+    return 1
+
+
+def image_size(path: str) -> Optional[Tuple[int, int]]:
+    """只读取文件头获得图片的 (宽, 高)，不解码像素；JPEG 按 Exif 方向交换宽高，与 cv2.imread 一致
+
+    格式不支持或文件损坏时返回 None。
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(26)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head.startswith(b'BM'):
+                header_size = struct.unpack('<I', head[14:18])[0]
+                if header_size == 12:
+                    return struct.unpack('<HH', head[18:22])
+                width, height = struct.unpack('<ii', head[18:26])
+                return abs(width), abs(height)
+            if not head.startswith(b'\xff\xd8'):
+                return None
+
+            # JPEG: 逐个跳过标记段，直到帧头(SOFn)
+            f.seek(2)
+            orientation = 1
+            while True:
+                marker = f.read(2)
+                while len(marker) == 2 and marker[1] == 0xFF:  # 填充字节
+                    marker = marker[1:] + f.read(1)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                code = marker[1]
+                if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                    continue
+                length = struct.unpack('>H', f.read(2))[0]
+                if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return (height, width) if orientation >= 5 else (width, height)
+                if code == 0xE1 and orientation == 1:
+                    orientation = _jpeg_orientation(f.read(length - 2))
+                else:
+                    f.seek(length - 2, 1)
+    except (OSError, struct.error):
+        return None
@@ -0,0 +1,330 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+import uuid
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from .annotation import AnnotationFile, QUAD_OBB, QUAD_POLYGON, set_quad_format
+from .checker import AnnotationChecker
+from .dataset import scan_directory
+from .rules import issue_counts, summarize_issues
+from .statistics import DatasetStats
+
+DEFAULT_PORT = 50000
+DEFAULT_SHARD_SIZE = 2000
+LEASE_TIMEOUT = 60.0       # 超过该时间没有心跳的分片重新分配
+HEARTBEAT_INTERVAL = 5.0
+MAX_ATTEMPTS = 3           # 每个分片最多分配次数
+
+
+class QueueManager(BaseManager):
+    """通过 TCP 共享任务队列和结果队列"""
+    pass
+
+
+class TaskQueue(queue.Queue):
+    """任务队列，记录每个分片被节点领取的时间
+
+    节点在领取后、发送 'started' 之前退出时，协调器据此开始租约计时，分片不会永远处于已分配状态。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.taken: Dict[int, float] = {}
+        self.taken_lock = threading.Lock()
+
+    def get(self, block=True, timeout=None):
+        task = super().get(block, timeout)
+        with self.taken_lock:
+            self.taken[task[0]] = time.monotonic()
+        return task
+
+    def pop_taken(self) -> Dict[int, float]:
+        """取出上次调用以来被领取的分片及领取时间"""
+        with self.taken_lock:
+            taken, self.taken = self.taken, {}
+        return taken
+
+
+def make_checker(config: dict) -> AnnotationChecker:
+    """按协调器下发的配置构建检查器(同时设置本进程的四点标注解析方式)"""
+    set_quad_format(config.get('quad_format', QUAD_OBB))
+    checker = AnnotationChecker(config.get('overlap_threshold', 0.6), config.get('rules'))
+    if config.get('labels_file'):
+        checker.set_labels(config['labels_file'])
+    checker.prediction_dir = config.get('prediction_dir')
+    return checker
+
+
+def check_shard(paths: List[str], checker: AnnotationChecker,
+                heartbeat: Optional[Callable[[], None]] = None
+                ) -> Tuple[List[Dict[str, int]], DatasetStats]:
+    """检查一个分片，返回每个文件的问题数和分片统计"""
+    counts = []
+    stats = DatasetStats()
+    last_beat = time.monotonic()
+    for path in paths:
+        annotation = AnnotationFile(path)
+        context = checker.make_context(annotation)
+        issues = checker.check_context(context)
+        stats.add(annotation, context.iou)
+        stats.add_issues(issues)
+        counts.append(issue_counts(issues))
+        if heartbeat and time.monotonic() - last_beat > HEARTBEAT_INTERVAL:
+            heartbeat()
+            last_beat = time.monotonic()
+    return counts, stats
+
+
+class Coordinator:
+    """协调器：将文件列表切分为分片，分发给各节点并收集结果"""
+
+    def __init__(self, paths: List[str], config: dict, address=("127.0.0.1", DEFAULT_PORT),
+                 authkey: Optional[bytes] = None, shard_size: int = DEFAULT_SHARD_SIZE,
+                 lease_timeout: float = LEASE_TIMEOUT):
+        self.paths = paths
+        self.config = config
+        # 队列服务以 pickle 传输数据，密钥泄露即可在协调器和节点上执行代码，因此没有固定的默认密钥
+        self.authkey = authkey or secrets.token_hex(16).encode()
+        self.lease_timeout = lease_timeout
+        self.shards = [(start, paths[start:start + shard_size])
+                       for start in range(0, len(paths), shard_size)]
+
+        self.task_queue = TaskQueue()
+        self.result_queue = queue.Queue()
+        self.done = threading.Event()
+
+        QueueManager.register('get_task_queue', callable=lambda: self.task_queue)
+        QueueManager.register('get_result_queue', callable=lambda: self.result_queue)
+        QueueManager.register('get_config', callable=lambda: self.config)
+        QueueManager.register('is_done', callable=self.done.is_set)
+        self.manager = QueueManager(address=address, authkey=self.authkey)
+        self.server = self.manager.get_server()
+        self.address = self.server.address
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def run(self, progress: Optional[Callable[[int, int], None]] = None
+            ) -> Tuple[List[Optional[Dict[str, int]]], DatasetStats, List[int]]:
+        """分发任务直到所有分片完成，返回 (每个文件的问题数, 合并后的统计, 失败的分片)
+
+        失败分片中的文件问题数为 None，表示未检查。
+        """
+        self._thread.start()
+
+        attempts = {shard_id: 0 for shard_id in range(len(self.shards))}
+        leases: Dict[int, float] = {}  # shard_id -> 领取或最近一次心跳的时间，只含未完成的分片
+        for shard_id in range(len(self.shards)):
+            self.task_queue.put((shard_id, self.shards[shard_id][1]))
+            attempts[shard_id] = 1
+            leases[shard_id] = float('inf')  # 在队列中等待时不计时，领取后开始计时
+
+        counts: List[Optional[Dict[str, int]]] = [{} for _ in self.paths]
+        stats = DatasetStats()
+        completed = set()
+        failed = []
+        while len(completed) + len(failed) < len(self.shards):
+            try:
+                message = self.result_queue.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+
+            now = time.monotonic()
+            for shard_id, taken_at in self.task_queue.pop_taken().items():
+                if leases.get(shard_id) == float('inf'):
+                    leases[shard_id] = taken_at
+            if message is not None:
+                kind, shard_id = message[0], message[1]
+                if shard_id not in leases:
+                    pass  # 已完成或已判定失败的分片，原节点迟到的消息直接丢弃
+                elif kind in ('started', 'heartbeat'):
+                    leases[shard_id] = now
+                elif kind == 'result':
+                    shard_counts, shard_stats = message[2], message[3]
+                    start = self.shards[shard_id][0]
+                    counts[start:start + len(shard_counts)] = shard_counts
+                    stats.merge(shard_stats)
+                    completed.add(shard_id)
+                    leases.pop(shard_id, None)
+                    if progress:
+                        progress(len(completed), len(self.shards))
+
+            # 节点失联(租约超时)的分片重新放回队列
+            for shard_id, beat in list(leases.items()):
+                if now - beat > self.lease_timeout:
+                    if attempts[shard_id] >= MAX_ATTEMPTS:
+                        failed.append(shard_id)
+                        del leases[shard_id]
+                        continue
+                    attempts[shard_id] += 1
+                    leases[shard_id] = float('inf')
+                    self.task_queue.put((shard_id, self.shards[shard_id][1]))
+
+        for shard_id in failed:
+            start, shard_paths = self.shards[shard_id]
+            counts[start:start + len(shard_paths)] = [None] * len(shard_paths)
+        self.done.set()
+        return counts, stats, failed
+
+    def shutdown(self):
+        """通知节点退出并停止服务"""
+        self.done.set()
+        time.sleep(2.0)  # 给节点一个轮询周期发现任务已结束
+        try:
+            self.server.stop_event.set()
+        except AttributeError:
+            pass
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes,
+               worker_id: Optional[str] = None):
+    """节点：从协调器领取分片并返回检查结果，直到协调器通知结束"""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    QueueManager.register('get_task_queue')
+    QueueManager.register('get_result_queue')
+    QueueManager.register('get_config')
+    QueueManager.register('is_done')
+    manager = QueueManager(address=tuple(address), authkey=authkey)
+    manager.connect()
+    task_queue = manager.get_task_queue()
+    result_queue = manager.get_result_queue()
+    checker = make_checker(manager.get_config()._getvalue())
+
+    while True:
+        try:
+            shard_id, paths = task_queue.get(timeout=1.0)
+        except queue.Empty:
+            if manager.is_done()._getvalue():
+                break
+            continue
+        result_queue.put(('started', shard_id, worker_id))
+        counts, stats = check_shard(
+            paths, checker,
+            heartbeat=lambda: result_queue.put(('heartbeat', shard_id, worker_id)))
+        result_queue.put(('result', shard_id, counts, stats, worker_id))
+
+
+def run_local(paths: List[str], config: dict, num_workers: int = 4,
+              shard_size: int = DEFAULT_SHARD_SIZE,
+              progress: Optional[Callable[[int, int], None]] = None):
+    """在本机启动协调器和若干节点进程(用于测试或单机多进程检查)"""
+    coordinator = Coordinator(paths, config, address=("127.0.0.1", 0),
+                              shard_size=shard_size)
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(coordinator.address, coordinator.authkey))
+               for _ in range(num_workers)]
+    for process in workers:
+        process.start()
+    try:
+        return coordinator.run(progress)
+    finally:
+        coordinator.done.set()
+        for process in workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+
+def dataset_config(directory: str, overlap_threshold: float,
+                   quad_format: str = QUAD_OBB) -> Tuple[List[str], List[str], dict]:
+    """扫描数据目录，返回 (图片列表, 标注文件列表, 检查配置)"""
+    image_files, annotation_files = scan_directory(directory)
+    paths = [annotation_files[Path(p).stem] for p in image_files]
+    config = {'overlap_threshold': overlap_threshold, 'quad_format': quad_format}
+    labels_file = Path(directory) / "classes.txt"
+    if labels_file.exists():
+        config['labels_file'] = str(labels_file)
+    return image_files, paths, config
+
+
+def write_results(path: str, image_files: List[str], counts: List[Optional[Dict[str, int]]]):
+    """以与界面导出相同的 CSV 格式写入结果，问题数为 None 的文件记为检查失败"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(["文件名", "状态", "问题详情"])
+        for image_path, file_counts in zip(image_files, counts):
+            if file_counts is None:
+                writer.writerow([os.path.basename(image_path), "检查失败", "所在分片多次失败，未检查"])
+                continue
+            status, details, _ = summarize_issues(file_counts)
+            writer.writerow([os.path.basename(image_path), status, details])
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式标注检查")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    coord = sub.add_parser("coordinator", help="启动协调器")
+    coord.add_argument("directory", help="数据目录(各节点上路径必须相同，例如共享存储)")
+    coord.add_argument("--bind", default=f"127.0.0.1:{DEFAULT_PORT}",
+                       help="监听地址，供其他机器连接时需显式指定(例如 0.0.0.0:50000)")
+    local = sub.add_parser("local", help="在本机用多个节点进程检查")
+    local.add_argument("directory")
+    local.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    for p in (coord, local):
+        p.add_argument("--threshold", type=float, default=0.6, help="重叠阈值")
+        p.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+        p.add_argument("--output", "-o", default="check_results.csv")
+        p.add_argument("--stats", help="统计结果输出文件(.json/.csv)")
+        p.add_argument("--predictions", help="模型预测目录，与标注对比查找漏标和类别错误")
+        p.add_argument("--quad-format", choices=(QUAD_OBB, QUAD_POLYGON), default=QUAD_OBB,
+                       help="9 个值的行按 OBB 还是 4 顶点分割多边形解析")
+    coord.add_argument("--authkey", help="连接密钥，不指定时随机生成并打印")
+
+    worker = sub.add_parser("worker", help="启动节点")
+    worker.add_argument("address", help="协调器地址 host:port")
+    worker.add_argument("--authkey", required=True, help="协调器启动时使用或打印的密钥")
+    worker.add_argument("--processes", type=int, default=1, help="本节点的进程数")
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        address = parse_address(args.address)
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(address, args.authkey.encode()))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        return
+
+    image_files, paths, config = dataset_config(os.path.abspath(args.directory), args.threshold,
+                                                args.quad_format)
+    if args.predictions:
+        config['prediction_dir'] = os.path.abspath(args.predictions)
+    report = lambda done, total: print(f"\r已完成分片 {done}/{total}", end="", flush=True)
+    if args.mode == "local":
+        counts, stats, failed = run_local(paths, config, args.workers, args.shard_size, report)
+    else:
+        coordinator = Coordinator(paths, config, parse_address(args.bind),
+                                  args.authkey.encode() if args.authkey else None, args.shard_size)
+        print(f"协调器已启动: {coordinator.address}，共 {len(coordinator.shards)} 个分片")
+        if not args.authkey:
+            print(f"连接密钥: {coordinator.authkey.decode()}")
+        counts, stats, failed = coordinator.run(report)
+        coordinator.shutdown()
+    print()
+
+    write_results(args.output, image_files, counts)
+    if args.stats:
+        stats.export(args.stats)
+    print(f"结果已写入: {args.output}")
+    if failed:
+        print(f"{len(failed)} 个分片多次失败，结果不完整，其中的文件记为“检查失败”")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+# 缓存文件统一放在数据目录下的隐藏子目录中
+CACHE_DIR_NAME = ".yolo_checker"
+
+
+def cache_path_for(directory: str, name: str) -> str:
+    """返回数据目录对应的缓存文件路径"""
+    return str(Path(directory) / CACHE_DIR_NAME / name)
+
+
+def file_signature(path: str) -> Optional[list]:
+    """文件签名(修改时间, 大小)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class FileCache:
+    """按文件修改时间和大小校验的 JSON 缓存"""
+
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """加载缓存文件"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception:
+            self.entries = {}  # 缓存损坏或不存在时直接重建
+
+    def get(self, path: str, signature: Optional[list] = None) -> Any:
+        """获取缓存值，文件已变化时返回 None"""
+        entry = self.entries.get(os.path.basename(path))
+        if entry is None:
+            return None
+        if signature is None:
+            signature = file_signature(path)
+        if entry[0] != signature:
+            return None
+        return entry[1]
+
+    def put(self, path: str, value: Any, signature: Optional[list] = None):
+        """写入缓存值"""
+        if signature is None:
+            signature = file_signature(path)
+        self.entries[os.path.basename(path)] = [signature, value]
+        self.dirty = True
+
+    def save(self):
+        """保存缓存文件(先写临时文件再替换)"""
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+        except Exception:
+            pass  # 缓存写入失败不影响使用
@@ -0,0 +1,202 @@
+import cv2
+import numpy as np
+
+MAX_CLIP_VERTICES = 8  # 两个凸四边形的交集最多 8 个顶点
+RASTER_SIZE = 256  # 多边形栅格化 IoU 的网格边长，误差约为 1/RASTER_SIZE
+RASTER_SHIFT = 4  # fillPoly 的亚像素精度位数
+
+
+def box_corners(xywh: np.ndarray) -> np.ndarray:
+    """将 (N, 4) 中心格式数组转换为 (N, 4, 2) 的四个角点(左上、右上、右下、左下)"""
+    x, y, w, h = xywh[:, 0], xywh[:, 1], xywh[:, 2] / 2, xywh[:, 3] / 2
+    return np.stack([
+        np.stack([x - w, y - h], axis=1),
+        np.stack([x + w, y - h], axis=1),
+        np.stack([x + w, y + h], axis=1),
+        np.stack([x - w, y + h], axis=1),
+    ], axis=1)
+
+
+def corners_to_xywh(corners: np.ndarray) -> np.ndarray:
+    """(N, K, 2) 多边形顶点的外接矩形，返回中心格式"""
+    lo = corners.min(axis=1)
+    hi = corners.max(axis=1)
+    return np.concatenate([(lo + hi) / 2, hi - lo], axis=1)
+
+
+def _next_index(counts: np.ndarray, size: int) -> np.ndarray:
+    """每个多边形中各顶点的下一个顶点下标(最后一个有效顶点回到 0)"""
+    k = np.arange(size)[None, :]
+    return np.where(k + 1 < counts[:, None], k + 1, 0)
+
+
+def polygon_areas(points: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """批量计算 (P, M, 2) 多边形的有向面积，counts 为每个多边形的有效顶点数"""
+    nxt = _next_index(counts, points.shape[1])
+    nxt_points = np.take_along_axis(points, nxt[:, :, None], axis=1)
+    cross = points[:, :, 0] * nxt_points[:, :, 1] - nxt_points[:, :, 0] * points[:, :, 1]
+    valid = np.arange(points.shape[1])[None, :] < counts[:, None]
+    return 0.5 * np.where(valid, cross, 0.0).sum(axis=1)
+
+
+def to_ccw(polygons: np.ndarray) -> np.ndarray:
+    """将 (P, 4, 2) 四边形统一为逆时针顶点顺序"""
+    counts = np.full(len(polygons), polygons.shape[1])
+    clockwise = polygon_areas(polygons, counts) < 0
+    result = polygons.copy()
+    result[clockwise] = result[clockwise, ::-1]
+    return result
+
+
+def clip_convex(subject: np.ndarray, clip: np.ndarray) -> tuple:
+    """批量 Sutherland-Hodgman 裁剪：用凸四边形 clip 逐边裁剪 subject
+
+    subject 和 clip 均为 (P, 4, 2) 的逆时针凸四边形，返回 (P, 8, 2) 的交集顶点和顶点数。
+    所有多边形对同时计算，每条裁剪边只做一组数组运算。
+    """
+    size = MAX_CLIP_VERTICES
+    points = np.zeros((len(subject), size, 2))
+    points[:, :subject.shape[1]] = subject
+    counts = np.full(len(subject), subject.shape[1])
+    slots = np.arange(size)[None, :]
+
+    for e in range(clip.shape[1]):
+        a = clip[:, e][:, None, :]
+        b = clip[:, (e + 1) % clip.shape[1]][:, None, :]
+        edge = b - a
+        nxt = np.take_along_axis(points, _next_index(counts, size)[:, :, None], axis=1)
+
+        # 点在裁剪边左侧(内侧)时叉积非负
+        side = edge[..., 0] * (points[..., 1] - a[..., 1]) - edge[..., 1] * (points[..., 0] - a[..., 0])
+        side_next = edge[..., 0] * (nxt[..., 1] - a[..., 1]) - edge[..., 1] * (nxt[..., 0] - a[..., 0])
+        valid = slots < counts[:, None]
+        inside = side >= 0
+        crossing = valid & (inside != (side_next >= 0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, side / (side - side_next), 0.0)
+        intersection = points + t[..., None] * (nxt - points)
+
+        # 每个顶点输出 0~2 个点：内侧的顶点本身，以及与裁剪边的交点
+        candidates = np.stack([points, intersection], axis=2).reshape(len(points), 2 * size, 2)
+        keep = np.stack([valid & inside, crossing], axis=2).reshape(len(points), 2 * size)
+        order = np.argsort(~keep, axis=1, kind='stable')[:, :size]
+        points = np.take_along_axis(candidates, order[:, :, None], axis=1)
+        counts = np.minimum(keep.sum(axis=1), size)
+    return points, counts
+
+
+def convex_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(P, 4, 2) 与 (P, 4, 2) 凸四边形逐对的 IoU"""
+    if len(a) == 0:
+        return np.zeros(0)
+    a, b = to_ccw(a), to_ccw(b)
+    full = np.full(len(a), a.shape[1])
+    area_a = polygon_areas(a, full)
+    area_b = polygon_areas(b, full)
+    points, counts = clip_convex(a, b)
+    intersection = np.where(counts >= 3, polygon_areas(points, counts), 0.0)
+    union = area_a + area_b - intersection
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, intersection / union, 0.0)
+
+
+def rotated_iou_matrix(corners: np.ndarray, aabb_iou: np.ndarray,
+                       rotated: np.ndarray) -> np.ndarray:
+    """在外接矩形 IoU 矩阵的基础上，为涉及旋转框的候选对计算精确 IoU
+
+    外接矩形不相交的框对 IoU 必为 0，只有外接矩形相交且至少一个框旋转的框对需要多边形求交。
+    """
+    iou = aabb_iou.copy()
+    i, j = np.triu_indices(len(corners), 1)
+    candidate = (aabb_iou[i, j] > 0) & (rotated[i] | rotated[j])
+    i, j = i[candidate], j[candidate]
+    if len(i):
+        exact = convex_iou(corners[i], corners[j])
+        iou[i, j] = exact
+        iou[j, i] = exact
+    return iou
+
+
+class Polygons:
+    """变长多边形的列式存储：所有顶点连续存放在 (M, 2) 的 points 中，
+    第 i 个多边形的顶点为 points[offsets[i]:offsets[i + 1]]，没有多边形的框长度为 0"""
+
+    def __init__(self, points: np.ndarray, offsets: np.ndarray):
+        self.points = points
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, polygons) -> 'Polygons':
+        """由每个框的顶点序列 (x1, y1, x2, y2, ...) 或 None 构建"""
+        counts = [0 if p is None else len(p) // 2 for p in polygons]
+        offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        flat = [v for p in polygons if p is not None for v in p]
+        return cls(np.array(flat, dtype=np.float64).reshape(-1, 2), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def mask(self) -> np.ndarray:
+        """哪些框带有多边形"""
+        return self.counts > 0
+
+    def bounds(self) -> np.ndarray:
+        """(N, 4) 角点格式的外接矩形，没有多边形的行为 NaN"""
+        result = np.full((len(self), 4), np.nan)
+        has = self.mask()
+        if has.any():
+            starts = self.offsets[:-1][has]
+            result[has, 0:2] = np.minimum.reduceat(self.points, starts, axis=0)
+            result[has, 2:4] = np.maximum.reduceat(self.points, starts, axis=0)
+        return result
+
+    def same(self, i: int, j: int, decimals: int = 6) -> bool:
+        """两个多边形的顶点(按给定小数位数)是否完全相同"""
+        a, b = self[i], self[j]
+        return a.shape == b.shape and np.array_equal(np.round(a, decimals), np.round(b, decimals))
+
+
+def raster_iou(a: np.ndarray, b: np.ndarray, size: int = RASTER_SIZE) -> float:
+    """将两个任意(可为凹)多边形栅格化到共同外接矩形上的 size x size 网格，按像素数计算 IoU
+
+    两轴分别缩放不改变 IoU，因此网格总是铺满外接矩形，精度只取决于 size。
+    """
+    lo = np.minimum(a.min(axis=0), b.min(axis=0))
+    extent = np.maximum(a.max(axis=0), b.max(axis=0)) - lo
+    if (extent <= 0).any():
+        return 0.0
+    scale = (size - 1) * (1 << RASTER_SHIFT) / extent
+    masks = []
+    for polygon in (a, b):
+        mask = np.zeros((size, size), dtype=np.uint8)
+        points = np.round((polygon - lo) * scale).astype(np.int32)
+        cv2.fillPoly(mask, [points], 1, lineType=cv2.LINE_8, shift=RASTER_SHIFT)
+        masks.append(mask.view(bool))
+    union = np.count_nonzero(masks[0] | masks[1])
+    return np.count_nonzero(masks[0] & masks[1]) / union if union else 0.0
+
+
+def polygon_iou_matrix(polygons: Polygons, corners: np.ndarray, aabb_iou: np.ndarray) -> np.ndarray:
+    """在外接矩形 IoU 矩阵的基础上，为涉及多边形的候选对计算栅格化 IoU
+
+    corners 为每个框的四个角点(旋转框为其 OBB)，用于与多边形求交的普通框。
+    外接矩形不相交的框对不会被栅格化。
+    """
+    iou = aabb_iou.copy()
+    has = polygons.mask()
+    i, j = np.triu_indices(len(polygons), 1)
+    candidate = (aabb_iou[i, j] > 0) & (has[i] | has[j])
+    for a, b in zip(i[candidate].tolist(), j[candidate].tolist()):
+        shape_a = polygons[a] if has[a] else corners[a]
+        shape_b = polygons[b] if has[b] else corners[b]
+        iou[a, b] = iou[b, a] = raster_iou(shape_a, shape_b)
+    return iou
@@ -0,0 +1,159 @@
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .file_cache import FileCache, file_signature
+
+HASH_TYPES = ('ahash', 'dhash', 'phash')
+DEFAULT_MAX_DISTANCE = 6  # 64 位哈希的汉明距离阈值
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """将布尔数组打包为整数"""
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def compute_hashes(image_path: str) -> Optional[Tuple[int, int, int]]:
+    """计算图片的 (aHash, dHash, pHash)，无法读取时返回 None"""
+    # 以 1/8 分辨率解码灰度图，哈希只需要很小的图像
+    image = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return None
+
+    small = cv2.resize(image, (8, 8), interpolation=cv2.INTER_AREA)
+    ahash = _bits_to_int(small > small.mean())
+
+    wide = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    dhash = _bits_to_int(wide[:, 1:] > wide[:, :-1])
+
+    square = cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(square)[:8, :8]
+    phash = _bits_to_int(low > np.median(low.ravel()[1:]))
+
+    return ahash, dhash, phash
+
+
+def _hash_job(image_path: str):
+    """进程池任务：返回路径、文件签名和哈希"""
+    return image_path, file_signature(image_path), compute_hashes(image_path)
+
+
+def compute_hashes_parallel(image_paths: List[str], cache: Optional[FileCache] = None,
+                            max_workers: Optional[int] = None,
+                            progress: Optional[Callable[[int, int], None]] = None,
+                            should_stop: Optional[Callable[[], bool]] = None
+                            ) -> Dict[str, Tuple[int, int, int]]:
+    """在进程池中计算图片哈希，命中缓存的文件不再解码"""
+    results = {}
+    pending = []
+    for path in image_paths:
+        cached = cache.get(path) if cache is not None else None
+        if cached is not None:
+            results[path] = tuple(cached)
+        else:
+            pending.append(path)
+
+    total = len(image_paths)
+    done = len(results)
+    if progress:
+        progress(done, total)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunksize = max(1, len(pending) // 256)
+            for path, signature, hashes in executor.map(_hash_job, pending,
+                                                        chunksize=chunksize):
+                done += 1
+                if hashes is not None:
+                    results[path] = hashes
+                    if cache is not None:
+                        cache.put(path, list(hashes), signature)
+                if progress:
+                    progress(done, total)
+                if should_stop and should_stop():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+
+    if cache is not None:
+        cache.save()
+    return results
+
+
+class BKTree:
+    """基于汉明距离的 BK 树，用于近邻哈希查询"""
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+
+    @staticmethod
+    def distance(a: int, b: int) -> int:
+        return bin(a ^ b).count('1')
+
+    def add(self, value: int, item):
+        """插入哈希值及其关联对象"""
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = self.distance(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> list:
+        """返回与 value 距离不超过 radius 的所有对象"""
+        found = []
+        if self.root is None:
+            return found
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = self.distance(value, node[0])
+            if d <= radius:
+                found.extend(node[1])
+            for child_d, child in node[2].items():
+                if d - radius <= child_d <= d + radius:
+                    stack.append(child)
+        return found
+
+
+def find_duplicate_groups(hashes: Dict[str, Tuple[int, int, int]],
+                          max_distance: int = DEFAULT_MAX_DISTANCE,
+                          hash_type: str = 'phash') -> List[List[str]]:
+    """按哈希距离查找近似重复的图片组，每组至少包含两张图片"""
+    index = HASH_TYPES.index(hash_type)
+    paths = sorted(hashes)
+
+    tree = BKTree()
+    for i, path in enumerate(paths):
+        tree.add(hashes[path][index], i)
+
+    # 并查集合并所有近邻
+    parent = list(range(len(paths)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, path in enumerate(paths):
+        for j in tree.search(hashes[path][index], max_distance):
+            if j != i:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[str]] = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(find(i), []).append(path)
+    return [group for group in groups.values() if len(group) > 1]
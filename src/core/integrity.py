@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .file_cache import FileCache, file_signature
+
+# 图片问题类型
+IMAGE_UNREADABLE = 'unreadable'
+IMAGE_EMPTY = 'empty'
+IMAGE_BAD_HEADER = 'bad_header'
+IMAGE_TRUNCATED = 'truncated'
+IMAGE_UNDECODABLE = 'undecodable'
+PROBLEM_NAMES = {
+    IMAGE_UNREADABLE: "无法读取",
+    IMAGE_EMPTY: "空文件",
+    IMAGE_BAD_HEADER: "文件头无效",
+    IMAGE_TRUNCATED: "文件被截断",
+    IMAGE_UNDECODABLE: "无法解码",
+}
+
+JPEG_START = b'\xff\xd8\xff'
+JPEG_END = b'\xff\xd9'
+PNG_START = b'\x89PNG\r\n\x1a\n'
+PNG_END = b'IEND\xaeB`\x82'
+TAIL_SIZE = 1024  # 先在文件末尾查找结束标记，找不到时(末尾附加了数据)再查找整个文件
+# 缓存文件名，判断规则变化时更换，使旧的判断结果失效
+CACHE_FILE_NAME = "image_integrity_v2.json"
+
+
+def _jpeg_scan_start(data) -> Optional[int]:
+    """跳过 SOS 之前的标记段(Exif 中的缩略图也以 EOI 结尾)，返回第一个扫描段的位置"""
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # 填充字节
+        elif marker == 0xDA:
+            return pos
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2  # 没有长度字段的标记
+        else:
+            pos += 2 + struct.unpack_from('>H', data, pos + 2)[0]
+    return None
+
+
+def _has_end_marker(image_path: str, marker: bytes, jpeg: bool) -> bool:
+    """在整个文件中查找结束标记，用于末尾附加了较多数据的图片(如动态照片在 JPEG 后追加的视频)
+
+    压缩数据中的 0xFF 都经过填充，EOI 只可能是真正的结束标记；JPEG 从第一个扫描段开始查找。
+    """
+    with open(image_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = _jpeg_scan_start(data) if jpeg else 0
+        return start is not None and data.find(marker, start) != -1
+
+
+def check_image(image_path: str) -> Optional[str]:
+    """检查一张图片，返回问题类型，正常时返回 None
+
+    依次检查文件头、结束标记(JPEG 的 EOI、PNG 的 IEND、BMP 头中的文件大小)，
+    最后以 1/8 分辨率解码灰度图确认能够解码。被截断的 JPEG 通常仍能解码出一部分，
+    因此结束标记检查不能省略。
+    """
+    try:
+        size = os.path.getsize(image_path)
+        with open(image_path, 'rb') as f:
+            head = f.read(16)
+            f.seek(max(0, size - TAIL_SIZE))
+            tail = f.read()
+    except OSError:
+        return IMAGE_UNREADABLE
+    if size == 0:
+        return IMAGE_EMPTY
+
+    try:
+        if head.startswith(JPEG_START):
+            if JPEG_END not in tail and not _has_end_marker(image_path, JPEG_END, True):
+                return IMAGE_TRUNCATED
+        elif head.startswith(PNG_START):
+            if PNG_END not in tail and not _has_end_marker(image_path, PNG_END, False):
+                return IMAGE_TRUNCATED
+        elif head.startswith(b'BM') and len(head) >= 6:
+            if size < struct.unpack('<I', head[2:6])[0]:
+                return IMAGE_TRUNCATED
+        else:
+            return IMAGE_BAD_HEADER
+    except OSError:
+        return IMAGE_UNREADABLE
+
+    if cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8) is None:
+        return IMAGE_UNDECODABLE
+    return None
+
+
+def _integrity_job(image_path: str) -> Tuple[str, Optional[list], Optional[str]]:
+    """进程池任务：返回路径、文件签名和问题类型"""
+    return image_path, file_signature(image_path), check_image(image_path)
+
+
+def scan_images(image_paths: List[str], cache: Optional[FileCache] = None,
+                max_workers: Optional[int] = None,
+                progress: Optional[Callable[[int, int], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, str]:
+    """在进程池中检查图片完整性，返回有问题的图片 {路径: 问题类型}；命中缓存的文件不再读取"""
+    problems = {}
+    pending = []
+    for path in image_paths:
+        cached = cache.get(path) if cache is not None else None
+        if cached is None:
+            pending.append(path)
+        elif cached:
+            problems[path] = cached  # 缓存中正常的图片记为空字符串
+
+    total = len(image_paths)
+    done = total - len(pending)
+    if progress:
+        progress(done, total)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunksize = max(1, len(pending) // 256)
+            for path, signature, problem in executor.map(_integrity_job, pending,
+                                                         chunksize=chunksize):
+                done += 1
+                if problem is not None:
+                    problems[path] = problem
+                if cache is not None and signature is not None:
+                    cache.put(path, problem or "", signature)
+                if progress and (done % 100 == 0 or done == total):
+                    progress(done, total)
+                if should_stop and should_stop():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+
+    if cache is not None:
+        cache.save()
+    return problems
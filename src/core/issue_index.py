@@ -0,0 +1,133 @@
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+WORD_BITS = 64
+ANY_ISSUE = "any"  # 有任意问题的行
+
+
+class Bitmap:
+    """定长位图，按 64 位字存储，另有一层摘要位图记录哪些字非零，用于快速查找下一个置位"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.words = [0] * ((size + WORD_BITS - 1) // WORD_BITS)
+        self.summary = [0] * ((len(self.words) + WORD_BITS - 1) // WORD_BITS)
+
+    def __getitem__(self, i: int) -> bool:
+        return bool(self.words[i // WORD_BITS] >> (i % WORD_BITS) & 1)
+
+    def set(self, i: int, value: bool = True):
+        w = i // WORD_BITS
+        if value:
+            self.words[w] |= 1 << (i % WORD_BITS)
+        else:
+            self.words[w] &= ~(1 << (i % WORD_BITS))
+        if self.words[w]:
+            self.summary[w // WORD_BITS] |= 1 << (w % WORD_BITS)
+        else:
+            self.summary[w // WORD_BITS] &= ~(1 << (w % WORD_BITS))
+
+    def clear(self):
+        self.words = [0] * len(self.words)
+        self.summary = [0] * len(self.summary)
+
+    def count(self) -> int:
+        return sum(bin(word).count('1') for word in self.words if word)
+
+    def next_set(self, i: int) -> int:
+        """大于 i 的第一个置位，没有时返回 -1"""
+        i += 1
+        if i >= self.size:
+            return -1
+        w = i // WORD_BITS
+        word = self.words[w] >> (i % WORD_BITS) << (i % WORD_BITS)
+        if word:
+            return w * WORD_BITS + _lowest_bit(word)
+
+        # 在摘要位图中查找下一个非零字
+        w += 1
+        s = w // WORD_BITS
+        if s >= len(self.summary):
+            return -1
+        mask = self.summary[s] >> (w % WORD_BITS) << (w % WORD_BITS)
+        while not mask:
+            s += 1
+            if s >= len(self.summary):
+                return -1
+            mask = self.summary[s]
+        w = s * WORD_BITS + _lowest_bit(mask)
+        return w * WORD_BITS + _lowest_bit(self.words[w])
+
+    def prev_set(self, i: int) -> int:
+        """小于 i 的最后一个置位，没有时返回 -1"""
+        i = min(i, self.size) - 1
+        if i < 0:
+            return -1
+        w = i // WORD_BITS
+        word = self.words[w] & ((2 << (i % WORD_BITS)) - 1)
+        if word:
+            return w * WORD_BITS + word.bit_length() - 1
+
+        w -= 1
+        if w < 0:
+            return -1
+        s = w // WORD_BITS
+        mask = self.summary[s] & ((2 << (w % WORD_BITS)) - 1)
+        while not mask:
+            s -= 1
+            if s < 0:
+                return -1
+            mask = self.summary[s]
+        w = s * WORD_BITS + mask.bit_length() - 1
+        return w * WORD_BITS + self.words[w].bit_length() - 1
+
+    def to_array(self) -> np.ndarray:
+        """转换为布尔数组"""
+        words = np.array(self.words, dtype=np.uint64)
+        bits = np.unpackbits(words.view(np.uint8), bitorder='little')
+        return bits[:self.size].astype(bool)
+
+
+def _lowest_bit(word: int) -> int:
+    return (word & -word).bit_length() - 1
+
+
+class IssueIndex:
+    """按问题类型记录有问题的行，随检查结果增量更新"""
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.bitmaps: Dict[str, Bitmap] = {ANY_ISSUE: Bitmap(size)}
+
+    def bitmap(self, key: str) -> Bitmap:
+        if key not in self.bitmaps:
+            self.bitmaps[key] = Bitmap(self.size)
+        return self.bitmaps[key]
+
+    def update(self, row: int, counts: Dict[str, int]):
+        """记录某行各规则的问题数"""
+        for key, bitmap in self.bitmaps.items():
+            if key != ANY_ISSUE and key not in counts:
+                bitmap.set(row, False)
+        for key, n in counts.items():
+            self.bitmap(key).set(row, n > 0)
+        self.bitmaps[ANY_ISSUE].set(row, any(n > 0 for n in counts.values()))
+
+    def clear(self, keys: Optional[Iterable[str]] = None):
+        for key in (self.bitmaps if keys is None else keys):
+            if key in self.bitmaps:
+                self.bitmaps[key].clear()
+
+    def next_row(self, row: int, key: str = ANY_ISSUE) -> int:
+        """row 之后第一个有该问题的行，没有时返回 -1"""
+        bitmap = self.bitmaps.get(key)
+        return bitmap.next_set(row) if bitmap else -1
+
+    def prev_row(self, row: int, key: str = ANY_ISSUE) -> int:
+        """row 之前最后一个有该问题的行，没有时返回 -1"""
+        bitmap = self.bitmaps.get(key)
+        return bitmap.prev_set(row) if bitmap else -1
+
+    def rows(self, key: str = ANY_ISSUE) -> List[int]:
+        bitmap = self.bitmaps.get(key)
+        return np.flatnonzero(bitmap.to_array()).tolist() if bitmap else []
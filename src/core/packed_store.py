@@ -0,0 +1,241 @@
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .annotation import AnnotationFile
+from .file_cache import cache_path_for, file_signature
+
+# 打包标注库文件格式(小端):
+#   文件头   HEADER_FORMAT
+#   偏移表   int64[num_files + 1]，第 i 个文件的框位于 [offsets[i], offsets[i + 1])
+#   类别列   int32[num_boxes]
+#   坐标列   float32[4, num_boxes]，依次为 x、y、w、h 四列
+#   签名     int64[num_files, 2]，构建时标注文件的 (修改时间 ns, 大小)
+#   文件名   UTF-8，以换行分隔的图片名(不含扩展名)
+MAGIC = b'YLPK'
+VERSION = 2
+HEADER_FORMAT = '<4sIQQQQQQQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+STORE_FILE_NAME = "labels.pack"
+# 保存时的增量记录，每行一个 JSON(含标注文件签名)，打开时覆盖库中的对应文件
+DELTA_SUFFIX = ".delta"
+_MISSING = object()
+
+
+def default_store_path(directory: str) -> str:
+    """数据目录对应的打包标注库路径"""
+    return cache_path_for(directory, STORE_FILE_NAME)
+
+
+def _align(offset: int) -> int:
+    """按 8 字节对齐，保证数组视图对齐"""
+    return (offset + 7) // 8 * 8
+
+
+class PackedLabelStore:
+    """内存映射的打包标注库，按文件返回零拷贝的列式数组视图"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from('<4sI', self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"不支持的标注库文件(请重新构建): {path}")
+        (_, _, num_files, num_boxes, offsets_pos, class_pos, coords_pos, signatures_pos,
+         names_pos, names_size) = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+
+        self.num_files = num_files
+        self.num_boxes = num_boxes
+        self.offsets = np.frombuffer(self._mmap, dtype='<i8', count=num_files + 1,
+                                     offset=offsets_pos)
+        self.class_ids = np.frombuffer(self._mmap, dtype='<i4', count=num_boxes,
+                                       offset=class_pos)
+        self.coords = np.frombuffer(self._mmap, dtype='<f4', count=4 * num_boxes,
+                                    offset=coords_pos).reshape(4, num_boxes)
+        self.signatures = np.frombuffer(self._mmap, dtype='<i8', count=2 * num_files,
+                                        offset=signatures_pos).reshape(num_files, 2)
+        names = self._mmap[names_pos:names_pos + names_size].decode('utf-8')
+        self.names: List[str] = names.split('\n') if names else []
+        self.rows: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+        # 重放增量记录
+        self.overrides: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.override_signatures: Dict[str, Optional[list]] = {}
+        self._load_delta()
+
+    @property
+    def delta_path(self) -> str:
+        return self.path + DELTA_SUFFIX
+
+    def _load_delta(self):
+        """加载保存时追加的增量记录"""
+        try:
+            with open(self.delta_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 写入中断的最后一行
+                    boxes = record['boxes']
+                    self.overrides[record['name']] = (None if boxes is None
+                                                      else self._boxes_to_arrays(boxes))
+                    self.override_signatures[record['name']] = record.get('signature')
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _boxes_to_arrays(boxes: list) -> Tuple[np.ndarray, np.ndarray]:
+        data = np.array(boxes, dtype=np.float64).reshape(-1, 5)
+        return data[:, 0].astype(np.int32), data[:, 1:5].astype(np.float32)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        return self.num_files
+
+    def get(self, name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """返回 (class_ids, xywh)，不在库中或需读取标注文件时返回 None
+
+        覆盖记录只读取一次，其他线程(界面保存)同时更新该文件时不会在判断和读取之间变化；
+        覆盖记录为 None 表示该文件含有库中无法表示的旋转框或多边形。
+        """
+        override = self.overrides.get(name, _MISSING)
+        if override is not _MISSING:
+            return override
+        row = self.rows.get(name)
+        if row is None:
+            return None
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.class_ids[start:end], self.coords[:, start:end].T
+
+    def arrays(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (class_ids, xywh)，未被覆盖的文件为内存映射上的视图"""
+        arrays = self.get(name)
+        if arrays is None:
+            raise KeyError(name)
+        return arrays
+
+    def annotation(self, name: str, file_path: str = "") -> Optional[AnnotationFile]:
+        """以打包数据构建 AnnotationFile，不打开标注文件；不在库中时返回 None"""
+        arrays = self.get(name)
+        return None if arrays is None else AnnotationFile.from_arrays(file_path, *arrays)
+
+    def update(self, name: str, anno: AnnotationFile):
+        """保存标注后同步到库中(追加增量记录)"""
+        self.update_many([(name, anno)])
+
+    def update_many(self, items: Iterable[Tuple[str, AnnotationFile]]):
+        """批量追加增量记录，同时记录标注文件当前的签名"""
+        with open(self.delta_path, 'a', encoding='utf-8') as f:
+            for name, anno in items:
+                boxes = (None if anno.has_shapes()
+                         else [[b.class_id, b.x, b.y, b.w, b.h] for b in anno.boxes])
+                signature = file_signature(anno.file_path)
+                f.write(json.dumps({'name': name, 'boxes': boxes, 'signature': signature}) + '\n')
+                self.overrides[name] = None if boxes is None else self._boxes_to_arrays(boxes)
+                self.override_signatures[name] = signature
+
+    def stale_files(self, annotation_files: Dict[str, str]) -> List[str]:
+        """签名与标注文件不一致的文件(应用关闭期间或在外部被修改)，不在库中的文件不需要检查"""
+        stale = []
+        for name, path in annotation_files.items():
+            if name in self.overrides:
+                expected = self.override_signatures.get(name)
+            elif name in self.rows:
+                expected = self.signatures[self.rows[name]].tolist()
+            else:
+                continue
+            if expected != file_signature(path):
+                stale.append(name)
+        return stale
+
+    def refresh(self, annotation_files: Dict[str, str]) -> List[str]:
+        """重新读取已过期的文件并追加增量记录，返回过期的文件名"""
+        stale = self.stale_files(annotation_files)
+        if stale:
+            self.update_many((name, AnnotationFile(annotation_files[name])) for name in stale)
+        return stale
+
+    def close(self):
+        """关闭内存映射"""
+        # 先释放数组视图，否则 mmap 无法关闭
+        self.offsets = self.class_ids = self.coords = self.signatures = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # 仍有外部视图引用时交给垃圾回收
+        self._file.close()
+
+    @classmethod
+    def build(cls, annotation_files: Dict[str, str], path: str,
+              progress: Optional[Callable[[int, int], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None
+              ) -> Optional['PackedLabelStore']:
+        """从 YOLO 标注文件构建打包库，按文件名排序写入以便顺序扫描
+
+        含旋转框(OBB)或分割多边形的文件不写入库中，检查时仍读取标注文件。
+        """
+        all_names = sorted(annotation_files)
+        names = []
+        offsets = [0]
+        signatures = []
+        class_chunks = []
+        coord_chunks = []
+        for i, name in enumerate(all_names):
+            if should_stop and should_stop():
+                return None
+            signature = file_signature(annotation_files[name])  # 先取签名，读取期间的修改会在打开时发现
+            anno = AnnotationFile(annotation_files[name])
+            if not anno.has_shapes() and signature is not None:
+                class_ids, xywh = anno.to_arrays()
+                names.append(name)
+                signatures.append(signature)
+                class_chunks.append(class_ids.astype('<i4'))
+                coord_chunks.append(xywh.astype('<f4'))
+                offsets.append(offsets[-1] + len(class_ids))
+            if progress and (i % 1000 == 0 or i == len(all_names) - 1):
+                progress(i + 1, len(all_names))
+        offsets = np.array(offsets, dtype='<i8')
+        signatures = np.array(signatures, dtype='<i8').reshape(-1, 2)
+
+        num_boxes = int(offsets[-1])
+        class_ids = np.concatenate(class_chunks) if class_chunks else np.zeros(0, '<i4')
+        coords = (np.concatenate(coord_chunks).T if coord_chunks
+                  else np.zeros((4, 0), '<f4'))
+        names_blob = '\n'.join(names).encode('utf-8')
+
+        offsets_pos = _align(HEADER_SIZE)
+        class_pos = _align(offsets_pos + offsets.nbytes)
+        coords_pos = _align(class_pos + class_ids.nbytes)
+        signatures_pos = _align(coords_pos + 16 * num_boxes)
+        names_pos = _align(signatures_pos + signatures.nbytes)
+
+        # 先写临时文件再替换，避免写入中断留下损坏的库
+        os.makedirs(str(Path(path).parent), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(names), num_boxes,
+                                offsets_pos, class_pos, coords_pos, signatures_pos, names_pos,
+                                len(names_blob)))
+            for pos, data in ((offsets_pos, offsets.tobytes()),
+                              (class_pos, class_ids.tobytes()),
+                              (coords_pos, np.ascontiguousarray(coords, '<f4').tobytes()),
+                              (signatures_pos, signatures.tobytes()),
+                              (names_pos, names_blob)):
+                f.write(b'\0' * (pos - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+
+        # 新库已包含所有修改，旧的增量记录作废
+        try:
+            os.remove(path + DELTA_SUFFIX)
+        except FileNotFoundError:
+            pass
+        return cls(path)
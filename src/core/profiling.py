@@ -0,0 +1,156 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+# 设置环境变量 YOLO_CHECKER_TRACE=1 可在启动时开启追踪
+TRACE_ENV = "YOLO_CHECKER_TRACE"
+MAX_EVENTS = 1_000_000  # 最多保留的事件数，超过后丢弃最早的事件
+NUM_BUCKETS = 40  # 耗时直方图按微秒的 2 的幂分桶
+
+
+class SpanStats:
+    """单个 span 名称的耗时统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_us = 0.0
+        self.min_us = float('inf')
+        self.max_us = 0.0
+        self.buckets = [0] * NUM_BUCKETS  # buckets[k]: 耗时在 [2^(k-1), 2^k) 微秒
+
+    def add(self, dur_us: float):
+        self.count += 1
+        self.total_us += dur_us
+        self.min_us = min(self.min_us, dur_us)
+        self.max_us = max(self.max_us, dur_us)
+        self.buckets[min(int(dur_us).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        """根据直方图估算分位数(取所在桶的上界)"""
+        target = q * self.count
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return float(min(2 ** k, self.max_us))
+        return self.max_us
+
+
+class Tracer:
+    """轻量的耗时追踪器，关闭时 span 几乎没有开销"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = deque(maxlen=MAX_EVENTS)  # (name, 开始时间, 耗时, 线程 ID)
+        self.stats: Dict[str, SpanStats] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.stats.clear()
+            self._origin = time.perf_counter()
+
+    def record(self, name: str, start: float, end: float):
+        """记录一次 span"""
+        dur_us = (end - start) * 1e6
+        with self._lock:
+            self.events.append((name, (start - self._origin) * 1e6, dur_us,
+                                threading.get_ident()))
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = SpanStats()
+            stats.add(dur_us)
+
+    def summary(self) -> List[dict]:
+        """按总耗时排序的统计表"""
+        with self._lock:
+            items = list(self.stats.items())
+        rows = []
+        for name, s in items:
+            rows.append({
+                'name': name,
+                'count': s.count,
+                'total_ms': s.total_us / 1000,
+                'mean_us': s.total_us / s.count if s.count else 0.0,
+                'p50_us': s.percentile(0.5),
+                'p95_us': s.percentile(0.95),
+                'max_us': s.max_us,
+                'buckets': list(s.buckets),
+            })
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def dump_chrome_trace(self, path: str):
+        """导出 Chrome trace_event 格式(可在 chrome://tracing 或 Perfetto 中打开)"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace = [{'name': name, 'ph': 'X', 'ts': ts, 'dur': dur, 'pid': pid, 'tid': tid}
+                 for name, ts, dur, tid in events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms',
+                       'otherData': {'summary': self.summary()}}, f)
+
+
+TRACER = Tracer()
+TRACER.enable(os.environ.get(TRACE_ENV, "") not in ("", "0"))
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        TRACER.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """计时上下文: with span("名称"): ..."""
+    if not TRACER.enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def traced(name: str):
+    """计时装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.record(name, start, time.perf_counter())
+        return wrapper
+    return decorator
@@ -0,0 +1,181 @@
+import ast
+import io
+import operator
+import tokenize
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from .class_index import ClassIndex
+
+# 比较运算符
+COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+CLASS_FIELD = "class_"  # class 是 Python 关键字，解析前替换为该名称
+
+
+class QueryError(ValueError):
+    """筛选表达式无效"""
+    pass
+
+
+class Query:
+    """文件筛选表达式
+
+    示例: ``class == 7``、``class in (1, 2) and boxes > 50``、``min_area < 0.01``、
+    ``overlaps and not invalid_labels``。可用的列见 ClassIndex.columns()，
+    规则名称表示该行是否有对应问题，类别可以写序号或名称(加引号)。
+    整个表达式以列为单位向量化计算，结果为每行是否匹配的布尔数组。
+    """
+
+    def __init__(self, text: str, class_index: ClassIndex,
+                 flags: Optional[Dict[str, Callable[[], np.ndarray]]] = None,
+                 label_names: Optional[List[str]] = None):
+        self.text = text
+        self.class_index = class_index
+        self.columns = class_index.columns()
+        self.flags = flags or {}  # 名称 -> 返回布尔数组的函数(例如问题位图)
+        self.label_names = label_names or []
+        try:
+            self.tree = ast.parse(self.rename_class(text.strip()), mode='eval')
+        except (SyntaxError, tokenize.TokenError):
+            raise QueryError(f"表达式语法错误: {text}")
+
+    @staticmethod
+    def rename_class(text: str) -> str:
+        """将名称 class 替换为 CLASS_FIELD；class 是关键字，无法先解析为语法树，因此按词法单元替换，
+        引号中的类别名称(例如 'first class')不受影响"""
+        tokens = [(tokenize.NAME, CLASS_FIELD) if tok.type == tokenize.NAME and tok.string == 'class'
+                  else (tok.type, tok.string)
+                  for tok in tokenize.generate_tokens(io.StringIO(text).readline)]
+        return tokenize.untokenize(tokens)
+
+    def evaluate(self) -> np.ndarray:
+        """返回每行是否匹配，尚未检查的行不匹配"""
+        result = self.visit(self.tree.body)
+        if not isinstance(result, np.ndarray) or result.dtype != bool:
+            raise QueryError("表达式的结果必须是条件")
+        return result & self.class_index.known
+
+    def visit(self, node):
+        if isinstance(node, ast.BoolOp):
+            values = [self.as_mask(self.visit(v)) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = values[0]
+            for value in values[1:]:
+                result = combine(result, value)
+            return result
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self.as_mask(self.visit(node.operand))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self.constant(node.operand)
+        if isinstance(node, ast.Compare):
+            return self.compare(node)
+        if isinstance(node, ast.Name):
+            if node.id in self.columns:
+                return self.columns[node.id]
+            if node.id in self.flags:
+                return self.flags[node.id]()
+            raise QueryError(f"未知的列: {node.id.replace(CLASS_FIELD, 'class')}")
+        if isinstance(node, ast.Constant):
+            return self.constant(node)
+        raise QueryError("不支持的表达式")
+
+    def as_mask(self, value) -> np.ndarray:
+        if isinstance(value, np.ndarray) and value.dtype == bool:
+            return value
+        raise QueryError("and/or/not 只能用于条件")
+
+    def constant(self, node):
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self.constant(node.operand)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+                and not isinstance(node.value, bool):
+            return node.value
+        raise QueryError("比较的右侧必须是数字或类别名称")
+
+    def class_id(self, value) -> int:
+        """将类别序号或名称转换为类别 ID"""
+        if isinstance(value, str):
+            if value not in self.label_names:
+                raise QueryError(f"未知的类别: {value}")
+            return self.label_names.index(value)
+        if isinstance(value, float) and not value.is_integer():
+            raise QueryError(f"类别序号必须是整数: {value}")
+        return int(value)
+
+    def compare(self, node: ast.Compare) -> np.ndarray:
+        """比较表达式，链式比较(如 0.01 < min_area < 0.1)拆分后取交集"""
+        result = None
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            mask = self.compare_pair(left, op, right)
+            result = mask if result is None else result & mask
+            left = right
+        return result
+
+    def compare_pair(self, left, op, right) -> np.ndarray:
+        # 常量写在左侧时交换位置
+        if not isinstance(left, ast.Name) and isinstance(right, ast.Name):
+            swapped = {ast.Lt: ast.Gt, ast.Gt: ast.Lt, ast.LtE: ast.GtE, ast.GtE: ast.LtE}
+            left, right = right, left
+            op = swapped.get(type(op), type(op))()
+        if not isinstance(left, ast.Name):
+            raise QueryError("比较的一侧必须是列名")
+
+        if left.id == CLASS_FIELD:
+            return self.compare_class(op, right)
+        column = self.visit(left)
+        if isinstance(op, (ast.In, ast.NotIn)):
+            values = [self.number(left, value) for value in self.constant_list(right)]
+            mask = np.isin(column, values)
+            return ~mask if isinstance(op, ast.NotIn) else mask
+        if type(op) not in COMPARE_OPS:
+            raise QueryError("不支持的比较运算")
+        return COMPARE_OPS[type(op)](column, self.number(left, self.constant(right)))
+
+    @staticmethod
+    def number(column: ast.Name, value):
+        """数值列只能与数字比较，类别名称只能用于 class"""
+        if isinstance(value, str):
+            raise QueryError(f"{column.id} 只能与数字比较: '{value}'")
+        return value
+
+    def compare_class(self, op, right) -> np.ndarray:
+        """class == 7 表示包含类别 7；class > 7 表示包含大于 7 的类别"""
+        index = self.class_index
+        if isinstance(op, (ast.In, ast.NotIn)):
+            mask = index.class_mask([self.class_id(v) for v in self.constant_list(right)])
+            return ~mask if isinstance(op, ast.NotIn) else mask
+        class_id = self.class_id(self.constant(right))
+        has_boxes = index.box_count > 0
+        if isinstance(op, ast.Eq):
+            return index.class_mask([class_id])
+        if isinstance(op, ast.NotEq):
+            return ~index.class_mask([class_id])
+        if isinstance(op, ast.Gt):
+            return has_boxes & (index.max_class > class_id)
+        if isinstance(op, ast.GtE):
+            return has_boxes & (index.max_class >= class_id)
+        if isinstance(op, ast.Lt):
+            return has_boxes & (index.min_class < class_id)
+        if isinstance(op, ast.LtE):
+            return has_boxes & (index.min_class <= class_id)
+        raise QueryError("不支持的比较运算")
+
+    def constant_list(self, node) -> list:
+        if not isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+            raise QueryError("in 的右侧必须是列表，例如 (1, 2)")
+        return [self.constant(element) for element in node.elts]
+
+
+def run_query(text: str, class_index: ClassIndex,
+              flags: Optional[Dict[str, Callable[[], np.ndarray]]] = None,
+              label_names: Optional[List[str]] = None) -> np.ndarray:
+    """解析并计算筛选表达式，返回每行是否匹配"""
+    return Query(text, class_index, flags, label_names).evaluate()
@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .autofix import map_chunks, write_atomic
+from .class_index import ClassIndex
+
+DROP = -1  # 映射到该值的类别，其标注框会被删除
+
+
+def parse_mapping(text: str, label_names: List[str]) -> Dict[str, str]:
+    """解析类别合并/重命名规则，每行 "旧类别 新类别"(也可用 -> 或 : 分隔)，类别可写名称或序号"""
+    rules = {}
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].replace('->', ' ').replace(':', ' ').strip()
+        parts = line.split()
+        if len(parts) != 2:
+            continue
+        old, new = (label_names[int(p)] if p.isdigit() and int(p) < len(label_names) else p
+                    for p in parts)
+        rules[old] = new
+    return rules
+
+
+def build_mapping(old_names: List[str], new_names: List[str],
+                  rules: Optional[Dict[str, str]] = None) -> Dict[int, int]:
+    """根据新的类别列表生成 旧 ID -> 新 ID 的映射(只含变化的类别)
+
+    类别按名称对应，因此调整顺序只需修改列表；rules 将旧类别合并或重命名为新列表中的类别；
+    新列表中不存在的类别映射为 DROP，其标注框会被删除。
+    """
+    rules = rules or {}
+    index = {name: i for i, name in enumerate(new_names)}
+    mapping = {}
+    for old_id, name in enumerate(old_names):
+        new_id = index.get(rules.get(name, name), DROP)
+        if new_id != old_id:
+            mapping[old_id] = new_id
+    return mapping
+
+
+def lookup_table(mapping: Dict[int, int]) -> np.ndarray:
+    """旧 ID -> 新 ID 的查找表，未出现在映射中的类别保持不变"""
+    size = max(mapping, default=-1) + 1
+    table = np.arange(size, dtype=np.int64)
+    if mapping:
+        table[np.array(list(mapping))] = np.array(list(mapping.values()))
+    return table
+
+
+def remap_file(path: str, table: np.ndarray) -> Optional[Tuple[str, int, int, int, int]]:
+    """按查找表改写一个标注文件的类别，坐标部分原样保留
+
+    返回 (路径, 修改的框数, 删除的框数, 类别为负数或非整数而未处理的行数, 无法解析的行数)，
+    文件只在有框被修改时写入；既没有修改也没有跳过的行时返回 None。
+    """
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except Exception:
+        return None
+    lines = text.splitlines()
+    parts = [line.split(None, 1) for line in lines]
+    class_ids = np.full(len(lines), -1, dtype=np.int64)
+    untouched = unparsable = 0
+    for n, tokens in enumerate(parts):
+        if not tokens:
+            continue  # 空行
+        if len(tokens) == 2 and tokens[0].isdigit():
+            class_ids[n] = int(tokens[0])
+            continue
+        try:
+            value = float(tokens[0]) if len(tokens) == 2 else None
+        except ValueError:
+            value = None
+        if value is None or not np.isfinite(value):
+            unparsable += 1
+        elif value >= 0 and value.is_integer():
+            class_ids[n] = int(value)  # 与 BBox.parse 一致，"3.0" 视为类别 3
+        else:
+            untouched += 1
+
+    # 向量化查表，超出表范围的类别(以及跳过的行)保持不变
+    known = (class_ids >= 0) & (class_ids < len(table))
+    new_ids = class_ids.copy()
+    new_ids[known] = table[class_ids[known]]
+    changed = known & (new_ids != class_ids)
+    if not changed.any():
+        return (path, 0, 0, untouched, unparsable) if untouched or unparsable else None
+
+    dropped = changed & (new_ids == DROP)
+    output = []
+    for n, line in enumerate(lines):
+        if dropped[n]:
+            continue
+        output.append(f"{new_ids[n]} {parts[n][1]}" if changed[n] else line)
+    new_text = '\n'.join(output)
+    write_atomic(path, new_text + '\n' if text.endswith('\n') and new_text else new_text)
+    return path, int(changed.sum() - dropped.sum()), int(dropped.sum()), untouched, unparsable
+
+
+def _remap_chunk(paths: List[str], table: np.ndarray) -> List[Tuple[str, int, int, int, int]]:
+    return [result for result in (remap_file(path, table) for path in paths)
+            if result is not None]
+
+
+def affected_rows(class_index: ClassIndex, mapping: Dict[int, int]) -> Optional[np.ndarray]:
+    """通过类别倒排索引找出含有被映射类别的行；还有行未建立索引时返回 None"""
+    if not class_index.known.all():
+        return None
+    return np.flatnonzero(class_index.class_mask(list(mapping)))
+
+
+def remap_files(paths: List[str], mapping: Dict[int, int],
+                max_workers: Optional[int] = None,
+                progress: Optional[Callable[[int, int], None]] = None
+                ) -> List[Tuple[str, int, int, int, int]]:
+    """在进程池中改写所有文件的类别，返回被修改或有跳过行的文件及各项行数(见 remap_file)
+
+    不支持中断：只改写一部分文件时，无论是否改写类别文件，都会有标注与类别列表不一致。
+    """
+    if not mapping:
+        return []
+    return map_chunks(_remap_chunk, paths, (lookup_table(mapping),), max_workers, progress)
+
+
+def write_labels(path: str, names: List[str]):
+    """原子地写入新的类别列表"""
+    write_atomic(path, '\n'.join(names) + '\n')
+
+
+def labels_path(directory: str, current: str = "") -> str:
+    """要改写的类别文件：已加载的标签文件，否则为数据目录下的 classes.txt"""
+    return current or str(Path(directory) / "classes.txt")
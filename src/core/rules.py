@@ -0,0 +1,334 @@
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+from .annotation import AnnotationFile, xywh_to_xyxy, iou_matrix
+from .geometry import box_corners, rotated_iou_matrix, polygon_iou_matrix
+from .compare import Predictions, Matching, load_prediction, compare
+
+
+class RuleContext:
+    """单个标注文件的列式数据，所有规则共享同一份中间结果"""
+
+    def __init__(self, anno: AnnotationFile, checker):
+        self.anno = anno
+        self.checker = checker
+        self.class_ids, self.xywh = anno.to_arrays()
+        self.count = len(self.class_ids)
+        self.xyxy = xywh_to_xyxy(self.xywh)  # 旋转框为其外接矩形
+        self.corners = anno.to_corners()  # 含旋转框时为 (角点, 是否旋转)
+        self.polygons = anno.to_polygons()  # 含分割多边形时为变长多边形存储
+        self._iou = None
+        self._pairs = None
+        self._predictions = None
+        self._comparison = None
+
+    @property
+    def iou(self) -> np.ndarray:
+        """(N, N) IoU 矩阵，首次使用时计算；含旋转框或多边形时以外接矩形预筛后精确计算"""
+        if self._iou is None:
+            self._iou = iou_matrix(self.xyxy)
+            if self.corners is not None:
+                self._iou = rotated_iou_matrix(self.corners[0], self._iou, self.corners[1])
+            if self.polygons is not None:
+                corners = self.corners[0] if self.corners is not None else box_corners(self.xywh)
+                self._iou = polygon_iou_matrix(self.polygons, corners, self._iou)
+        return self._iou
+
+    @property
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """上三角框对下标 (i, j)，i < j"""
+        if self._pairs is None:
+            self._pairs = np.triu_indices(self.count, 1)
+        return self._pairs
+
+    @property
+    def predictions(self) -> Optional[Predictions]:
+        """对应的模型预测，没有设置预测目录时为 None"""
+        if self._predictions is None:
+            self._predictions = load_prediction(self.checker.prediction_dir, self.anno.file_path)
+        return self._predictions
+
+    @property
+    def comparison(self) -> Tuple[Matching, np.ndarray]:
+        """真值与预测的匹配结果及匹配对的类别是否不同，首次使用时计算"""
+        if self._comparison is None:
+            self._comparison = compare(self.class_ids, self.xywh, self.predictions,
+                                       self.checker.match_iou)
+        return self._comparison
+
+
+class CheckRule:
+    """检查规则基类
+
+    子类实现 check()，在 RuleContext 的列式数组上做向量化计算，返回问题列表。
+    每个问题是一个元组，第一个元素(成对规则为前两个元素)是涉及的框下标。
+    """
+    name = ''               # 结果字典中的键
+    status = ''             # 文件列表中的状态文字
+    detail = ''             # 问题详情模板，{n} 为问题数
+    color = '#FFFFFF'       # 文件列表行颜色
+    box_type = 'normal'     # 预览中问题框的类型
+    box_color = '#00FF00'   # 预览中问题框的颜色
+    priority = 0            # 多种问题并存时，优先级最高的决定状态和颜色
+    pair = False            # 问题是否涉及两个框
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        raise NotImplementedError
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        """问题涉及的框下标"""
+        return (item[0], item[1]) if self.pair else (item[0],)
+
+
+# 已注册的规则，按注册顺序决定预览中框类型的判定顺序
+RULES: Dict[str, CheckRule] = {}
+
+
+def register_rule(rule_cls):
+    """注册检查规则(类装饰器)"""
+    rule = rule_cls()
+    RULES[rule.name] = rule
+    return rule_cls
+
+
+@register_rule
+class OverlapRule(CheckRule):
+    name = 'overlaps'
+    status = '重叠问题'
+    detail = '发现 {n} 处重叠'
+    color = '#FFD0D0'
+    box_type = 'overlap'
+    box_color = '#FF0000'
+    priority = 10
+    pair = True
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        if ctx.count < 2:
+            return []
+        i, j = ctx.pairs
+        iou = ctx.iou[i, j]
+        threshold = ctx.checker.pair_thresholds(ctx.class_ids[i], ctx.class_ids[j])
+        hit = iou > threshold
+        return list(zip(i[hit].tolist(), j[hit].tolist(), iou[hit].tolist()))
+
+
+@register_rule
+class InvalidLabelRule(CheckRule):
+    name = 'invalid_labels'
+    status = '标签问题'
+    detail = '发现 {n} 个无效标签'
+    color = '#FFFFD0'
+    box_type = 'invalid_label'
+    box_color = '#FFFF00'
+    priority = 20
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        max_class_id = ctx.checker.max_class_id
+        if max_class_id < 0:
+            return []
+        idx = np.flatnonzero((ctx.class_ids > max_class_id) | (ctx.class_ids < 0))
+        return [(i, int(ctx.class_ids[i]), max_class_id) for i in idx.tolist()]
+
+
+@register_rule
+class DuplicateRule(CheckRule):
+    name = 'duplicates'
+    status = '重复标注'
+    detail = '发现 {n} 个重复框'
+    color = '#FFD0F0'
+    box_type = 'duplicate'
+    box_color = '#FF00FF'
+    priority = 15
+    pair = True
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        if ctx.count < 2:
+            return []
+        # 同类别且坐标(保留 6 位小数)完全相同视为重复，含旋转框时比较角点
+        coords = ctx.xywh if ctx.corners is None else ctx.corners[0].reshape(-1, 8)
+        keys = np.column_stack([ctx.class_ids, np.round(coords * 1e6)])
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        i, j = ctx.pairs
+        hit = inverse[i] == inverse[j]
+        pairs = zip(i[hit].tolist(), j[hit].tolist())
+        if ctx.polygons is not None:
+            # 外接矩形相同的多边形还需比较顶点
+            return [(a, b) for a, b in pairs if ctx.polygons.same(a, b)]
+        return list(pairs)
+
+
+@register_rule
+class OutOfRangeRule(CheckRule):
+    name = 'out_of_range'
+    status = '越界问题'
+    detail = '发现 {n} 个越界框'
+    color = '#E8D8FF'
+    box_type = 'out_of_range'
+    box_color = '#A040FF'
+    priority = 5
+
+    EPS = 1e-6
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        outside = ((ctx.xyxy < -self.EPS) | (ctx.xyxy > 1 + self.EPS)).any(axis=1)
+        return [(i,) for i in np.flatnonzero(outside).tolist()]
+
+
+@register_rule
+class ZeroAreaRule(CheckRule):
+    name = 'zero_area'
+    status = '退化框'
+    detail = '发现 {n} 个零面积框'
+    color = '#FFE4C8'
+    box_type = 'degenerate'
+    box_color = '#FF8000'
+    priority = 6
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        degenerate = (ctx.xywh[:, 2] <= 0) | (ctx.xywh[:, 3] <= 0)
+        return [(i,) for i in np.flatnonzero(degenerate).tolist()]
+
+
+@register_rule
+class MissedLabelRule(CheckRule):
+    """模型有把握的预测框没有任何真值框与之匹配，可能是漏标"""
+    name = 'missed_labels'
+    status = '疑似漏标'
+    detail = '发现 {n} 个疑似漏标'
+    color = '#D0E8FF'
+    box_type = 'missed'
+    box_color = '#00BFFF'
+    priority = 8
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        predictions = ctx.predictions
+        if not predictions:
+            return []
+        matching, _ = ctx.comparison
+        missed = ~matching.pred_matched & (predictions.confidence >= ctx.checker.prediction_conf)
+        return [(i, int(predictions.class_ids[i]), float(predictions.confidence[i]))
+                for i in np.flatnonzero(missed).tolist()]
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        return ()  # 下标指向预测框，不对应任何标注框
+
+
+@register_rule
+class WrongClassRule(CheckRule):
+    """真值框与有把握的预测框匹配，但类别不同"""
+    name = 'wrong_class'
+    status = '类别存疑'
+    detail = '发现 {n} 个类别与预测不一致'
+    color = '#D0F0F0'
+    box_type = 'wrong_class'
+    box_color = '#00FFFF'
+    priority = 12
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        predictions = ctx.predictions
+        if not predictions or ctx.count == 0:
+            return []
+        matching, wrong = ctx.comparison
+        confidence = predictions.confidence[matching.pred_index]
+        hit = wrong & (confidence >= ctx.checker.prediction_conf)
+        gt, pred = matching.gt_index[hit], matching.pred_index[hit]
+        return list(zip(gt.tolist(), pred.tolist(), ctx.class_ids[gt].tolist(),
+                        predictions.class_ids[pred].tolist(), confidence[hit].tolist()))
+
+
+@register_rule
+class CorruptImageRule(CheckRule):
+    """图片损坏、被截断或无法解码，结果来自图片完整性扫描"""
+    name = 'corrupt_images'
+    status = '图片损坏'
+    detail = '图片损坏或无法解码'
+    color = '#E0E0E0'
+    priority = 30
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        problem = ctx.checker.image_problems.get(Path(ctx.anno.file_path).stem)
+        return [(problem,)] if problem else []
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        return ()  # 针对整张图片，不对应任何标注框
+
+
+@register_rule
+class DuplicateImageRule(CheckRule):
+    """与其他图片近似重复，结果来自重复图片查找"""
+    name = 'duplicate_images'
+    status = '重复图片'
+    detail = '与 {n} 张图片近似重复'
+    color = '#D0E0FF'
+    priority = 2
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        group = ctx.checker.duplicate_images.get(Path(ctx.anno.file_path).stem)
+        return [(path,) for path in group[1]] if group else []
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        return ()
+
+
+@register_rule
+class TemporalDropoutRule(CheckRule):
+    """前后帧都有、本帧缺失的框，结果来自视频帧时序检查"""
+    name = 'temporal_dropouts'
+    status = '时序问题'
+    detail = '{n} 个框在本帧缺失'
+    color = '#E0FFD0'
+    priority = 3
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        frame = ctx.checker.temporal_issues.get(Path(ctx.anno.file_path).stem)
+        return [(index,) for index in frame.dropouts] if frame else []
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        return ()  # 下标属于前一帧
+
+
+@register_rule
+class ClassSwitchRule(CheckRule):
+    """类别与前一帧对应框不同的框，结果来自视频帧时序检查"""
+    name = 'class_switches'
+    status = '时序问题'
+    detail = '{n} 个框类别与前一帧不同'
+    color = '#E0FFD0'
+    priority = 4
+
+    def check(self, ctx: RuleContext) -> List[Tuple]:
+        frame = ctx.checker.temporal_issues.get(Path(ctx.anno.file_path).stem)
+        return list(frame.switches) if frame else []
+
+    def box_indices(self, item: Tuple) -> Tuple[int, ...]:
+        return ()
+
+
+def issue_counts(issues: Dict[str, list]) -> Dict[str, int]:
+    """将检查结果转换为各规则的问题数"""
+    return {name: len(items) for name, items in issues.items() if items}
+
+
+def summarize_issues(counts: Dict[str, int],
+                     notes: Optional[Dict[str, str]] = None) -> Tuple[str, str, str]:
+    """根据各规则的问题数生成 (状态, 详情, 颜色)，notes 中的文字代替对应规则的详情模板"""
+    found = [rule for name, rule in RULES.items() if counts.get(name)]
+    if not found:
+        return "正常", "", "#FFFFFF"
+    main_rule = max(found, key=lambda rule: rule.priority)
+    notes = notes or {}
+    details = "; ".join(notes.get(rule.name) or rule.detail.format(n=counts[rule.name])
+                        for rule in found)
+    return main_rule.status, details, main_rule.color
+
+
+def box_types(issues: Dict[str, list], count: int) -> List[str]:
+    """返回每个框在预览中的类型"""
+    types: List[Optional[str]] = [None] * count
+    for name, rule in RULES.items():
+        for item in issues.get(name, []):
+            for idx in rule.box_indices(item):
+                if 0 <= idx < count and types[idx] is None:
+                    types[idx] = rule.box_type
+    return [t or 'normal' for t in types]
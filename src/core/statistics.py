@@ -0,0 +1,176 @@
+import csv
+import json
+import numpy as np
+from typing import Dict, List, Optional
+from .annotation import AnnotationFile, xywh_to_xyxy, iou_matrix
+
+# 面积(占整图比例)直方图的分箱边界，按对数划分
+AREA_BINS = np.concatenate([[0.0], np.geomspace(1e-5, 1.0, 21)])
+# 宽高(占整图比例)直方图的分箱边界
+SIZE_BINS = np.linspace(0.0, 1.0, 21)
+# 每个框与同图其他框的最大 IoU 直方图分箱边界
+IOU_BINS = np.linspace(0.0, 1.0, 11)
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """将一维计数数组扩展到至少 size 长度"""
+    if len(array) >= size:
+        return array
+    grown = np.zeros(size, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _grow_rows(array: np.ndarray, size: int) -> np.ndarray:
+    """将二维计数数组的行数扩展到至少 size"""
+    if array.shape[0] >= size:
+        return array
+    grown = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+class DatasetStats:
+    """数据集统计累加器
+
+    界面检查时由检查线程逐个文件累加；分布式检查中每个分片各自累加，由协调器通过 merge 合并，
+    所有直方图都是可相加的计数。
+    """
+
+    def __init__(self):
+        self.num_images = 0
+        self.num_boxes = 0
+        self.class_boxes = np.zeros(0, dtype=np.int64)    # 每个类别的框数
+        self.class_images = np.zeros(0, dtype=np.int64)   # 每个类别出现的图片数
+        self.boxes_per_image = np.zeros(0, dtype=np.int64)  # 下标为单图框数
+        self.area_hist = np.zeros(len(AREA_BINS) - 1, dtype=np.int64)
+        self.size_hist = np.zeros((len(SIZE_BINS) - 1, len(SIZE_BINS) - 1),
+                                  dtype=np.int64)  # [宽, 高]
+        # 每个类别的最大 IoU 直方图与累加值
+        self.class_iou_hist = np.zeros((0, len(IOU_BINS) - 1), dtype=np.int64)
+        self.class_iou_sum = np.zeros(0, dtype=np.float64)
+        self.class_iou_max = np.zeros(0, dtype=np.float64)
+        self.issue_totals: Dict[str, int] = {}
+
+    def add(self, anno: AnnotationFile, iou: Optional[np.ndarray] = None):
+        """累加单个标注文件，iou 为已计算好的 IoU 矩阵(可选)"""
+        class_ids, xywh = anno.to_arrays()
+        n = len(class_ids)
+
+        self.num_images += 1
+        self.num_boxes += n
+        self.boxes_per_image = _grow(self.boxes_per_image, n + 1)
+        self.boxes_per_image[n] += 1
+        if n == 0:
+            return
+
+        # 负数类别无法作为下标，按类别统计时忽略
+        valid = class_ids >= 0
+        ids = class_ids[valid]
+        num_classes = int(ids.max()) + 1 if len(ids) else 0
+        self._ensure_classes(num_classes)
+        self.class_boxes[:num_classes] += np.bincount(ids, minlength=num_classes)
+        self.class_images[np.unique(ids)] += 1
+
+        # 面积和宽高直方图
+        w = xywh[:, 2]
+        h = xywh[:, 3]
+        self.area_hist += np.histogram(np.clip(w * h, 0.0, 1.0), bins=AREA_BINS)[0]
+        self.size_hist += np.histogram2d(np.clip(w, 0.0, 1.0), np.clip(h, 0.0, 1.0),
+                                         bins=(SIZE_BINS, SIZE_BINS))[0].astype(np.int64)
+
+        # 每个框与其他框的最大 IoU
+        if iou is None:
+            iou = iou_matrix(xywh_to_xyxy(xywh))
+        if n > 1:
+            masked = iou.copy()
+            np.fill_diagonal(masked, 0.0)
+            max_iou = masked.max(axis=1)[valid]
+        else:
+            max_iou = np.zeros(len(ids))
+        bin_idx = np.clip(np.digitize(max_iou, IOU_BINS) - 1, 0, len(IOU_BINS) - 2)
+        np.add.at(self.class_iou_hist, (ids, bin_idx), 1)
+        np.add.at(self.class_iou_sum, ids, max_iou)
+        np.maximum.at(self.class_iou_max, ids, max_iou)
+
+    def add_issues(self, issues: Dict[str, list]):
+        """累加检查结果中的问题数量"""
+        for key, items in issues.items():
+            self.issue_totals[key] = self.issue_totals.get(key, 0) + len(items)
+
+    def merge(self, other: 'DatasetStats') -> 'DatasetStats':
+        """合并另一个分片的统计结果到自身(分布式检查使用)"""
+        self.num_images += other.num_images
+        self.num_boxes += other.num_boxes
+        self._ensure_classes(len(other.class_boxes))
+        n = len(other.class_boxes)
+        self.class_boxes[:n] += other.class_boxes
+        self.class_images[:n] += other.class_images
+        self.class_iou_hist[:n] += other.class_iou_hist
+        self.class_iou_sum[:n] += other.class_iou_sum
+        np.maximum(self.class_iou_max[:n], other.class_iou_max,
+                   out=self.class_iou_max[:n])
+        self.boxes_per_image = _grow(self.boxes_per_image, len(other.boxes_per_image))
+        self.boxes_per_image[:len(other.boxes_per_image)] += other.boxes_per_image
+        self.area_hist += other.area_hist
+        self.size_hist += other.size_hist
+        for key, count in other.issue_totals.items():
+            self.issue_totals[key] = self.issue_totals.get(key, 0) + count
+        return self
+
+    def _ensure_classes(self, num_classes: int):
+        """确保按类别统计的数组足够长"""
+        self.class_boxes = _grow(self.class_boxes, num_classes)
+        self.class_images = _grow(self.class_images, num_classes)
+        self.class_iou_sum = _grow(self.class_iou_sum, num_classes)
+        self.class_iou_max = _grow(self.class_iou_max, num_classes)
+        self.class_iou_hist = _grow_rows(self.class_iou_hist, num_classes)
+
+    def class_rows(self, label_names: Optional[List[str]] = None) -> List[dict]:
+        """按类别整理的统计表"""
+        rows = []
+        for class_id in range(len(self.class_boxes)):
+            boxes = int(self.class_boxes[class_id])
+            if label_names and class_id < len(label_names):
+                name = label_names[class_id]
+            else:
+                name = str(class_id)
+            rows.append({
+                'class_id': class_id,
+                'name': name,
+                'boxes': boxes,
+                'images': int(self.class_images[class_id]),
+                'mean_max_iou': float(self.class_iou_sum[class_id] / boxes) if boxes else 0.0,
+                'max_iou': float(self.class_iou_max[class_id]),
+            })
+        return rows
+
+    def to_dict(self, label_names: Optional[List[str]] = None) -> dict:
+        """转换为可序列化的字典"""
+        return {
+            'num_images': self.num_images,
+            'num_boxes': self.num_boxes,
+            'issue_totals': dict(self.issue_totals),
+            'classes': self.class_rows(label_names),
+            'boxes_per_image': self.boxes_per_image.tolist(),
+            'area_bins': AREA_BINS.tolist(),
+            'area_hist': self.area_hist.tolist(),
+            'size_bins': SIZE_BINS.tolist(),
+            'size_hist': self.size_hist.tolist(),
+            'iou_bins': IOU_BINS.tolist(),
+            'class_iou_hist': self.class_iou_hist.tolist(),
+        }
+
+    def export(self, path: str, label_names: Optional[List[str]] = None):
+        """导出统计结果，.csv 导出类别表，其余导出完整 JSON"""
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(["类别ID", "类别", "框数", "图片数", "平均最大IoU", "最大IoU"])
+                for row in self.class_rows(label_names):
+                    writer.writerow([row['class_id'], row['name'], row['boxes'],
+                                     row['images'], f"{row['mean_max_iou']:.4f}",
+                                     f"{row['max_iou']:.4f}"])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(label_names), f, ensure_ascii=False, indent=2)
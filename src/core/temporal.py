@@ -0,0 +1,139 @@
+import re
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from .annotation import xywh_to_xyxy, iou_matrix
+
+# 文件名末尾的数字为帧号，之前的部分为序列名，例如 video01_000123 -> ("video01_", 123)
+FRAME_PATTERN = re.compile(r'^(.*?)(\d+)$')
+DEFAULT_IOU_THRESHOLD = 0.3  # 相邻帧之间目标会移动，阈值低于重叠检查
+DEFAULT_MAX_GAP = 1  # 帧号相差超过该值视为不连续
+
+Frame = Tuple[np.ndarray, np.ndarray]  # (class_ids, xywh)
+
+
+def frame_key(path: str) -> Optional[Tuple[str, int]]:
+    """从文件名解析 (序列名, 帧号)，没有数字后缀时返回 None"""
+    match = FRAME_PATTERN.match(Path(path).stem)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def group_sequences(paths: Iterable[str]) -> Dict[str, List[Tuple[int, int]]]:
+    """按序列名分组，返回 序列名 -> [(帧号, 下标)]，组内按帧号排序；只含一帧的序列被丢弃"""
+    groups: Dict[str, List[Tuple[int, int]]] = {}
+    for index, path in enumerate(paths):
+        key = frame_key(path)
+        if key is not None:
+            groups.setdefault(key[0], []).append((key[1], index))
+    return {name: sorted(frames) for name, frames in groups.items() if len(frames) > 1}
+
+
+def match_by_iou(a: np.ndarray, b: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """两组中心格式框的一一匹配：IoU 矩阵向量化计算后按 IoU 从高到低贪心分配，返回匹配的 (下标a, 下标b)"""
+    if len(a) == 0 or len(b) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    iou = iou_matrix(xywh_to_xyxy(a), xywh_to_xyxy(b))
+    ia, ib = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[ia, ib], kind='stable')
+    free_a = np.ones(len(a), dtype=bool)
+    free_b = np.ones(len(b), dtype=bool)
+    keep = []
+    for k in order.tolist():
+        i, j = ia[k], ib[k]
+        if free_a[i] and free_b[j]:
+            free_a[i] = free_b[j] = False
+            keep.append(k)
+    return ia[keep], ib[keep]
+
+
+class TemporalIssues:
+    """一帧的时序问题"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.dropouts: List[int] = []  # 前一帧中在本帧消失、在后一帧又出现的框
+        self.switches: List[Tuple[int, int, int]] = []  # (本帧框下标, 前一帧类别, 本帧类别)
+
+    def __bool__(self) -> bool:
+        return bool(self.dropouts or self.switches)
+
+    def summary(self) -> str:
+        parts = []
+        if self.dropouts:
+            parts.append(f"{len(self.dropouts)} 个框在本帧缺失")
+        if self.switches:
+            parts.append(f"{len(self.switches)} 个框类别与前一帧不同")
+        return "; ".join(parts)
+
+
+def find_dropouts(prev: Frame, cur: Frame, nxt: Frame, threshold: float) -> List[int]:
+    """前一帧与后一帧中匹配(同类别)，但在本帧都没有对应框的目标，返回其在前一帧中的下标"""
+    pa, pn = match_by_iou(prev[1], nxt[1], threshold)
+    same_class = prev[0][pa] == nxt[0][pn]
+    pa, pn = pa[same_class], pn[same_class]
+    if len(pa) == 0:
+        return []
+    matched_prev = np.zeros(len(prev[0]), dtype=bool)
+    matched_next = np.zeros(len(nxt[0]), dtype=bool)
+    matched_prev[match_by_iou(prev[1], cur[1], threshold)[0]] = True
+    matched_next[match_by_iou(cur[1], nxt[1], threshold)[1]] = True
+    missing = ~matched_prev[pa] & ~matched_next[pn]
+    return pa[missing].tolist()
+
+
+def find_switches(prev: Frame, cur: Frame, threshold: float) -> List[Tuple[int, int, int]]:
+    """与前一帧匹配但类别不同的框"""
+    ip, ic = match_by_iou(prev[1], cur[1], threshold)
+    changed = prev[0][ip] != cur[0][ic]
+    return list(zip(ic[changed].tolist(), prev[0][ip][changed].tolist(),
+                    cur[0][ic][changed].tolist()))
+
+
+def scan_sequence(frames: List[Tuple[int, int]], load: Callable[[int], Frame],
+                  threshold: float = DEFAULT_IOU_THRESHOLD,
+                  max_gap: int = DEFAULT_MAX_GAP,
+                  should_stop: Optional[Callable[[], bool]] = None) -> Iterator[TemporalIssues]:
+    """流式检查一个序列，内存中只保留相邻的三帧
+
+    frames 为按帧号排序的 (帧号, 下标)，load 按下标读取一帧。帧的类别切换在读入时即可判定，
+    框缺失需要读入后一帧才能判定，因此每读入一帧就产出前一帧的结果(只产出有问题的帧)。
+    """
+    window = deque(maxlen=3)  # (帧号, 数据, 问题)
+    for number, index in frames:
+        if should_stop and should_stop():
+            return
+        data = load(index)
+        if window and number - window[-1][0] > max_gap:
+            # 序列中断，之前的帧不再与之后的帧比较
+            if window[-1][2]:
+                yield window[-1][2]
+            window.clear()
+
+        issues = TemporalIssues(index)
+        if window:
+            issues.switches = find_switches(window[-1][1], data, threshold)
+        window.append((number, data, issues))
+        if len(window) == 3:
+            window[1][2].dropouts = find_dropouts(window[0][1], window[1][1], data, threshold)
+
+        # 读入新帧后，前一帧的问题已全部确定
+        if len(window) >= 2 and window[-2][2]:
+            yield window[-2][2]
+    if window and window[-1][2]:
+        yield window[-1][2]
+
+
+def scan_sequences(paths: List[str], load: Callable[[int], Frame],
+                   threshold: float = DEFAULT_IOU_THRESHOLD,
+                   max_gap: int = DEFAULT_MAX_GAP,
+                   should_stop: Optional[Callable[[], bool]] = None
+                   ) -> Iterator[TemporalIssues]:
+    """按帧号后缀分组后逐个序列检查，产出有问题的帧"""
+    for frames in group_sequences(paths).values():
+        if should_stop and should_stop():
+            return
+        yield from scan_sequence(frames, load, threshold, max_gap, should_stop)
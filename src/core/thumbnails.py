@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from .dataset import image_size
+from .file_cache import cache_path_for, file_signature
+
+THUMB_SIZE = 128  # 缩略图最长边
+JPEG_QUALITY = 85
+CROP_MARGIN = 0.1  # 框裁剪时每边外扩框尺寸的比例，保留少量上下文
+COMPACT_RATIO = 2  # 打包文件超过有效数据的该倍数时在打开时压缩
+
+
+def reduced_factor(extent: Optional[float], target: int) -> int:
+    """降采样解码的倍数(1、2、4、8)，使 extent 像素的内容解码后不小于 target"""
+    if extent is not None:
+        for factor in (8, 4, 2):
+            if extent // factor >= target:
+                return factor
+    return 1
+
+
+def reduced_flag(size: Optional[Tuple[int, int]], target: int, gray: bool = False) -> int:
+    """按图片尺寸选择降采样解码的倍数，使解码结果的最长边不小于 target"""
+    return decode_flag(reduced_factor(max(size) if size is not None else None, target), gray)
+
+
+def decode_flag(factor: int, gray: bool = False) -> int:
+    flags = {8: (cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+             4: (cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+             2: (cv2.IMREAD_REDUCED_COLOR_2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+             1: (cv2.IMREAD_COLOR, cv2.IMREAD_GRAYSCALE)}
+    return flags[factor][gray]
+
+
+def fit_size(width: int, height: int, target: int) -> Tuple[int, int]:
+    """等比缩放到最长边为 target(不放大)"""
+    scale = min(1.0, target / max(width, height, 1))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def make_thumbnail(data: bytes, size: Optional[Tuple[int, int]],
+                   target: int = THUMB_SIZE) -> Optional[bytes]:
+    """由图片文件内容生成 JPEG 缩略图，JPEG 在解码时直接按 1/2、1/4、1/8 降采样"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), reduced_flag(size, target))
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    image = cv2.resize(image, fit_size(width, height, target), interpolation=cv2.INTER_AREA)
+    return encode_jpeg(image)
+
+
+def encode_jpeg(image: np.ndarray) -> Optional[bytes]:
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return encoded.tobytes() if ok else None
+
+
+def thumbnail_job(image_path: str, target: int = THUMB_SIZE
+                  ) -> Tuple[str, Optional[list], Optional[str], Optional[bytes]]:
+    """进程池任务：返回条目名、文件签名、内容哈希和缩略图，无法读取时缩略图为 None"""
+    signature = file_signature(image_path)
+    name = os.path.basename(image_path)
+    try:
+        with open(image_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return name, signature, None, None
+    key = hashlib.sha1(data + str(target).encode()).hexdigest()
+    return name, signature, key, make_thumbnail(data, image_size(image_path), target)
+
+
+Box = Tuple[float, float, float, float]
+
+# 工作进程中最近一次解码的图片 (路径, 签名, 降采样倍数, 图片)，同一图片的多个框只解码一次
+_last_decoded: Optional[tuple] = None
+
+
+def crop_name(image_path: str, box: Box) -> str:
+    """框裁剪的缓存条目名，包含框坐标，框被修改后自然失效"""
+    return "{}@{:.6f},{:.6f},{:.6f},{:.6f}".format(os.path.basename(image_path), *box)
+
+
+def crop_region(box: Box, width: int, height: int) -> Tuple[int, int, int, int]:
+    """框(YOLO 归一化中心坐标)外扩 CROP_MARGIN 后的像素区域 (x1, y1, x2, y2)，至少 1 像素"""
+    x, y, w, h = box
+    w, h = w * (1 + 2 * CROP_MARGIN), h * (1 + 2 * CROP_MARGIN)
+    x1 = min(max(int((x - w / 2) * width), 0), width - 1)
+    y1 = min(max(int((y - h / 2) * height), 0), height - 1)
+    x2 = min(max(int(np.ceil((x + w / 2) * width)), x1 + 1), width)
+    y2 = min(max(int(np.ceil((y + h / 2) * height)), y1 + 1), height)
+    return x1, y1, x2, y2
+
+
+def decode_for_crop(image_path: str, signature: Optional[list], data: bytes,
+                    box: Box, target: int) -> Optional[np.ndarray]:
+    """按框的像素尺寸选择降采样倍数解码：大框按 1/2~1/8 解码，小框才解码全分辨率；
+    上次解码的同一图片分辨率足够时直接复用"""
+    global _last_decoded
+    size = image_size(image_path)
+    extent = max(box[2] * size[0], box[3] * size[1]) * (1 + 2 * CROP_MARGIN) if size else None
+    factor = reduced_factor(extent, target)
+    if _last_decoded is not None and _last_decoded[:2] == (image_path, signature) \
+            and _last_decoded[2] <= factor:
+        return _last_decoded[3]
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), decode_flag(factor))
+    _last_decoded = (image_path, signature, factor, image) if image is not None else None
+    return image
+
+
+def crop_job(image_path: str, box: Box, target: int = THUMB_SIZE
+             ) -> Tuple[str, Optional[list], Optional[str], Optional[bytes]]:
+    """进程池任务：裁剪一个标注框，返回值与 thumbnail_job 相同"""
+    signature = file_signature(image_path)
+    name = crop_name(image_path, box)
+    try:
+        with open(image_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return name, signature, None, None
+    key = hashlib.sha1(data + name.encode() + str(target).encode()).hexdigest()
+    image = decode_for_crop(image_path, signature, data, box, target)
+    if image is None:
+        return name, signature, key, None
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = crop_region(box, width, height)
+    crop = image[y1:y2, x1:x2]
+    crop = cv2.resize(crop, fit_size(x2 - x1, y2 - y1, target), interpolation=cv2.INTER_AREA)
+    return name, signature, key, encode_jpeg(crop)
+
+
+class ThumbnailStore:
+    """按内容寻址的缩略图缓存
+
+    缩略图追加写入数据目录缓存中的一个打包文件，索引记录 条目名 -> (文件签名, 内容哈希) 和
+    内容哈希 -> (偏移, 长度)；内容相同的图片共用一份缩略图，图片变化后按签名失效。
+    条目名默认为图片文件名，框裁剪等派生图使用包含参数的条目名(见 crop_name)。
+    读取(界面线程)和写入(生成线程)使用各自的文件句柄，先写数据再更新索引；
+    读取句柄的定位和读取在锁内完成(Windows 没有 os.pread)。
+    """
+
+    def __init__(self, directory: str, name: str = "thumbnails"):
+        self.pack_path = cache_path_for(directory, name + ".pack")
+        self.index_path = cache_path_for(directory, name + ".json")
+        self.files: Dict[str, list] = {}
+        self.blobs: Dict[str, list] = {}
+        self.dirty = False
+        os.makedirs(os.path.dirname(self.pack_path), exist_ok=True)
+        self.load()
+        self._writer = open(self.pack_path, 'ab')
+        self._reader = open(self.pack_path, 'rb', buffering=0)  # 不缓冲，始终读到生成线程追加的数据
+        self._read_lock = threading.Lock()
+
+    def load(self):
+        """加载索引，打包文件缺失或短于索引记录时丢弃索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.files, self.blobs = index['files'], index['blobs']
+        except Exception:
+            self.files, self.blobs = {}, {}
+        pack_size = os.path.getsize(self.pack_path) if os.path.exists(self.pack_path) else 0
+        if any(offset + length > pack_size for offset, length in self.blobs.values()):
+            self.files, self.blobs = {}, {}
+        if not self.blobs:
+            open(self.pack_path, 'wb').close()
+        elif pack_size > COMPACT_RATIO * sum(length for _, length in self.blobs.values()):
+            self.compact()
+
+    def compact(self):
+        """只保留仍被引用的缩略图，重写打包文件"""
+        live = {entry[1] for entry in self.files.values()}
+        tmp_path = self.pack_path + ".tmp"
+        blobs = {}
+        with open(self.pack_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for key in live & set(self.blobs):
+                offset, length = self.blobs[key]
+                src.seek(offset)
+                blobs[key] = [dst.tell(), length]
+                dst.write(src.read(length))
+        os.replace(tmp_path, self.pack_path)
+        self.blobs = blobs
+        self.files = {name: entry for name, entry in self.files.items() if entry[1] in blobs}
+        self.dirty = True
+        self.save()
+
+    def get(self, image_path: str, name: Optional[str] = None) -> Optional[bytes]:
+        """读取缩略图，未缓存或图片已变化时返回 None"""
+        entry = self.files.get(name or os.path.basename(image_path))
+        if entry is None or entry[0] != file_signature(image_path):
+            return None
+        blob = self.blobs.get(entry[1])
+        if blob is None:
+            return None
+        with self._read_lock:
+            self._reader.seek(blob[0])
+            return self._reader.read(blob[1])
+
+    def put(self, name: str, signature: list, key: str, data: bytes):
+        """写入缩略图，内容已存在时只更新条目索引"""
+        if key not in self.blobs:
+            offset = self._writer.tell()
+            self._writer.write(data)
+            self._writer.flush()
+            self.blobs[key] = [offset, len(data)]
+        self.files[name] = [signature, key]
+        self.dirty = True
+
+    def save(self):
+        """保存索引(先写临时文件再替换)"""
+        if not self.dirty:
+            return
+        try:
+            tmp_file = self.index_path + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'files': self.files, 'blobs': self.blobs}, f)
+            os.replace(tmp_file, self.index_path)
+            self.dirty = False
+        except Exception:
+            pass  # 缓存写入失败不影响使用
+
+    def close(self):
+        self.save()
+        self._writer.close()
+        self._reader.close()
@@ -0,0 +1,73 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+# 标签文件等不属于标注的文本文件
+IGNORED_FILES = {'classes.txt', 'labels.txt'}
+
+
+def snapshot_labels(directory: str) -> Dict[str, Tuple[int, int]]:
+    """记录目录中所有标注文件的 (修改时间, 大小)，只调用 stat 不读取内容"""
+    snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith('.txt') or name in IGNORED_FILES:
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                snapshot[name[:-4]] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        pass
+    return snapshot
+
+
+def diff_snapshots(old: Dict[str, Tuple[int, int]],
+                   new: Dict[str, Tuple[int, int]]) -> Tuple[Set[str], Set[str]]:
+    """比较两次快照，返回 (新增或修改的文件名, 删除的文件名)"""
+    changed = {name for name, sig in new.items() if old.get(name) != sig}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+class PollingWatcher:
+    """轮询方式的标注文件监视器，在不支持文件系统通知的环境中使用"""
+
+    def __init__(self, directory: str, callback: Callable[[Set[str], Set[str]], None],
+                 interval: float = 2.0, snapshot: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.directory = directory
+        self.callback = callback  # 在轮询线程中调用
+        self.interval = interval
+        self.snapshot = snapshot_labels(directory) if snapshot is None else snapshot
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> Tuple[Set[str], Set[str]]:
+        """执行一次轮询，有变化时调用回调"""
+        new_snapshot = snapshot_labels(self.directory)
+        changed, removed = diff_snapshots(self.snapshot, new_snapshot)
+        self.snapshot = new_snapshot
+        if changed or removed:
+            self.callback(changed, removed)
+        return changed, removed
+
+    def start(self):
+        """在后台线程中开始轮询"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止轮询"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
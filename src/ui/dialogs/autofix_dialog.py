@@ -0,0 +1,135 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox,
+                               QPushButton, QPlainTextEdit, QDoubleSpinBox, QMessageBox)
+from PySide6.QtCore import Signal
+from PySide6.QtGui import QFont
+from typing import Callable, List
+from core.autofix import FIX_NAMES, FIX_DEDUPE, DEFAULT_DEDUPE_IOU, summarize_fixes
+from ..workers import AutoFixWorker
+
+MAX_DIFF_FILES = 200  # 预览中最多显示的文件差异数
+
+
+class AutoFixDialog(QDialog):
+    """批量修复：先试运行显示差异，确认后再写入标注文件"""
+    fixes_applied = Signal(object)  # List[FileFix]
+
+    def __init__(self, parent=None, candidate_paths: Callable[[List[str], float], List[str]] = None,
+                 is_checking: Callable[[], bool] = None):
+        super().__init__(parent)
+        self.setWindowTitle("批量修复")
+        self.resize(720, 560)
+        self.candidate_paths = candidate_paths  # (操作, IoU 阈值) -> 需要处理的标注文件
+        self.is_checking = is_checking  # 检查进行中时不写入文件，避免与检查线程同时更新结果
+        self.worker = None
+        self.fixes = []
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 修复操作
+        self.op_checks = {}
+        for op, name in FIX_NAMES.items():
+            check = QCheckBox(name)
+            check.setChecked(True)
+            self.op_checks[op] = check
+            layout.addWidget(check)
+        iou_layout = QHBoxLayout()
+        iou_layout.addWidget(QLabel("重复框 IoU 阈值:"))
+        self.iou_spin = QDoubleSpinBox()
+        self.iou_spin.setRange(0.5, 1.0)
+        self.iou_spin.setSingleStep(0.01)
+        self.iou_spin.setValue(DEFAULT_DEDUPE_IOU)
+        iou_layout.addWidget(self.iou_spin)
+        iou_layout.addStretch()
+        layout.addLayout(iou_layout)
+
+        # 差异预览
+        self.summary_label = QLabel("点击“预览”查看将要进行的修改，预览不会修改文件")
+        layout.addWidget(self.summary_label)
+        self.diff_text = QPlainTextEdit()
+        self.diff_text.setReadOnly(True)
+        self.diff_text.setFont(QFont("Monospace"))
+        layout.addWidget(self.diff_text)
+
+        # 按钮
+        button_layout = QHBoxLayout()
+        self.preview_button = QPushButton("预览")
+        self.preview_button.clicked.connect(self.preview)
+        self.apply_button = QPushButton("应用修改")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.reject)
+        button_layout.addStretch()
+        button_layout.addWidget(self.preview_button)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+    def selected_ops(self) -> List[str]:
+        return [op for op, check in self.op_checks.items() if check.isChecked()]
+
+    def start_worker(self, worker: AutoFixWorker):
+        self.worker = worker
+        self.worker.progress.connect(
+            lambda done, total: self.summary_label.setText(f"正在处理: {done}/{total}"))
+        self.preview_button.setEnabled(False)
+        self.apply_button.setEnabled(False)
+        self.worker.finished.connect(lambda: self.preview_button.setEnabled(True))
+        self.worker.start()
+
+    def preview(self):
+        """试运行，生成修复计划和差异"""
+        ops = self.selected_ops()
+        if not ops:
+            return
+        iou = self.iou_spin.value() if FIX_DEDUPE in ops else DEFAULT_DEDUPE_IOU
+        worker = AutoFixWorker(self.candidate_paths(ops, iou), ops, iou)
+        worker.plan_ready.connect(self.on_plan_ready)
+        self.start_worker(worker)
+
+    def on_plan_ready(self, fixes: list):
+        """显示修复计划的概要和差异"""
+        self.fixes = fixes
+        totals = summarize_fixes(fixes)
+        parts = [f"{FIX_NAMES[op]} {n} 处" for op, n in totals.items()]
+        self.summary_label.setText(
+            f"{len(fixes)} 个文件需要修改" + (": " + ", ".join(parts) if parts else ""))
+        lines = []
+        for fix in fixes[:MAX_DIFF_FILES]:
+            lines.extend(fix.diff())
+        if len(fixes) > MAX_DIFF_FILES:
+            lines.append(f"... 还有 {len(fixes) - MAX_DIFF_FILES} 个文件")
+        self.diff_text.setPlainText('\n'.join(lines))
+        self.apply_button.setEnabled(bool(fixes))
+
+    def apply(self):
+        """确认后写入修改"""
+        if not self.fixes:
+            return
+        if self.is_checking and self.is_checking():
+            QMessageBox.information(self, "正在检查", "请等待检查完成后再应用修改")
+            return
+        reply = QMessageBox.question(self, "确认", f"将修改 {len(self.fixes)} 个标注文件，是否继续？")
+        if reply != QMessageBox.Yes:
+            return
+        worker = AutoFixWorker([], [], 0, self.fixes)
+        worker.fixes_applied.connect(self.on_fixes_applied)
+        self.start_worker(worker)
+
+    def on_fixes_applied(self, applied: list, skipped: list):
+        self.fixes = []
+        self.diff_text.clear()
+        message = f"已修改 {len(applied)} 个文件"
+        if skipped:
+            message += f"，{len(skipped)} 个文件在预览后被修改或无法写入，已跳过"
+        self.summary_label.setText(message)
+        self.fixes_applied.emit(applied)
+
+    def reject(self):
+        """关闭时停止试运行，正在应用的修改会等待完成"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.stop()
+            self.worker.wait()
+        super().reject()
@@ -0,0 +1,74 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                               QPushButton, QPlainTextEdit)
+from PySide6.QtGui import QFont
+from typing import Callable, Dict, List
+from core.remap import parse_mapping, build_mapping, DROP
+
+
+class RemapDialog(QDialog):
+    """类别重映射：编辑新的类别列表并填写合并/重命名规则，预览映射和受影响的文件数"""
+
+    def __init__(self, parent=None, labels: List[str] = None,
+                 count_files: Callable[[Dict[int, int]], str] = None):
+        super().__init__(parent)
+        self.setWindowTitle("类别重映射")
+        self.resize(560, 600)
+        self.labels = labels or []
+        self.count_files = count_files  # 映射 -> 受影响文件数的说明
+        self.new_names: List[str] = list(self.labels)
+        self.mapping: Dict[int, int] = {}
+        self.setup_ui()
+        self.update_preview()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("新的类别列表(每行一个，调整顺序即可重新编号，删除的类别其标注框也会被删除):"))
+        self.names_edit = QPlainTextEdit('\n'.join(self.labels))
+        self.names_edit.textChanged.connect(self.update_preview)
+        layout.addWidget(self.names_edit)
+
+        layout.addWidget(QLabel("合并/重命名规则(每行 \"旧类别 新类别\"，例如 \"van car\"):"))
+        self.rules_edit = QPlainTextEdit()
+        self.rules_edit.textChanged.connect(self.update_preview)
+        layout.addWidget(self.rules_edit)
+
+        self.preview_text = QPlainTextEdit()
+        self.preview_text.setReadOnly(True)
+        self.preview_text.setFont(QFont("Monospace"))
+        layout.addWidget(self.preview_text)
+
+        button_layout = QHBoxLayout()
+        self.btn_ok = QPushButton("应用")
+        self.btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("取消")
+        btn_cancel.clicked.connect(self.reject)
+        button_layout.addStretch()
+        button_layout.addWidget(self.btn_ok)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+
+    def update_preview(self):
+        """根据输入重新计算映射并显示"""
+        self.new_names = [line.strip() for line in self.names_edit.toPlainText().splitlines()
+                          if line.strip()]
+        rules = parse_mapping(self.rules_edit.toPlainText(), self.labels)
+        unknown = sorted(new for new in rules.values() if new not in self.new_names)
+        self.mapping = build_mapping(self.labels, self.new_names, rules)
+
+        lines = []
+        for old, new in self.mapping.items():
+            target = "删除" if new == DROP else f"{self.new_names[new]}({new})"
+            lines.append(f"{self.labels[old]}({old}) -> {target}")
+        added = [name for name in self.new_names
+                 if name not in self.labels and name not in rules.values()]
+        if added:
+            lines.append("新增类别: " + ", ".join(added))
+        if unknown:
+            lines.append("规则中的类别不在新列表中: " + ", ".join(unknown))
+        if self.mapping and self.count_files:
+            lines.append(self.count_files(self.mapping))
+        elif not self.mapping:
+            lines.append("类别 ID 没有变化")
+        self.preview_text.setPlainText('\n'.join(lines))
+        self.btn_ok.setEnabled(bool(self.new_names) and not unknown)
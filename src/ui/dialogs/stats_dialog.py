@@ -0,0 +1,94 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                               QPushButton, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QPlainTextEdit, QFileDialog)
+from PySide6.QtGui import QFont
+from datetime import datetime
+from typing import List
+from core.statistics import DatasetStats, AREA_BINS
+
+
+class StatsDialog(QDialog):
+    def __init__(self, parent=None, stats: DatasetStats = None, labels: List[str] = None):
+        super().__init__(parent)
+        self.setWindowTitle("数据集统计")
+        self.resize(640, 560)
+        self.stats = stats or DatasetStats()
+        self.labels = labels or []
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 概要信息
+        stats = self.stats
+        avg = stats.num_boxes / stats.num_images if stats.num_images else 0.0
+        summary = f"图片数: {stats.num_images}    标注框数: {stats.num_boxes}    平均每图: {avg:.2f}"
+        layout.addWidget(QLabel(summary))
+
+        # 类别统计表
+        headers = ["类别", "框数", "图片数", "平均最大IoU", "最大IoU"]
+        rows = stats.class_rows(self.labels)
+        self.class_table = QTableWidget(len(rows), len(headers))
+        self.class_table.setHorizontalHeaderLabels(headers)
+        self.class_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.class_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        for row, info in enumerate(rows):
+            values = [info['name'], str(info['boxes']), str(info['images']),
+                      f"{info['mean_max_iou']:.3f}", f"{info['max_iou']:.3f}"]
+            for col, value in enumerate(values):
+                self.class_table.setItem(row, col, QTableWidgetItem(value))
+        layout.addWidget(self.class_table)
+
+        # 分布直方图(文本条形图)
+        self.hist_text = QPlainTextEdit()
+        self.hist_text.setReadOnly(True)
+        self.hist_text.setFont(QFont("Monospace"))
+        self.hist_text.setPlainText(self.format_histograms())
+        layout.addWidget(self.hist_text)
+
+        # 按钮
+        button_layout = QHBoxLayout()
+        btn_export = QPushButton("导出")
+        btn_export.clicked.connect(self.export_stats)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.accept)
+        button_layout.addStretch()
+        button_layout.addWidget(btn_export)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+
+    @staticmethod
+    def format_bar(count: int, peak: int, width: int = 40) -> str:
+        """生成文本条形"""
+        if peak <= 0:
+            return ""
+        return "#" * max(1 if count else 0, round(count * width / peak))
+
+    def format_histograms(self) -> str:
+        """格式化面积分布和单图框数分布"""
+        stats = self.stats
+        lines = ["框面积分布(占整图比例):"]
+        peak = int(stats.area_hist.max()) if len(stats.area_hist) else 0
+        for i, count in enumerate(stats.area_hist):
+            lines.append(f"  {AREA_BINS[i]:>9.2e} - {AREA_BINS[i + 1]:<9.2e} "
+                         f"{int(count):>8} {self.format_bar(int(count), peak)}")
+
+        lines.append("")
+        lines.append("单图框数分布:")
+        peak = int(stats.boxes_per_image.max()) if len(stats.boxes_per_image) else 0
+        for n, count in enumerate(stats.boxes_per_image):
+            if count:
+                lines.append(f"  {n:>6} {int(count):>8} {self.format_bar(int(count), peak)}")
+        return "\n".join(lines)
+
+    def export_stats(self):
+        """导出统计结果"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "导出统计",
+            f"dataset_stats_{timestamp}.json",
+            "JSON Files (*.json);;CSV Files (*.csv)"
+        )
+        if file_path:
+            self.stats.export(file_path, self.labels)
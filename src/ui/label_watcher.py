@@ -0,0 +1,132 @@
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+import os
+from typing import Optional, Set
+from core.watch import PollingWatcher, snapshot_labels, diff_snapshots
+
+
+class LabelWatcher(QObject):
+    """监视目录中的标注文件变化，合并短时间内的连续修改后统一通知
+
+    文件太多或文件系统不支持通知时改为轮询，快照和对比在后台线程中进行，只把变化的文件名发回界面线程。
+    """
+    labels_changed = Signal(object, object)  # 修改或新增的文件名集合, 删除的文件名集合
+    polled = Signal(object, object)  # 轮询线程发现的变化，经队列连接转到界面线程
+
+    MAX_WATCHED_FILES = 4096  # 超过该数量时不再逐个监视文件，避免耗尽系统监视句柄
+    DEBOUNCE_MS = 300
+    POLL_INTERVAL_MS = 2000
+
+    def __init__(self, directory: str, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.snapshot = snapshot_labels(directory)
+        self.pending_changed: Set[str] = set()
+        self.pending_removed: Set[str] = set()
+        self.needs_diff = False  # 只收到目录事件时需要对比快照
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.flush)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.poller: Optional[PollingWatcher] = None
+        self.polled.connect(self.on_polled)
+
+        watching = self.watcher.addPath(directory)
+        if watching and len(self.snapshot) <= self.MAX_WATCHED_FILES:
+            self.watcher.addPaths([self.label_path(name) for name in self.snapshot])
+        else:
+            # 文件系统不支持通知(例如部分网络文件系统)，或文件太多无法逐个监视时改为轮询；
+            # 目录监视只报告新增和删除，不报告文件内容的原地修改
+            self.start_polling()
+
+    def start_polling(self):
+        """在后台线程中定时对比快照，不再逐个监视文件"""
+        if self.poller is None:
+            files = self.watcher.files()
+            if files:
+                self.watcher.removePaths(files)
+            self.poller = PollingWatcher(self.directory, self.polled.emit,
+                                         self.POLL_INTERVAL_MS / 1000, dict(self.snapshot))
+            self.poller.start()
+
+    @property
+    def polling(self) -> bool:
+        return self.poller is not None
+
+    def on_polled(self, changed: Set[str], removed: Set[str]):
+        """轮询线程发现的变化，与其他事件一起合并后通知"""
+        self.pending_changed |= changed
+        self.pending_removed |= removed
+        self.debounce_timer.start(self.DEBOUNCE_MS)
+
+    def label_path(self, name: str) -> str:
+        return os.path.join(self.directory, name + '.txt')
+
+    def stop(self):
+        """停止监视"""
+        self.debounce_timer.stop()
+        if self.poller is not None:
+            self.poller.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def on_file_changed(self, path: str):
+        """单个标注文件变化"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        if os.path.exists(path):
+            self.pending_changed.add(name)
+            # 以替换方式保存的文件会被移出监视列表，需要重新加入
+            if path not in self.watcher.files():
+                self.watcher.addPath(path)
+        else:
+            self.pending_removed.add(name)
+        self.debounce_timer.start(self.DEBOUNCE_MS)
+
+    def on_directory_changed(self, *args):
+        """目录内容变化(新增或删除)，轮询时由轮询线程发现"""
+        if self.polling:
+            return
+        self.needs_diff = True
+        self.debounce_timer.start(self.DEBOUNCE_MS)
+
+    def flush(self):
+        """发送合并后的变化"""
+        changed = self.pending_changed
+        removed = self.pending_removed
+        if self.needs_diff:
+            new_snapshot = snapshot_labels(self.directory)
+            diff_changed, diff_removed = diff_snapshots(self.snapshot, new_snapshot)
+            self.snapshot = new_snapshot
+            changed |= diff_changed
+            removed |= diff_removed
+            # 新增的文件加入监视，文件数超过上限后改为轮询
+            if not self.polling:
+                if len(new_snapshot) > self.MAX_WATCHED_FILES:
+                    self.start_polling()
+                else:
+                    watched = set(self.watcher.files())
+                    new_paths = [self.label_path(name) for name in diff_changed
+                                 if self.label_path(name) not in watched]
+                    if new_paths:
+                        self.watcher.addPaths(new_paths)
+        else:
+            for name in changed:
+                path = self.label_path(name)
+                try:
+                    st = os.stat(path)
+                    self.snapshot[name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
+            for name in removed:
+                self.snapshot.pop(name, None)
+
+        self.pending_changed = set()
+        self.pending_removed = set()
+        self.needs_diff = False
+        removed -= changed
+        if changed or removed:
+            self.labels_changed.emit(changed, removed)
@@ -3,25 +3,59 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QStatusBar, QSlider, QFileDialog, QTableWidgetItem,
                                QHeaderView, QGraphicsScene, QGraphicsRectItem,
                                QGraphicsTextItem, QMessageBox, QMenuBar, QMenu,
-                               QListWidget, QLabel, QListWidgetItem)
+                               QListWidget, QLabel, QListWidgetItem, QInputDialog,
+                               QLineEdit, QTabWidget, QComboBox)
 from PySide6.QtCore import Qt, QDir, QRectF, QTimer, QSettings
-from PySide6.QtGui import QColor, QImage, QPixmap, QPen, QPainter
+from PySide6.QtGui import QColor, QImage, QPixmap, QPen, QPainter, QKeySequence
 import os
 from pathlib import Path
 from typing import List, Dict, Optional
 import cv2
-from core.annotation import AnnotationFile, BBox
+import numpy as np
+import math
+from core.annotation import (AnnotationFile, BBox, QUAD_OBB, QUAD_POLYGON, get_quad_format,
+                             set_quad_format)
 from core.checker import AnnotationChecker
-from .workers import CheckWorker
+from core.rules import RULES, issue_counts, summarize_issues, box_types
+from core.compare import load_prediction
+from core.autofix import FIX_RULES, FIX_DEDUPE
+from core.remap import affected_rows, labels_path
+from core.converter import existing_labels
+from core.integrity import PROBLEM_NAMES
+from core.thumbnails import ThumbnailStore, THUMB_SIZE, crop_job, crop_name
+from core.statistics import DatasetStats
+from core.image_hash import DEFAULT_MAX_DISTANCE
+from core.dataset import scan_directory
+from core.issue_index import IssueIndex, ANY_ISSUE
+from core.class_index import ClassIndex
+from core.query import run_query, QueryError
+from core.packed_store import PackedLabelStore, default_store_path
+from core.profiling import TRACER, traced, span
+from core.daemon import DaemonClient, DEFAULT_PORT
+from .workers import (CheckWorker, DuplicateWorker, StoreBuildWorker, DaemonLoadWorker,
+                      TemporalWorker, RemapWorker, ConvertWorker, IntegrityWorker,
+                      ThumbnailWorker, GalleryWorker)
+from .label_watcher import LabelWatcher
 import csv
 from datetime import datetime
 import random
 import colorsys
 from .widgets.editable_box import EditableBox
+from .widgets.thumbnail_grid import ThumbnailGrid, ThumbnailModel
 from .dialogs.label_editor import LabelEditorDialog
+from .dialogs.stats_dialog import StatsDialog
+from .dialogs.autofix_dialog import AutoFixDialog
+from .dialogs.remap_dialog import RemapDialog
 
 
 class MainWindow(QMainWindow):
+    # 修饰键 + D/A 跳转到下一个/上一个有该问题的文件
+    ISSUE_NAV_KEYS = [
+        (Qt.ControlModifier, ANY_ISSUE, "问题文件"),
+        (Qt.ControlModifier | Qt.ShiftModifier, "overlaps", "重叠文件"),
+        (Qt.AltModifier, "invalid_labels", "无效标签文件"),
+    ]
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("YOLO 标注检查工具")
@@ -47,6 +81,11 @@ class MainWindow(QMainWindow):
         toolbar_layout.addWidget(self.btn_select_labels)
         toolbar_layout.addWidget(self.btn_export)
 
+        # 筛选框，例如 class == 7 and boxes > 50
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("筛选: class == 7 and boxes > 50，min_area < 0.01，overlaps")
+        self.query_edit.setClearButtonEnabled(True)
+
         # 创建文件列表
         self.file_table = QTableWidget()
         self.setup_file_table()
@@ -63,6 +102,7 @@ class MainWindow(QMainWindow):
 
         # 添加到左侧布局
         left_layout.addLayout(toolbar_layout)
+        left_layout.addWidget(self.query_edit)
         left_layout.addWidget(self.file_table)
         left_layout.addLayout(threshold_layout)
 
@@ -72,7 +112,32 @@ class MainWindow(QMainWindow):
         self.preview_scene = QGraphicsScene()
         self.preview_view.setScene(self.preview_scene)
         self.preview_view.setRenderHint(QPainter.Antialiasing)
-        middle_layout.addWidget(self.preview_view)
+
+        # 缩略图网格，与预览以标签页切换
+        self.thumbnail_model = ThumbnailModel(self.thumbnail_lookup, self.thumbnail_caption,
+                                              self.thumbnail_overlay, self.thumbnail_background)
+        self.thumbnail_grid = ThumbnailGrid(self.thumbnail_model, THUMB_SIZE)
+        self.view_tabs = QTabWidget()
+        self.view_tabs.addTab(self.preview_view, "预览")
+        self.view_tabs.addTab(self.thumbnail_grid, "缩略图")
+
+        # 类别画廊：逐个显示某一类别全部标注框的裁剪
+        self.gallery_model = ThumbnailModel(self.crop_lookup, self.crop_caption,
+                                            background=lambda item: self.thumbnail_background(item[0]))
+        self.gallery_grid = ThumbnailGrid(self.gallery_model, THUMB_SIZE)
+        self.gallery_class_combo = QComboBox()
+        self.gallery_count_label = QLabel()
+        self.gallery_tab = QWidget()
+        gallery_layout = QVBoxLayout(self.gallery_tab)
+        gallery_layout.setContentsMargins(0, 0, 0, 0)
+        gallery_bar = QHBoxLayout()
+        gallery_bar.addWidget(QLabel("类别:"))
+        gallery_bar.addWidget(self.gallery_class_combo, 1)
+        gallery_bar.addWidget(self.gallery_count_label)
+        gallery_layout.addLayout(gallery_bar)
+        gallery_layout.addWidget(self.gallery_grid)
+        self.view_tabs.addTab(self.gallery_tab, "类别画廊")
+        middle_layout.addWidget(self.view_tabs)
 
         # 创建右侧布局（类别列表）
         right_layout = QVBoxLayout()
@@ -117,6 +182,31 @@ class MainWindow(QMainWindow):
         self.label_names: List[str] = []
         self.checker = AnnotationChecker()
         self.check_worker: Optional[CheckWorker] = None
+        self.check_generation = 0  # 每次开始或取消检查时递增，旧检查的结果会被丢弃
+        self.retired_workers: List[CheckWorker] = []  # 已取消但尚未结束的检查线程
+        self.stale_stores: List[PackedLabelStore] = []  # 等待旧检查线程结束后再关闭的打包库
+        self.dataset_stats: Optional[DatasetStats] = None
+        self.duplicate_worker: Optional[DuplicateWorker] = None
+        self.temporal_worker: Optional[TemporalWorker] = None
+        self.remap_worker: Optional[RemapWorker] = None
+        self.convert_worker: Optional[ConvertWorker] = None
+        self.integrity_worker: Optional[IntegrityWorker] = None
+        self.thumbnail_store: Optional[ThumbnailStore] = None  # 切换到缩略图网格时才打开
+        self.thumbnail_worker: Optional[ThumbnailWorker] = None
+        self.crop_store: Optional[ThumbnailStore] = None  # 类别画廊的框裁剪缓存
+        self.crop_worker: Optional[ThumbnailWorker] = None
+        self.gallery_worker: Optional[GalleryWorker] = None
+        self.gallery_boxes: Dict[tuple, tuple] = {}  # (行, 框下标) -> 框坐标
+        self.row_issues: Dict[int, Dict[str, int]] = {}  # row -> {rule_name: count}
+        self.issue_totals: Dict[str, int] = {}  # 所有行的问题数之和，随每行结果增量更新
+        self.issue_index = IssueIndex()  # 按问题类型记录有问题的行，用于快速跳转和过滤
+        self.class_index = ClassIndex()  # 每个文件的类别和框属性，用于重新计算无效标签和筛选
+        self.query_mask: Optional[np.ndarray] = None  # 筛选框匹配的行，未筛选时为 None
+        self.label_watcher: Optional[LabelWatcher] = None
+        self.daemon_client: Optional[DaemonClient] = None  # 连接检查服务时作为瘦客户端
+        self.daemon_worker: Optional[DaemonLoadWorker] = None
+        self.label_store: Optional[PackedLabelStore] = None
+        self.store_worker: Optional[StoreBuildWorker] = None
         self.auto_save = False
         self.has_changes = False
         self.current_box = None
@@ -133,6 +223,12 @@ class MainWindow(QMainWindow):
 
         # 从设置中加载自动保存选项
         self.auto_save = self.settings.value("auto_save", False, type=bool)
+        self.auto_save_action.setChecked(self.auto_save)
+        self.watch_labels = self.settings.value("watch_labels", False, type=bool)
+        self.watch_action.setChecked(self.watch_labels)
+        quad_format = self.settings.value("quad_format", QUAD_OBB)
+        set_quad_format(quad_format if quad_format in (QUAD_OBB, QUAD_POLYGON) else QUAD_OBB)
+        self.quad_polygon_action.setChecked(get_quad_format() == QUAD_POLYGON)
 
         # 添加标签颜色字典
         self.label_colors = {}
@@ -197,7 +293,17 @@ class MainWindow(QMainWindow):
         self.btn_refresh.clicked.connect(self.refresh_check)
         self.threshold_slider.valueChanged.connect(self.threshold_changed)
         self.file_table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.file_table.verticalScrollBar().valueChanged.connect(self.schedule_priority_update)
         self.category_list.itemClicked.connect(self.on_category_selected)
+        self.query_edit.returnPressed.connect(self.run_file_query)
+        self.view_tabs.currentChanged.connect(self.on_view_tab_changed)
+        self.thumbnail_model.thumbnails_wanted.connect(self.request_thumbnails)
+        self.thumbnail_grid.item_activated.connect(self.open_thumbnail_row)
+        self.gallery_class_combo.currentIndexChanged.connect(self.start_gallery)
+        self.gallery_model.thumbnails_wanted.connect(self.request_crops)
+        self.gallery_grid.item_activated.connect(self.open_gallery_box)
+        self.query_edit.textChanged.connect(
+            lambda text: self.run_file_query() if not text else None)
 
     def select_directory(self):
         """选择数据目录"""
@@ -232,10 +338,52 @@ class MainWindow(QMainWindow):
         if file_path:
             # 保存选择的目录
             self.settings.setValue("last_labels_directory", str(Path(file_path).parent))
+            old_overrides = dict(self.checker.pair_overrides)
             self.load_labels_file(file_path)
+            self.revalidate_labels(old_overrides)
+
+    def revalidate_labels(self, old_overrides: Dict):
+        """更换标签文件后更新无效标签结果，使用检查时记录的类别，不重新读取标注文件"""
+        if not self.row_issues or self.daemon_client is not None:
+            return
+        if self.checker.pair_overrides != old_overrides or self.is_checking():
+            # 类别对阈值也变了或检查尚未完成时重新检查
+            self.refresh_check()
+            return
+
+        key = 'invalid_labels'
+        invalid = self.class_index.invalid_counts(self.checker.max_class_id)
+        old = np.zeros_like(invalid)
+        for row in self.issue_index.rows(key):
+            old[row] = self.row_issues[row][key]
+        changed = np.flatnonzero((invalid != old) & self.class_index.known)
+        for row in changed.tolist():
+            counts = dict(self.row_issues.get(row, {}))
+            if invalid[row]:
+                counts[key] = int(invalid[row])
+            else:
+                counts.pop(key, None)
+            self.apply_issue_counts(row, counts)
 
+        if self.dataset_stats is not None:
+            self.dataset_stats.issue_totals[key] = int(invalid.sum())
+        self.update_status_counts()
+        if self.current_image and not self.has_changes:
+            self.load_preview(self.current_image)
+        self.statusBar.showMessage(f"已按新标签重新计算无效标签，{len(changed)} 个文件状态改变")
+
+    @traced("MainWindow.load_directory")
     def load_directory(self, path: str):
         """加载目录中的图片和标注文件"""
+        self.daemon_client = None
+        self.retire_check_worker()
+        self.stop_integrity_worker()
+        self.stop_duplicate_worker()
+        self.stop_temporal_worker()
+        self.close_thumbnails()
+        self.checker.image_problems = {}
+        self.checker.duplicate_images = {}
+        self.checker.temporal_issues = {}
         self.current_dir = path
         self.image_files.clear()
         self.annotation_files.clear()
@@ -244,6 +392,9 @@ class MainWindow(QMainWindow):
         self.preview_scene.clear()
         self.current_image = None
         self.current_annotation = None
+        self.dataset_stats = None
+        self.row_issues.clear()
+        self.issue_totals.clear()
 
         # 检查并加载 classes.txt
         classes_file = Path(path) / "classes.txt"
@@ -251,21 +402,40 @@ class MainWindow(QMainWindow):
             self.load_labels_file(str(classes_file))
 
         # 获取所有文件
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
-        for file in Path(path).iterdir():
-            if file.suffix.lower() in image_extensions:
-                # 查找对应的标注文件
-                anno_path = file.with_suffix('.txt')
-                if anno_path.exists():
-                    self.image_files.append(str(file))
-                    self.annotation_files[file.stem] = str(anno_path)
+        with span("scan_directory"):
+            image_files, annotation_files = scan_directory(path)
+        self.image_files.extend(image_files)
+        self.annotation_files.update(annotation_files)
+
+        # 目录下已有打包标注库时直接使用
+        self.close_label_store()
+        store_path = default_store_path(path)
+        stale, store_error = [], ""
+        if os.path.exists(store_path):
+            try:
+                self.label_store = PackedLabelStore(store_path)
+                # 库构建后被修改的标注文件(应用关闭期间、未开启监视或导入转换写入的)按标注文件更新
+                stale = self.label_store.refresh(self.annotation_files)
+            except Exception as e:
+                self.close_label_store()
+                store_error = str(e)
 
         self.update_file_table()
-        self.statusBar.showMessage(f"已加载 {len(self.image_files)} 个文件")
+        self.update_label_watcher()
+        message = f"已加载 {len(self.image_files)} 个文件"
+        if stale:
+            message += f"，打包标注库中 {len(stale)} 个过期文件已按标注文件更新"
+        if store_error:
+            message += f"；打包标注库无法使用: {store_error}"
+        self.statusBar.showMessage(message)
+        self.check_integrity()
 
     def update_file_table(self):
         """更新文件列表显示"""
         self.file_table.setRowCount(len(self.image_files))
+        self.issue_index = IssueIndex(len(self.image_files))
+        self.class_index = ClassIndex(len(self.image_files))
+        self.query_mask = None
 
         for row, image_path in enumerate(sorted(self.image_files)):
             # 文件名
@@ -282,6 +452,8 @@ class MainWindow(QMainWindow):
             detail_item = QTableWidgetItem("")
             self.file_table.setItem(row, 2, detail_item)
 
+        self.apply_row_filter()
+
     def set_row_status(self, row: int, status: str, details: str = "", color: QColor = None):
         """设置指定行的状态和颜色"""
         if 0 <= row < self.file_table.rowCount():
@@ -323,7 +495,10 @@ class MainWindow(QMainWindow):
                         int(rgb[2] * 255)
                     )
 
-            self.statusBar.showMessage(f"已加载 {len(self.label_names)} 个标签")
+            message = f"已加载 {len(self.label_names)} 个标签"
+            if self.checker.pair_overrides:
+                message += f"，{len(self.checker.pair_overrides)} 条类别对重叠阈值"
+            self.statusBar.showMessage(message)
         except Exception as e:
             self.statusBar.showMessage(f"加载标签文件失败: {str(e)}")
 
@@ -370,39 +545,814 @@ class MainWindow(QMainWindow):
             self.statusBar.showMessage("没有加载任何文件")
             return
 
-        # 如果已有正在运行的检查任务，先停止它
-        if self.check_worker and self.check_worker.isRunning():
-            self.check_worker.stop()
-            self.check_worker.wait()
+        # 连接检查服务时由服务端使用常驻内存的数据重新检查
+        if self.daemon_client is not None:
+            self.checker.overlap_threshold = self.threshold_slider.value() / 100.0
+            self.request_daemon_files(check=True)
+            return
+
+        # 如果已有正在运行的检查任务，通知它停止，不等待结束
+        self.retire_check_worker()
 
         # 更新检查器的阈值
         self.checker.overlap_threshold = self.threshold_slider.value() / 100.0
 
-        # 创建并启动工作线程
+        # 创建并启动工作线程，线程使用检查器的副本，界面修改阈值或标签不影响正在进行的检查
         self.check_worker = CheckWorker(
-            self.image_files,
-            self.annotation_files,
-            self.checker
+            list(self.image_files),
+            dict(self.annotation_files),
+            self.checker.snapshot(),
+            self.label_store,
+            self.check_generation,
+            self.class_index
         )
         self.check_worker.progress.connect(self.update_check_progress)
-        self.check_worker.finished.connect(self.on_check_finished)
-
-        # 用相关控件
-        self.btn_refresh.setEnabled(False)
-        self.threshold_slider.setEnabled(False)
+        self.check_worker.stats_ready.connect(self.on_stats_ready)
+        self.check_worker.check_finished.connect(self.on_check_finished)
         self.statusBar.showMessage("正在检查...")
 
         self.check_worker.start()
+        self.update_check_priority()
+
+    def retire_check_worker(self):
+        """取消当前检查：递增代号使其结果失效，线程在后台结束后再释放"""
+        self.check_generation += 1
+        worker, self.check_worker = self.check_worker, None
+        if worker is None:
+            return
+        worker.stop()
+        self.retired_workers.append(worker)
+        worker.finished.connect(self.on_worker_retired)
+        if not worker.isRunning():
+            self.on_worker_retired(worker)
+
+    def on_worker_retired(self, worker: Optional[CheckWorker] = None):
+        """已取消的检查线程结束后释放它，并关闭不再使用的打包库"""
+        worker = worker or self.sender()
+        if worker not in self.retired_workers:
+            return
+        self.retired_workers.remove(worker)
+        for store in list(self.stale_stores):
+            if not any(w.label_store is store for w in self.retired_workers):
+                store.close()
+                self.stale_stores.remove(store)
+
+    def is_checking(self) -> bool:
+        """是否有检查线程(包括已取消但尚未结束的)在运行"""
+        return bool(self.retired_workers) or bool(
+            self.check_worker and self.check_worker.isRunning())
+
+    def schedule_priority_update(self, *args):
+        """滚动或切换文件时延迟更新检查优先级，避免频繁调用"""
+        if not hasattr(self, '_priority_timer'):
+            self._priority_timer = QTimer(self)
+            self._priority_timer.setSingleShot(True)
+            self._priority_timer.timeout.connect(self.update_check_priority)
+        self._priority_timer.start(30)
+
+    def visible_rows(self) -> List[int]:
+        """文件列表中当前可见的行"""
+        if self.file_table.rowCount() == 0:
+            return []
+        first = self.file_table.rowAt(0)
+        last = self.file_table.rowAt(self.file_table.viewport().height() - 1)
+        if first < 0:
+            return []
+        if last < 0:
+            last = self.file_table.rowCount() - 1
+        return list(range(first, last + 1))
+
+    def update_check_priority(self):
+        """让检查线程优先检查当前预览的文件和可见的行"""
+        if not (self.check_worker and self.check_worker.isRunning()):
+            return
+        rows = self.visible_rows()
+        current = self.file_table.currentRow()
+        if current >= 0:
+            rows.insert(0, current)
+        self.check_worker.set_priority_rows(rows)
 
-    def update_check_progress(self, row: int, status: str, details: str, color: str):
+    def update_check_progress(self, generation: int, row: int, counts: Dict[str, int]):
         """更新检查进度"""
+        if generation != self.check_generation:
+            return  # 已被新检查取代的旧结果
+        self.apply_issue_counts(row, self.with_image_problem(row, counts))
+
+    def apply_issue_counts(self, row: int, counts: Dict[str, int]):
+        """记录某行的检查结果并更新显示"""
+        # 增量更新问题总数
+        for name, n in self.row_issues.get(row, {}).items():
+            self.issue_totals[name] = self.issue_totals.get(name, 0) - n
+        for name, n in counts.items():
+            self.issue_totals[name] = self.issue_totals.get(name, 0) + n
+        self.row_issues[row] = counts
+        self.issue_index.update(row, counts)
+        if self.issue_filter_action.isChecked() or self.query_mask is not None:
+            self.file_table.setRowHidden(row, not self.row_visible(row))
+        status, details, color = summarize_issues(counts, self.issue_notes(row, counts))
         self.set_row_status(row, status, details, QColor(color))
+        self.thumbnail_model.refresh(row)
+
+    def issue_notes(self, row: int, counts: Dict[str, int]) -> Dict[str, str]:
+        """代替默认模板的详情文字：重复图片显示所在的重复组"""
+        group = self.checker.duplicate_images.get(Path(self.image_files[row]).stem)
+        if not counts.get('duplicate_images') or group is None:
+            return {}
+        group_index, others = group
+        return {'duplicate_images': f"重复组 {group_index}: 共 {len(others) + 1} 张相似图片"}
+
+    def on_stats_ready(self, generation: int, stats: DatasetStats):
+        """保存检查过程中顺带统计的数据集信息"""
+        if generation == self.check_generation:
+            self.dataset_stats = stats
+
+    def show_stats(self):
+        """显示数据集统计面板"""
+        if self.dataset_stats is None:
+            self.statusBar.showMessage("请先完成一次检查")
+            return
+        dialog = StatsDialog(self, self.dataset_stats, self.label_names)
+        dialog.exec()
+
+    def close_label_store(self):
+        """关闭当前的打包标注库"""
+        store, self.label_store = self.label_store, None
+        if store is None:
+            return
+        if self.temporal_worker is not None and self.temporal_worker.label_store is store:
+            self.stop_temporal_worker()
+        if any(w.label_store is store for w in self.retired_workers):
+            self.stale_stores.append(store)  # 旧检查线程仍在读取，结束后再关闭
+        else:
+            store.close()
+
+    def open_annotation(self, image_name: str) -> AnnotationFile:
+        """读取标注，有打包标注库时不再打开标注文件"""
+        anno_path = self.annotation_files[image_name]
+        annotation = (self.label_store.annotation(image_name, anno_path)
+                      if self.label_store is not None else None)
+        return annotation if annotation is not None else AnnotationFile(anno_path)
+
+    def build_label_store(self):
+        """从当前目录的标注文件构建打包标注库"""
+        if not self.annotation_files:
+            self.statusBar.showMessage("没有加载任何文件")
+            return
+        if self.store_worker and self.store_worker.isRunning():
+            return
+
+        # 正在检查时等待结束，替换库文件前必须先释放内存映射
+        if self.is_checking():
+            self.statusBar.showMessage("请等待检查完成后再构建")
+            return
+        self.close_label_store()
+
+        self.store_worker = StoreBuildWorker(self.annotation_files,
+                                             default_store_path(self.current_dir))
+        self.store_worker.progress.connect(
+            lambda done, total: self.statusBar.showMessage(f"正在构建打包标注库: {done}/{total}"))
+        self.store_worker.store_ready.connect(self.on_label_store_ready)
+        self.build_store_action.setEnabled(False)
+        self.store_worker.finished.connect(lambda: self.build_store_action.setEnabled(True))
+        self.store_worker.start()
+
+    def select_prediction_dir(self):
+        """选择模型预测目录，与标注对比以查找漏标和类别错误"""
+        last_dir = self.settings.value("last_prediction_directory", self.current_dir or "")
+        dir_path = QFileDialog.getExistingDirectory(self, "选择预测目录", last_dir)
+        if dir_path:
+            self.settings.setValue("last_prediction_directory", dir_path)
+            self.set_prediction_dir(dir_path)
+
+    def set_prediction_dir(self, path: Optional[str]):
+        """设置或清除预测目录并重新检查"""
+        if self.daemon_client is not None:
+            self.statusBar.showMessage("连接检查服务时不支持预测对比")
+            return
+        self.checker.prediction_dir = path
+        self.clear_prediction_action.setEnabled(path is not None)
+        if self.image_files:
+            self.refresh_check()
+        if self.current_image and not self.has_changes:
+            self.load_preview(self.current_image)
+
+    def on_label_store_ready(self, store: PackedLabelStore):
+        """打包标注库构建完成"""
+        self.label_store = store
+        self.statusBar.showMessage(
+            f"打包标注库已构建: {store.num_files} 个文件, {store.num_boxes} 个标注框")
+
+    def connect_daemon(self):
+        """连接本地检查服务，直接使用服务中已加载的数据集"""
+        url, ok = QInputDialog.getText(self, "连接检查服务", "服务地址:",
+                                       text=f"http://127.0.0.1:{DEFAULT_PORT}")
+        if not ok or not url:
+            return
+        self.daemon_client = DaemonClient(url)
+        self.request_daemon_files(check=False)
+
+    def request_daemon_files(self, check: bool):
+        """在后台线程中向检查服务请求文件列表和检查结果"""
+        if self.daemon_worker and self.daemon_worker.isRunning():
+            return
+        threshold = self.threshold_slider.value() / 100.0 if check else None
+        self.daemon_worker = DaemonLoadWorker(self.daemon_client, check, threshold)
+        self.daemon_worker.files_ready.connect(self.on_daemon_files)
+        self.daemon_worker.failed.connect(
+            lambda message: self.statusBar.showMessage(f"检查服务请求失败: {message}"))
+        self.statusBar.showMessage("正在从检查服务获取结果...")
+        self.daemon_worker.start()
+
+    def on_daemon_files(self, data: dict):
+        """显示检查服务返回的文件列表和检查结果"""
+        if data['directory'] != self.current_dir or len(data['image_files']) != len(self.image_files):
+            # 首次连接或数据集变化时重建文件列表
+            client = self.daemon_client
+            self.load_directory_from(data)
+            self.daemon_client = client
+
+        row_counts: List[Dict[str, int]] = [{} for _ in self.image_files]
+        for name, rows in data['issues'].items():
+            for row, n in rows.items():
+                row_counts[int(row)][name] = n
+        for row, counts in enumerate(row_counts):
+            self.apply_issue_counts(row, counts)
+        self.update_status_counts()
+        self.statusBar.showMessage(f"已从检查服务加载 {len(self.image_files)} 个文件")
+
+    def load_directory_from(self, data: dict):
+        """使用检查服务提供的文件列表代替目录扫描"""
+        self.daemon_client = None
+        self.retire_check_worker()
+        self.stop_integrity_worker()
+        self.stop_duplicate_worker()
+        self.stop_temporal_worker()
+        self.close_thumbnails()
+        self.checker.image_problems = {}
+        self.checker.duplicate_images = {}
+        self.checker.temporal_issues = {}
+        self.current_dir = data['directory']
+        self.preview_scene.clear()
+        self.current_image = None
+        self.current_annotation = None
+        self.dataset_stats = None
+        self.row_issues.clear()
+        self.issue_totals.clear()
+        self.close_label_store()
+
+        classes_file = Path(self.current_dir) / "classes.txt"
+        if classes_file.exists():
+            self.load_labels_file(str(classes_file))
+
+        self.image_files = list(data['image_files'])
+        self.annotation_files = {Path(p).stem: a for p, a in
+                                 zip(data['image_files'], data['annotation_files'])}
+        self.update_file_table()
+
+    def find_duplicates(self):
+        """查找近似重复的图片"""
+        if not self.image_files:
+            self.statusBar.showMessage("没有加载任何文件")
+            return
+        if self.duplicate_worker and self.duplicate_worker.isRunning():
+            return
+
+        max_distance, ok = QInputDialog.getInt(
+            self, "查找重复图片", "最大哈希距离(0-64):",
+            DEFAULT_MAX_DISTANCE, 0, 64)
+        if not ok:
+            return
+
+        worker = self.duplicate_worker = DuplicateWorker(self.image_files, self.current_dir,
+                                                         max_distance)
+        worker.progress.connect(
+            lambda done, total: worker is self.duplicate_worker and
+            self.statusBar.showMessage(f"正在计算图片哈希: {done}/{total}"))
+        worker.groups_ready.connect(lambda groups: self.on_duplicates_found(worker, groups))
+        self.find_duplicates_action.setEnabled(False)
+        worker.finished.connect(lambda: self.find_duplicates_action.setEnabled(True))
+        worker.start()
+
+    def stop_duplicate_worker(self):
+        """停止查找重复图片(切换目录时)，已发出但尚未处理的结果会被丢弃"""
+        worker, self.duplicate_worker = self.duplicate_worker, None
+        if worker is not None and worker.isRunning():
+            worker.stop()
+            worker.wait()
+
+    def on_duplicates_found(self, worker: DuplicateWorker, groups: List[List[str]]):
+        """记录重复图片组并更新文件列表，之后的检查结果由 DuplicateImageRule 保留该问题"""
+        if worker is not self.duplicate_worker:
+            return  # 已切换目录
+        rows = {path: row for row, path in enumerate(self.image_files)}
+        old = self.checker.duplicate_images
+        self.checker.duplicate_images = {
+            Path(path).stem: (group_index, [other for other in group if other != path])
+            for group_index, group in enumerate(groups, 1) for path in group if path in rows}
+        self.update_scan_results(old, 'duplicate_images')
+        total = len(self.checker.duplicate_images)
+        self.statusBar.showMessage(f"发现 {len(groups)} 组重复图片，共 {total} 张")
+
+    def check_temporal(self):
+        """按文件名末尾的帧号分组，查找相邻帧之间闪烁(框缺失)和类别切换的标注"""
+        if not self.image_files:
+            self.statusBar.showMessage("没有加载任何文件")
+            return
+        if self.daemon_client is not None:
+            self.statusBar.showMessage("连接检查服务时不支持时序检查")
+            return
+        if self.temporal_worker and self.temporal_worker.isRunning():
+            return
+
+        worker = self.temporal_worker = TemporalWorker(
+            list(self.image_files), dict(self.annotation_files), self.label_store)
+        worker.progress.connect(
+            lambda done, total: worker is self.temporal_worker and
+            self.statusBar.showMessage(f"正在检查时序一致性: {done}/{total}"))
+        worker.issues_ready.connect(lambda issues: self.on_temporal_issues(worker, issues))
+        self.temporal_action.setEnabled(False)
+        worker.finished.connect(lambda: self.temporal_action.setEnabled(True))
+        worker.start()
+
+    def check_integrity(self):
+        """在后台检查图片是否损坏、被截断或无法解码，与标注检查同时进行"""
+        if not self.image_files or self.daemon_client is not None:
+            return
+        self.stop_integrity_worker()
+        self.integrity_worker = IntegrityWorker(list(self.image_files), self.current_dir)
+        worker = self.integrity_worker
+        worker.problems_ready.connect(lambda problems: self.on_image_problems(worker, problems))
+        self.integrity_action.setEnabled(False)
+        worker.finished.connect(lambda: self.integrity_action.setEnabled(True))
+        worker.start()
+
+    def stop_integrity_worker(self):
+        if self.integrity_worker and self.integrity_worker.isRunning():
+            self.integrity_worker.stop()
+            self.integrity_worker.wait()
+
+    def on_image_problems(self, worker: IntegrityWorker, problems: Dict[str, str]):
+        """记录损坏的图片并更新文件列表，之后的检查结果由 CorruptImageRule 保留该问题"""
+        if worker is not self.integrity_worker:
+            return  # 已切换目录
+        old = self.checker.image_problems
+        self.checker.image_problems = {Path(path).stem: problem for path, problem in problems.items()}
+        self.update_scan_results(old, 'corrupt_images')
+        if problems:
+            self.statusBar.showMessage(f"发现 {len(problems)} 张损坏或无法解码的图片")
+
+    def update_scan_results(self, old: dict, *keys: str):
+        """独立扫描(图片完整性、重复图片、时序检查)的结果变化后，更新新旧结果涉及的行"""
+        for row, path in enumerate(self.image_files):
+            stem = Path(path).stem
+            current = self.scan_counts(stem)
+            if stem not in old and not any(key in current for key in keys):
+                continue
+            counts = dict(self.row_issues.get(row, {}), **current)
+            for key in keys:
+                if key not in current:
+                    counts.pop(key, None)
+            self.apply_issue_counts(row, counts)
+        self.update_status_counts()
+
+    def scan_counts(self, stem: str) -> Dict[str, int]:
+        """检查器中保存的独立扫描结果对应的问题数"""
+        counts = {}
+        if self.checker.image_problems.get(stem):
+            counts['corrupt_images'] = 1
+        if self.checker.duplicate_images.get(stem):
+            counts['duplicate_images'] = len(self.checker.duplicate_images[stem][1])
+        frame = self.checker.temporal_issues.get(stem)
+        if frame is not None:
+            if frame.dropouts:
+                counts['temporal_dropouts'] = len(frame.dropouts)
+            if frame.switches:
+                counts['class_switches'] = len(frame.switches)
+        return counts
+
+    def with_image_problem(self, row: int, counts: Dict[str, int]) -> Dict[str, int]:
+        """检查线程使用检查器的副本，合并之后才完成的图片完整性、重复图片和时序检查结果"""
+        extra = self.scan_counts(Path(self.image_files[row]).stem)
+        return dict(counts, **extra) if extra else counts
+
+    def on_view_tab_changed(self, index: int):
+        if self.view_tabs.widget(index) is self.thumbnail_grid:
+            self.show_thumbnails()
+        elif self.view_tabs.widget(index) is self.gallery_tab:
+            self.show_gallery()
+
+    def show_thumbnails(self):
+        """切换到缩略图网格时打开缩略图缓存并启动生成线程，网格只包含通过筛选的行"""
+        if not self.image_files or self.daemon_client is not None:
+            return
+        if self.thumbnail_store is None:
+            self.thumbnail_store = ThumbnailStore(self.current_dir)
+            worker = self.thumbnail_worker = ThumbnailWorker(self.thumbnail_store)
+            worker.thumbnail_ready.connect(
+                lambda row, data: worker is self.thumbnail_worker and
+                self.thumbnail_model.set_thumbnail(row, data))
+            worker.start()
+        rows = [row for row in range(len(self.image_files)) if not self.file_table.isRowHidden(row)]
+        self.thumbnail_model.set_items(rows)
+        current = self.thumbnail_model.rows.get(self.file_table.currentRow())
+        if current is not None:
+            index = self.thumbnail_model.index(current)
+            self.thumbnail_grid.setCurrentIndex(index)
+            self.thumbnail_grid.scrollTo(index)
+
+    def close_thumbnails(self):
+        """停止缩略图和框裁剪的生成并关闭缓存(切换目录或关闭窗口时)"""
+        self.stop_gallery_worker()
+        for worker in (self.thumbnail_worker, self.crop_worker):
+            if worker is not None:
+                worker.stop()
+                worker.wait()
+        for store in (self.thumbnail_store, self.crop_store):
+            if store is not None:
+                store.close()
+        self.thumbnail_worker = self.crop_worker = None
+        self.thumbnail_store = self.crop_store = None
+        self.thumbnail_model.clear_cache()
+        self.gallery_model.clear_cache()
+        self.gallery_boxes = {}
+        self.gallery_count_label.clear()
+
+    def request_thumbnails(self, rows: List[int]):
+        if self.thumbnail_worker is not None:
+            self.thumbnail_worker.request([(row, self.image_files[row]) for row in rows])
+
+    def thumbnail_lookup(self, row: int) -> Optional[bytes]:
+        if self.thumbnail_store is None:
+            return None
+        return self.thumbnail_store.get(self.image_files[row])
+
+    def thumbnail_caption(self, row: int) -> str:
+        return os.path.basename(self.image_files[row])
+
+    def thumbnail_overlay(self, row: int) -> list:
+        """缩略图上叠加的标注框，颜色与预览中的类别颜色相同"""
+        class_ids, xywh = self.open_annotation(Path(self.image_files[row]).stem).to_arrays()
+        default = QColor(Qt.green)
+        return [(tuple(box), self.label_colors.get(self.label_names[c], default)
+                 if 0 <= c < len(self.label_names) else default)
+                for c, box in zip(class_ids.tolist(), xywh.tolist())]
+
+    def thumbnail_background(self, row: int) -> Optional[QColor]:
+        counts = self.row_issues.get(row)
+        return QColor(summarize_issues(counts)[2]) if counts else None
+
+    def open_thumbnail_row(self, row: int):
+        """点击缩略图时在预览中打开该文件"""
+        self.file_table.selectRow(row)
+        self.view_tabs.setCurrentWidget(self.preview_view)
+
+    def show_gallery(self):
+        """切换到类别画廊时按当前数据更新类别列表并重新收集标注框"""
+        current = self.gallery_class_combo.currentData()
+        classes, _, _ = self.class_index.inverted()
+        self.gallery_class_combo.blockSignals(True)
+        self.gallery_class_combo.clear()
+        for class_id in classes.tolist():
+            name = self.label_names[class_id] if 0 <= class_id < len(self.label_names) else ""
+            self.gallery_class_combo.addItem(f"{class_id}: {name}" if name else str(class_id), class_id)
+        index = self.gallery_class_combo.findData(current)
+        self.gallery_class_combo.setCurrentIndex(max(index, 0))
+        self.gallery_class_combo.blockSignals(False)
+        self.start_gallery()
+
+    def start_gallery(self):
+        """在后台收集所选类别的标注框，只包含通过筛选的文件"""
+        self.stop_gallery_worker()
+        self.gallery_model.set_items([])
+        self.gallery_count_label.clear()
+        class_id = self.gallery_class_combo.currentData()
+        if class_id is None or not self.image_files or self.daemon_client is not None:
+            return
+        rows = [row for row in self.class_index.rows_with_class(class_id).tolist()
+                if not self.file_table.isRowHidden(row)]
+        worker = self.gallery_worker = GalleryWorker(rows, self.image_files, self.annotation_files,
+                                                     class_id, self.label_store)
+        worker.progress.connect(
+            lambda done, total: self.statusBar.showMessage(f"正在收集标注框: {done}/{total}"))
+        worker.boxes_ready.connect(
+            lambda boxes: worker is self.gallery_worker and self.on_gallery_boxes(boxes))
+        worker.start()
+
+    def stop_gallery_worker(self):
+        if self.gallery_worker is not None:
+            self.gallery_worker.stop()
+            self.gallery_worker.wait()
+            self.gallery_worker = None
+
+    def on_gallery_boxes(self, boxes: list):
+        if self.crop_store is None:
+            self.crop_store = ThumbnailStore(self.current_dir, "crops")
+            worker = self.crop_worker = ThumbnailWorker(self.crop_store, job=crop_job)
+            worker.thumbnail_ready.connect(
+                lambda item, data: worker is self.crop_worker and
+                self.gallery_model.set_thumbnail(item, data))
+            worker.start()
+        self.gallery_boxes = {(row, i): box for row, i, box in boxes}
+        self.gallery_model.set_items(list(self.gallery_boxes))
+        self.gallery_count_label.setText(f"{len(boxes)} 个框")
+        self.statusBar.showMessage(f"类别 {self.gallery_class_combo.currentText()}: "
+                                   f"{len(boxes)} 个框")
+
+    def request_crops(self, items: List[tuple]):
+        if self.crop_worker is not None:
+            self.crop_worker.request([(item, self.image_files[item[0]], self.gallery_boxes[item])
+                                      for item in items if item in self.gallery_boxes])
+
+    def crop_lookup(self, item: tuple) -> Optional[bytes]:
+        box = self.gallery_boxes.get(item)
+        if self.crop_store is None or box is None:
+            return None
+        image_path = self.image_files[item[0]]
+        return self.crop_store.get(image_path, crop_name(image_path, box))
+
+    def crop_caption(self, item: tuple) -> str:
+        return f"{os.path.basename(self.image_files[item[0]])} [{item[1]}]"
+
+    def open_gallery_box(self, item: tuple):
+        """点击框裁剪时在预览中打开该文件并选中对应的标注框"""
+        row, box_index = item
+        self.file_table.selectRow(row)
+        self.view_tabs.setCurrentWidget(self.preview_view)
+        if self.current_image != self.image_files[row]:
+            return  # 用户取消了保存提示
+        target = None
+        for scene_item in self.preview_scene.items():
+            if isinstance(scene_item, EditableBox):
+                scene_item.setSelected(False)
+                scene_item.set_editable(False)
+                if scene_item.box_index == box_index:
+                    target = scene_item
+        if target is not None:
+            self.select_box(target)
+            self.preview_view.centerOn(target)
+
+    def stop_temporal_worker(self):
+        """停止时序检查并等待结束(线程可能在读取打包标注库)，已发出但尚未处理的结果会被丢弃"""
+        worker, self.temporal_worker = self.temporal_worker, None
+        if worker is not None and worker.isRunning():
+            worker.stop()
+            worker.wait()
+
+    def on_temporal_issues(self, worker: TemporalWorker, issues: list):
+        """记录有时序问题的帧并更新文件列表，之后的检查结果由时序规则保留这些问题"""
+        if worker is not self.temporal_worker:
+            return  # 已切换目录或已停止
+        old = self.checker.temporal_issues
+        self.checker.temporal_issues = {Path(worker.image_files[frame.index]).stem: frame
+                                        for frame in issues}
+        self.update_scan_results(old, 'temporal_dropouts', 'class_switches')
+        dropouts = sum(len(frame.dropouts) for frame in issues)
+        switches = sum(len(frame.switches) for frame in issues)
+        self.statusBar.showMessage(
+            f"时序检查完成: {len(issues)} 帧有问题，{dropouts} 处框缺失，{switches} 处类别切换")
+
+    def open_autofix(self):
+        """打开批量修复对话框"""
+        if not self.image_files:
+            self.statusBar.showMessage("没有加载任何文件")
+            return
+        if self.daemon_client is not None:
+            self.statusBar.showMessage("连接检查服务时不支持批量修复")
+            return
+        if self.has_changes:
+            self.save_current_annotation()
+        dialog = AutoFixDialog(self, self.fix_candidates, self.is_checking)
+        dialog.fixes_applied.connect(self.on_fixes_applied)
+        dialog.exec()
+
+    def fix_candidates(self, ops: List[str], iou_threshold: float) -> List[str]:
+        """需要试运行修复的标注文件：检查已完成时只取相关规则有问题的文件，否则取全部文件"""
+        rows = None
+        # 重叠阈值不高于去重阈值时，重叠结果包含所有需要去重的框对
+        overlaps_cover = self.checker.threshold_matrix().max() <= iou_threshold
+        if (not self.is_checking() and self.class_index.known.all()
+                and (FIX_DEDUPE not in ops or overlaps_cover)):
+            rows = set()
+            for op in ops:
+                for key in FIX_RULES[op]:
+                    rows.update(self.issue_index.rows(key))
+            rows = sorted(rows)
+        if rows is None:
+            rows = range(len(self.image_files))
+        names = (Path(self.image_files[row]).stem for row in rows)
+        return [self.annotation_files[name] for name in names if name in self.annotation_files]
+
+    def on_fixes_applied(self, fixes: list):
+        """修复写入后只重新检查被修改的文件，更新打包库、类别索引和文件列表"""
+        rows = {Path(path).stem: row for row, path in enumerate(self.image_files)}
+        for fix in fixes:
+            name = Path(fix.path).stem
+            if name not in rows:
+                continue
+            if self.label_store is not None:
+                self.label_store.update(name, AnnotationFile(fix.path))
+            annotation = self.open_annotation(name)
+            issues = self.checker.check_annotation(annotation)
+            self.class_index.update(rows[name], *annotation.to_arrays())
+            self.apply_issue_counts(rows[name], issue_counts(issues))
+        self.update_status_counts()
+        if self.current_image and not self.has_changes:
+            self.load_preview(self.current_image)
+        self.statusBar.showMessage(f"批量修复完成，已更新 {len(fixes)} 个文件")
 
-    def on_check_finished(self):
+    def export_coco(self):
+        """将当前数据目录导出为 COCO JSON"""
+        if not self.image_files:
+            self.statusBar.showMessage("请先加载数据目录")
+            return
+        if self.has_changes:
+            self.save_current_annotation()
+        output, _ = QFileDialog.getSaveFileName(
+            self, "导出 COCO JSON", str(Path(self.current_dir) / "annotations.json"),
+            "JSON Files (*.json)")
+        if output:
+            self.start_convert(ConvertWorker(
+                ConvertWorker.EXPORT_COCO, (list(self.image_files), dict(self.annotation_files)),
+                output, self.label_names or None))
+
+    def import_coco(self):
+        """将 COCO JSON 转换为 YOLO 标注"""
+        source, _ = QFileDialog.getOpenFileName(
+            self, "选择 COCO 标注文件", self.current_dir or "", "JSON Files (*.json)")
+        output = source and self.select_convert_output()
+        if output:
+            self.start_convert(ConvertWorker(ConvertWorker.IMPORT_COCO, source, output))
+
+    def import_voc(self):
+        """将 VOC XML 目录转换为 YOLO 标注，类别使用已加载的标签文件，未加载时自动收集"""
+        source = QFileDialog.getExistingDirectory(self, "选择 VOC 标注目录", self.current_dir or "")
+        output = source and self.select_convert_output()
+        if output:
+            self.start_convert(ConvertWorker(ConvertWorker.IMPORT_VOC, source, output,
+                                             self.label_names or None))
+
+    def select_convert_output(self) -> str:
+        """选择导入的输出目录，目录中已有 .txt 文件时需确认替换"""
+        output = QFileDialog.getExistingDirectory(self, "选择 YOLO 标注输出目录(通常为图片目录)",
+                                                  self.current_dir or "")
+        existing = existing_labels(output) if output else []
+        if existing:
+            reply = QMessageBox.question(
+                self, "确认导入",
+                f"输出目录中已有 {len(existing)} 个 .txt 文件(标注或类别文件)。\n"
+                f"导入结果中的同名文件将替换它们，被替换的文件会备份到 .yolo_checker 目录中。\n\n"
+                f"是否继续？",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return ""
+        return output
+
+    def start_convert(self, worker: ConvertWorker):
+        if self.convert_worker and self.convert_worker.isRunning():
+            self.statusBar.showMessage("格式转换正在进行")
+            return
+        self.convert_worker = worker
+        worker.progress.connect(lambda done, total: self.statusBar.showMessage(
+            f"正在转换: {done * 100 // max(total, 1)}%"))
+        worker.converted.connect(lambda result: self.on_converted(worker.mode, worker.output, result))
+        worker.failed.connect(lambda error: self.statusBar.showMessage(f"格式转换失败: {error}"))
+        for action in self.convert_actions:
+            action.setEnabled(False)
+        worker.finished.connect(lambda: [action.setEnabled(True) for action in self.convert_actions])
+        worker.start()
+
+    def on_converted(self, mode: str, output: str, result):
+        if result is None:
+            self.statusBar.showMessage("格式转换已取消")
+        elif mode == ConvertWorker.EXPORT_COCO:
+            images, annotations, skipped = result
+            message = f"已导出 {images} 张图片、{annotations} 个标注到 {output}"
+            if skipped:
+                message += f"，{skipped} 张图片无法读取尺寸已跳过"
+            self.statusBar.showMessage(message)
+        else:
+            result, backup_dir = result
+            files, annotations, skipped = result[:3]
+            message = f"已转换 {files} 个标注文件、{annotations} 个标注"
+            if skipped:
+                message += f"，跳过 {skipped} 个标注"
+            if mode == ConvertWorker.IMPORT_VOC and result[3]:
+                message += f"，{result[3]} 个文件无法解析"
+            if backup_dir:
+                message += f"，被替换的文件已备份到 {backup_dir}"
+            self.statusBar.showMessage(message + "，重新加载目录后检查")
+            collisions = result[4] if mode == ConvertWorker.IMPORT_COCO else []
+            if collisions:
+                QMessageBox.warning(
+                    self, "图片重名",
+                    f"{len(collisions)} 张图片与其他子目录中的图片文件名相同，YOLO 标注按文件名对应，"
+                    f"这些图片的标注已跳过:\n" + "\n".join(collisions[:20]) +
+                    ("\n..." if len(collisions) > 20 else ""))
+
+    def open_remap(self):
+        """类别合并、重命名、调整顺序或删除，改写所有受影响的标注文件和类别文件"""
+        if not self.image_files or not self.label_names:
+            self.statusBar.showMessage("请先加载数据目录和标签文件")
+            return
+        if self.daemon_client is not None:
+            self.statusBar.showMessage("连接检查服务时不支持类别重映射")
+            return
+        if self.remap_worker and self.remap_worker.isRunning():
+            return
+        if self.is_checking():
+            self.statusBar.showMessage("正在检查，请等待检查完成后再进行类别重映射")
+            return
+        if self.has_changes:
+            self.save_current_annotation()
+
+        dialog = RemapDialog(self, self.label_names, self.describe_remap)
+        if dialog.exec() != RemapDialog.Accepted:
+            return
+        new_names = dialog.new_names
+        rows = affected_rows(self.class_index, dialog.mapping) if dialog.mapping else []
+        if rows is None:
+            rows = range(len(self.image_files))  # 尚未检查完时处理所有文件
+        names = [Path(self.image_files[row]).stem for row in rows]
+        paths = [self.annotation_files[name] for name in names if name in self.annotation_files]
+
+        path = labels_path(self.current_dir, self.labels_file)
+        self.remap_worker = RemapWorker(paths, dialog.mapping, path, new_names)
+        self.remap_worker.progress.connect(
+            lambda done, total: self.statusBar.showMessage(f"正在改写类别: {done}/{total}"))
+        self.remap_worker.remapped.connect(
+            lambda results: self.on_classes_remapped(results, path))
+        self.remap_worker.failed.connect(
+            lambda error: self.statusBar.showMessage(f"标注已改写，但写入类别文件失败: {error}"))
+        self.remap_action.setEnabled(False)
+        self.remap_worker.finished.connect(lambda: self.remap_action.setEnabled(True))
+        self.remap_worker.start()
+
+    def describe_remap(self, mapping: Dict[int, int]) -> str:
+        """用类别倒排索引估计受影响的文件数"""
+        rows = affected_rows(self.class_index, mapping)
+        if rows is None:
+            return "检查尚未完成，将处理所有文件"
+        return f"{len(rows)} 个文件包含这些类别"
+
+    def on_classes_remapped(self, results: list, path: str):
+        """重新加载已改写的类别文件，刷新标签和颜色，只重新检查被改写的文件"""
+        old_overrides = dict(self.checker.pair_overrides)
+        self.load_labels_file(path)
+
+        rows = {Path(p).stem: row for row, p in enumerate(self.image_files)}
+        for file_path, changed, dropped, _, _ in results:
+            name = Path(file_path).stem
+            if name not in rows or not (changed or dropped):
+                continue
+            if self.label_store is not None:
+                self.label_store.update(name, AnnotationFile(file_path))
+            annotation = self.open_annotation(name)
+            self.class_index.update(rows[name], *annotation.to_arrays())
+            self.apply_issue_counts(rows[name], issue_counts(self.checker.check_annotation(annotation)))
+        # 其余文件的类别未变，按新的类别数重新计算无效标签
+        self.revalidate_labels(old_overrides)
+        self.update_status_counts()
+        if self.current_image and not self.has_changes:
+            self.load_preview(self.current_image)
+        written = sum(1 for _, changed, dropped, _, _ in results if changed or dropped)
+        changed = sum(r[1] for r in results)
+        dropped = sum(r[2] for r in results)
+        untouched = sum(r[3] for r in results)
+        unparsable = sum(r[4] for r in results)
+        message = f"类别重映射完成: {written} 个文件，改写 {changed} 个框，删除 {dropped} 个框"
+        if untouched or unparsable:
+            message = (f"类别重映射未完全完成: {written} 个文件，改写 {changed} 个框，删除 {dropped} 个框；"
+                       f"{untouched} 行类别为负数或非整数，{unparsable} 行无法解析，均保持原样")
+        self.statusBar.showMessage(message)
+
+    def toggle_tracing(self, checked: bool):
+        """开启或关闭性能追踪"""
+        if checked:
+            TRACER.reset()
+        TRACER.enable(checked)
+        self.statusBar.showMessage("性能追踪已开启" if checked else "性能追踪已关闭")
+
+    def export_trace(self):
+        """导出 Chrome trace_event 格式的性能追踪"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "导出性能追踪",
+            f"trace_{timestamp}.json",
+            "JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        try:
+            TRACER.dump_chrome_trace(file_path)
+            self.statusBar.showMessage(f"性能追踪已导出到: {file_path}")
+        except Exception as e:
+            self.statusBar.showMessage(f"导出失败: {str(e)}")
+
+    def on_check_finished(self, generation: int):
         """检查完成时的处理"""
-        # 新启用控件
-        self.btn_refresh.setEnabled(True)
-        self.threshold_slider.setEnabled(True)
+        if generation != self.check_generation:
+            return
         self.statusBar.showMessage("检查完成")
 
         # 更新状态栏统计信息
@@ -446,7 +1396,9 @@ class MainWindow(QMainWindow):
                 return
 
         self.load_preview(image_path)
+        self.schedule_priority_update()
 
+    @traced("MainWindow.load_preview")
     def load_preview(self, image_path: str):
         """加载并显示图片及其标注框"""
         # 清除现有场景重置修改状态
@@ -455,19 +1407,23 @@ class MainWindow(QMainWindow):
         self.preview_scene.clear()
 
         # 加载图片
-        image = cv2.imread(image_path)
+        with span("image_decode"):
+            image = cv2.imread(image_path)
         if image is None:
-            self.statusBar.showMessage(f"无法加载图片: {image_path}")
+            problem = self.checker.image_problems.get(Path(image_path).stem)
+            reason = f"({PROBLEM_NAMES[problem]})" if problem else ""
+            self.statusBar.showMessage(f"无法加载图片{reason}: {image_path}")
             return
 
-        # BGR to RGB
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        height, width, channel = image.shape
+        with span("pixmap_upload"):
+            # BGR to RGB
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            height, width, channel = image.shape
 
-        # 创建QImage
-        bytes_per_line = channel * width
-        q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_image)
+            # 创建QImage
+            bytes_per_line = channel * width
+            q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(q_image)
 
         # 添加图片到场景
         self.preview_scene.addPixmap(pixmap)
@@ -493,6 +1449,7 @@ class MainWindow(QMainWindow):
         self.last_mouse_pos = None
         self.preview_view.unsetCursor()
 
+    @traced("MainWindow.load_and_show_annotations")
     def load_and_show_annotations(self, image_width: int, image_height: int):
         """加载并显示标注框"""
         if not self.current_image:
@@ -504,11 +1461,11 @@ class MainWindow(QMainWindow):
             return
 
         # 加载标注文件
-        anno_path = self.annotation_files[image_name]
-        self.current_annotation = AnnotationFile(anno_path)
+        self.current_annotation = self.open_annotation(image_name)
 
         # 检查标注问题
         issues = self.checker.check_annotation(self.current_annotation)
+        types = box_types(issues, len(self.current_annotation.boxes))
 
         # 绘制所有标注框
         for i, box in enumerate(self.current_annotation.boxes):
@@ -518,20 +1475,39 @@ class MainWindow(QMainWindow):
             w = box.w * image_width
             h = box.h * image_height
 
-            # 确定注框类型
-            box_type = 'normal'
-            if any(i in (a, b) for a, b, _ in issues['overlaps']):
-                box_type = 'overlap'
-            elif any(i == idx for idx, _, _ in issues['invalid_labels']):
-                box_type = 'invalid_label'
+            # 旋转框在像素坐标中还原为中心、宽高和角度
+            rotation = 0
+            if box.corners is not None:
+                corners = np.array(box.corners).reshape(4, 2) * (image_width, image_height)
+                center = corners.mean(axis=0)
+                top, right = corners[1] - corners[0], corners[2] - corners[1]
+                box_w, box_h = np.hypot(*top), np.hypot(*right)
+                rotation = math.degrees(math.atan2(top[1], top[0]))
+                box_x, box_y = center[0] - box_w / 2, center[1] - box_h / 2
+            else:
+                box_x, box_y, box_w, box_h = x, y, w, h
+
+            # 分割多边形的顶点转换为框内相对位置
+            polygon = None
+            if box.polygon is not None:
+                points = np.array(box.polygon).reshape(-1, 2) - (box.x - box.w / 2, box.y - box.h / 2)
+                size = np.array([box.w, box.h])
+                polygon = np.divide(points, size, out=np.zeros_like(points), where=size > 0).tolist()
+
+            # 确定标注框类型
+            box_type = types[i]
 
             # 创建可编辑的标注框
-            editable_box = EditableBox(x, y, w, h,
+            editable_box = EditableBox(box_x, box_y, box_w, box_h,
                                        self.on_box_changed,  # 直接传递方法引用
                                        class_id=box.class_id,
                                        editable=False,
                                        box_type=box_type,
-                                       main_window=self)
+                                       main_window=self,
+                                       rotation=rotation,
+                                       polygon=polygon)
+            editable_box.box_index = i
+            editable_box.set_source(box)
             self.preview_scene.addItem(editable_box)
 
             # 如果有标签名称，显示标签（作为独立的景项）
@@ -555,15 +1531,56 @@ class MainWindow(QMainWindow):
                 self.preview_scene.addItem(label_text)
                 editable_box.label_item = label_text
 
+        self.show_missed_predictions(issues.get('missed_labels', []), image_width, image_height)
+
+    def show_missed_predictions(self, missed: list, image_width: int, image_height: int):
+        """以虚线框显示疑似漏标的预测框(只用于提示，不参与编辑和保存)"""
+        if not missed:
+            return
+        predictions = load_prediction(self.checker.prediction_dir, self.current_annotation.file_path)
+        pen = QPen(QColor(RULES['missed_labels'].box_color), 2, Qt.DashLine)
+        for index, class_id, confidence in missed:
+            x, y, w, h = predictions.xywh[index]
+            rect = QGraphicsRectItem((x - w / 2) * image_width, (y - h / 2) * image_height,
+                                     w * image_width, h * image_height)
+            rect.setPen(pen)
+            self.preview_scene.addItem(rect)
+
+            name = self.label_names[class_id] if 0 <= class_id < len(self.label_names) else str(class_id)
+            text = QGraphicsTextItem(f"预测: {name} {confidence:.2f}")
+            text.setDefaultTextColor(QColor(RULES['missed_labels'].box_color))
+            text.setPos(rect.rect().left(), rect.rect().bottom())
+            self.preview_scene.addItem(text)
+
     def resizeEvent(self, event):
         """口大小改变时重新适应视图"""
         super().resizeEvent(event)
+        self.schedule_priority_update()
         if self.preview_scene.items():
             self.preview_view.fitInView(
                 self.preview_scene.sceneRect(),
                 Qt.AspectRatioMode.KeepAspectRatio
             )
 
+    def closeEvent(self, event):
+        """关闭窗口前停止并等待所有后台线程，正在改写文件的线程会写完当前的一块，类别重映射会全部完成"""
+        self.retire_check_worker()
+        for worker in list(self.retired_workers):
+            worker.wait()
+        self.stop_temporal_worker()
+        self.stop_integrity_worker()
+        self.close_thumbnails()
+        for worker in (self.convert_worker, self.duplicate_worker, self.store_worker):
+            if worker is not None and worker.isRunning():
+                worker.stop()
+                worker.wait()
+        if self.remap_worker is not None and self.remap_worker.isRunning():
+            self.statusBar.showMessage("正在完成类别重映射...")
+            self.remap_worker.wait()
+        if self.daemon_worker is not None:
+            self.daemon_worker.wait()  # 只等待当前请求返回
+        super().closeEvent(event)
+
     def setup_menu(self):
         """设置菜单栏"""
         menubar = self.menuBar()
@@ -577,11 +1594,149 @@ class MainWindow(QMainWindow):
         self.auto_save_action.setChecked(self.auto_save)  # 设置初始状态
         self.auto_save_action.triggered.connect(self.toggle_auto_save)
 
+        # 连接检查服务
+        self.connect_daemon_action = file_menu.addAction("连接检查服务")
+        self.connect_daemon_action.triggered.connect(self.connect_daemon)
+
+        # 监视标注文件变化
+        self.watch_action = file_menu.addAction("监视标注文件变化")
+        self.watch_action.setCheckable(True)
+        self.watch_action.triggered.connect(self.toggle_watch_labels)
+
+        # 9 个值的行按 4 顶点分割多边形解析(默认按 OBB)
+        self.quad_polygon_action = file_menu.addAction("四点标注按分割多边形解析")
+        self.quad_polygon_action.setCheckable(True)
+        self.quad_polygon_action.triggered.connect(self.toggle_quad_polygon)
+
+        # 格式转换
+        file_menu.addSeparator()
+        self.convert_actions = []
+        for text, slot in (("导出为 COCO JSON...", self.export_coco),
+                           ("从 COCO JSON 导入...", self.import_coco),
+                           ("从 VOC 目录导入...", self.import_voc)):
+            action = file_menu.addAction(text)
+            action.triggered.connect(slot)
+            self.convert_actions.append(action)
+
+        # 统计菜单
+        stats_menu = menubar.addMenu("统计")
+        self.stats_action = stats_menu.addAction("数据集统计")
+        self.stats_action.triggered.connect(self.show_stats)
+        stats_menu.addSeparator()
+        self.trace_action = stats_menu.addAction("记录性能追踪")
+        self.trace_action.setCheckable(True)
+        self.trace_action.setChecked(TRACER.enabled)
+        self.trace_action.triggered.connect(self.toggle_tracing)
+        self.export_trace_action = stats_menu.addAction("导出性能追踪")
+        self.export_trace_action.triggered.connect(self.export_trace)
+
+        # 工具菜单
+        tools_menu = menubar.addMenu("工具")
+        self.integrity_action = tools_menu.addAction("检查图片完整性")
+        self.integrity_action.triggered.connect(self.check_integrity)
+        self.find_duplicates_action = tools_menu.addAction("查找重复图片")
+        self.find_duplicates_action.triggered.connect(self.find_duplicates)
+        self.temporal_action = tools_menu.addAction("检查视频帧时序一致性")
+        self.temporal_action.triggered.connect(self.check_temporal)
+        self.autofix_action = tools_menu.addAction("批量修复...")
+        self.autofix_action.triggered.connect(self.open_autofix)
+        self.remap_action = tools_menu.addAction("类别重映射...")
+        self.remap_action.triggered.connect(self.open_remap)
+        self.build_store_action = tools_menu.addAction("构建打包标注库")
+        self.build_store_action.triggered.connect(self.build_label_store)
+        tools_menu.addSeparator()
+        self.prediction_action = tools_menu.addAction("加载预测目录")
+        self.prediction_action.triggered.connect(self.select_prediction_dir)
+        self.clear_prediction_action = tools_menu.addAction("清除预测对比")
+        self.clear_prediction_action.setEnabled(False)
+        self.clear_prediction_action.triggered.connect(lambda: self.set_prediction_dir(None))
+
+        # 跳转菜单：在有问题的文件之间跳转
+        nav_menu = menubar.addMenu("跳转")
+        for modifiers, key, name in self.ISSUE_NAV_KEYS:
+            for forward, letter in ((True, "D"), (False, "A")):
+                text = ("下一个" if forward else "上一个") + name
+                action = nav_menu.addAction(text)
+                action.setShortcut(QKeySequence(modifiers.value | getattr(Qt, "Key_" + letter)))
+                action.triggered.connect(
+                    lambda checked=False, key=key, forward=forward: self.jump_to_issue(key, forward))
+        nav_menu.addSeparator()
+        self.issue_filter_action = nav_menu.addAction("仅显示问题文件")
+        self.issue_filter_action.setCheckable(True)
+        self.issue_filter_action.triggered.connect(self.apply_row_filter)
+
     def toggle_auto_save(self, checked: bool):
         """切换自动保存选项"""
         self.auto_save = checked
         self.settings.setValue("auto_save", checked)  # 保存设置
 
+    def toggle_watch_labels(self, checked: bool):
+        """切换监视标注文件选项"""
+        self.watch_labels = checked
+        self.settings.setValue("watch_labels", checked)
+        self.update_label_watcher()
+
+    def toggle_quad_polygon(self, checked: bool):
+        """切换 9 个值的行的解析方式，已加载的目录按新的方式重新加载"""
+        if self.has_changes:
+            self.save_current_annotation()
+        set_quad_format(QUAD_POLYGON if checked else QUAD_OBB)
+        self.settings.setValue("quad_format", get_quad_format())
+        if self.daemon_client is not None:
+            self.statusBar.showMessage("连接检查服务时由服务端的 --quad-format 参数决定")
+        elif self.current_dir:
+            self.load_directory(self.current_dir)
+
+    def update_label_watcher(self):
+        """根据设置启动或停止标注文件监视"""
+        if self.label_watcher is not None:
+            self.label_watcher.stop()
+            self.label_watcher.deleteLater()
+            self.label_watcher = None
+        if self.watch_labels and self.current_dir:
+            self.label_watcher = LabelWatcher(self.current_dir, self)
+            self.label_watcher.labels_changed.connect(self.on_labels_changed)
+
+    def on_labels_changed(self, changed: set, removed: set):
+        """标注文件被外部修改时，只重新检查变化的文件"""
+        rows = {Path(path).stem: row for row, path in enumerate(self.image_files)}
+        refreshed = 0
+        for name in changed:
+            if name not in rows:
+                continue  # 新增的图片需要重新加载目录
+            # 打包标注库中的数据已过期，先同步
+            if self.label_store is not None:
+                self.label_store.update(name, AnnotationFile(self.annotation_files[name]))
+            self.refresh_single_file(self.image_files[rows[name]], update_counts=False)
+            refreshed += 1
+        for name in removed:
+            if name in rows:
+                self.apply_issue_counts(rows[name], {})
+                self.class_index.remove(rows[name])
+                self.set_row_status(rows[name], "标注已删除", "", QColor("#E0E0E0"))
+
+        self.update_status_counts()
+
+        # 当前预览的文件被修改且没有未保存的修改时，重新加载预览
+        if self.current_image and not self.has_changes:
+            current_name = Path(self.current_image).stem
+            if current_name in changed:
+                self.load_preview(self.current_image)
+
+        if refreshed or removed:
+            self.statusBar.showMessage(f"标注文件变化: 已重新检查 {refreshed} 个文件")
+
+    def handle_issue_nav_key(self, event) -> bool:
+        """处理带修饰键的 A/D(跳转到上一个/下一个问题文件)"""
+        if event.key() not in (Qt.Key_A, Qt.Key_D):
+            return False
+        for modifiers, key, _ in self.ISSUE_NAV_KEYS:
+            if event.modifiers() == modifiers:
+                self.jump_to_issue(key, event.key() == Qt.Key_D)
+                event.accept()
+                return True
+        return False
+
     def keyPressEvent(self, event):
         """键盘事件处理"""
         # 处理 Ctrl 键状态
@@ -595,6 +1750,9 @@ class MainWindow(QMainWindow):
             super().keyPressEvent(event)
             return
 
+        if self.handle_issue_nav_key(event):
+            return
+
         # 处理 A、D 键切换图片
         if event.key() == Qt.Key_A:
             self.prev_image()
@@ -802,15 +1960,9 @@ class MainWindow(QMainWindow):
         boxes = []
         for item in self.preview_scene.items():
             if isinstance(item, EditableBox):
-                rect = item.rect()
-                pos = item.pos()
-                # 转换为YOLO格式
-                x = (pos.x() + rect.center().x()) / self.preview_scene.width()
-                y = (pos.y() + rect.center().y()) / self.preview_scene.height()
-                w = rect.width() / self.preview_scene.width()
-                h = rect.height() / self.preview_scene.height()
-                # 添加别ID
-                boxes.append(f"{item.class_id} {x:.6f} {y:.6f} {w:.6f} {h:.6f}")
+                # 转换为YOLO格式，旋转过的框保存为 OBB 四个角点，分割标注保存多边形
+                bbox = item.to_bbox(self.preview_scene.width(), self.preview_scene.height())
+                boxes.append(bbox.to_line())
 
         # 保存到文件
         image_name = Path(self.current_image).stem
@@ -818,12 +1970,15 @@ class MainWindow(QMainWindow):
         try:
             with open(anno_path, 'w') as f:
                 f.write('\n'.join(boxes))
+            # 同步到打包标注库
+            if self.label_store is not None:
+                self.label_store.update(image_name, AnnotationFile(anno_path))
             self.has_changes = False
             self.statusBar.showMessage("保存成功")
         except Exception as e:
             self.statusBar.showMessage(f"保存失败: {str(e)}")
 
-    def refresh_single_file(self, image_path: str):
+    def refresh_single_file(self, image_path: str, update_counts: bool = True):
         """刷单个文件检查状态"""
         if not image_path or image_path not in self.image_files:
             return
@@ -834,28 +1989,14 @@ class MainWindow(QMainWindow):
             return
 
         # 加载并检查标注
-        annotation = AnnotationFile(self.annotation_files[image_name])
+        annotation = self.open_annotation(image_name)
         issues = self.checker.check_annotation(annotation)
+        self.class_index.update(row, *annotation.to_arrays())
 
         # 更新状态
-        if not any(issues.values()):
-            self.set_row_status(row, "正常", "", QColor("#FFFFFF"))
-        else:
-            details = []
-            if issues['overlaps']:
-                details.append(f"发现 {len(issues['overlaps'])} 处重叠")
-                self.set_row_status(
-                    row, "重叠问题",
-                    "; ".join(details),
-                    QColor("#FFD0D0")  # 浅红色
-                )
-            if issues['invalid_labels']:
-                details.append(f"发现 {len(issues['invalid_labels'])} 个无标签")
-                self.set_row_status(
-                    row, "标签问题",
-                    "; ".join(details),
-                    QColor("#FFFFD0")  # 浅黄色
-                )
+        self.apply_issue_counts(row, issue_counts(issues))
+        if update_counts:
+            self.update_status_counts()
 
     def prev_image(self):
         """显示上一张图片"""
@@ -864,20 +2005,7 @@ class MainWindow(QMainWindow):
 
         current_index = self.image_files.index(self.current_image)
         if current_index > 0:
-            # 如果有未保存的修改
-            if self.has_changes:
-                # 不管状态如何，都使用 maybe_save 来处理保存
-                if not self.maybe_save():
-                    return  # 如果用户取消，则不切换图片
-                # 如果状态异常，刷新状态
-                current_status = self.file_table.item(current_index, 1).text()
-                if current_status != "正常":
-                    self.refresh_single_file(self.current_image)
-
-            # 加载上一张图片
-            self.load_preview(self.image_files[current_index - 1])
-            # 更新列表选中项
-            self.file_table.selectRow(current_index - 1)
+            self.show_row(current_index - 1)
 
     def next_image(self):
         """显示下一张图片"""
@@ -886,6 +2014,12 @@ class MainWindow(QMainWindow):
 
         current_index = self.image_files.index(self.current_image)
         if current_index < len(self.image_files) - 1:
+            self.show_row(current_index + 1)
+
+    def show_row(self, row: int):
+        """切换到指定行的图片"""
+        if self.current_image:
+            current_index = self.image_files.index(self.current_image)
             # 如果有未保存的修改
             if self.has_changes:
                 # 不管状态如何，都使用 maybe_save 来处理保存
@@ -896,10 +2030,75 @@ class MainWindow(QMainWindow):
                 if current_status != "正常":
                     self.refresh_single_file(self.current_image)
 
-            # 加载下一张图片
-            self.load_preview(self.image_files[current_index + 1])
-            # 更新列表选中项
-            self.file_table.selectRow(current_index + 1)
+        # 加载图片
+        self.load_preview(self.image_files[row])
+        # 更新列表选中项
+        self.file_table.selectRow(row)
+
+    def jump_to_issue(self, key: str, forward: bool = True):
+        """跳转到下一个(或上一个)有指定问题的文件"""
+        if not self.image_files:
+            return
+        if self.current_image:
+            current = self.image_files.index(self.current_image)
+        else:
+            current = -1 if forward else len(self.image_files)
+        if forward:
+            row = self.issue_index.next_row(current, key)
+        else:
+            row = self.issue_index.prev_row(current, key)
+        if row < 0:
+            self.statusBar.showMessage("没有更多问题文件" if forward else "前面没有问题文件")
+            return
+        self.show_row(row)
+
+    def row_visible(self, row: int) -> bool:
+        """该行是否通过"仅显示问题文件"和筛选框"""
+        if self.issue_filter_action.isChecked() and not self.issue_index.bitmaps[ANY_ISSUE][row]:
+            return False
+        return self.query_mask is None or bool(self.query_mask[row])
+
+    def apply_row_filter(self, *args):
+        """隐藏不满足筛选条件的行，不重建表格项"""
+        visible = np.ones(self.file_table.rowCount(), dtype=bool)
+        if self.issue_filter_action.isChecked():
+            visible &= self.issue_index.bitmaps[ANY_ISSUE].to_array()
+        if self.query_mask is not None and len(self.query_mask) == len(visible):
+            visible &= self.query_mask
+        self.file_table.setUpdatesEnabled(False)
+        for row in range(self.file_table.rowCount()):
+            self.file_table.setRowHidden(row, not visible[row])
+        self.file_table.setUpdatesEnabled(True)
+        self.schedule_priority_update()
+        if self.view_tabs.currentWidget() is self.thumbnail_grid:
+            self.thumbnail_model.set_items(np.flatnonzero(visible).tolist())
+        elif self.view_tabs.currentWidget() is self.gallery_tab:
+            self.start_gallery()
+
+    def run_file_query(self):
+        """按筛选框中的表达式筛选文件"""
+        text = self.query_edit.text().strip()
+        if not text:
+            self.query_mask = None
+            self.apply_row_filter()
+            return
+        if not self.class_index.known.any():
+            self.statusBar.showMessage("请先完成一次检查")
+            return
+
+        flags = {name: (lambda name=name: self.issue_index.bitmap(name).to_array())
+                 for name in list(RULES) + [ANY_ISSUE]}
+        try:
+            with span("file_query"):
+                self.query_mask = run_query(text, self.class_index, flags, self.label_names)
+        except QueryError as e:
+            self.statusBar.showMessage(str(e))
+            return
+        self.apply_row_filter()
+        message = f"{int(self.query_mask.sum())} 个文件匹配"
+        if not self.class_index.known.all():
+            message += "(检查尚未完成，仅包含已检查的文件)"
+        self.statusBar.showMessage(message)
 
     def update_category_list(self):
         """更新类别列表"""
@@ -915,22 +2114,17 @@ class MainWindow(QMainWindow):
             if isinstance(item, EditableBox):
                 if item.class_id < len(self.label_names):
                     label = self.label_names[item.class_id]
-                    # 计算标注框在YOLO格式下的坐标
-                    rect = item.rect()
-                    pos = item.pos()
-                    x = (pos.x() + rect.center().x()) / self.preview_scene.width()
-                    y = (pos.y() + rect.center().y()) / self.preview_scene.height()
-                    w = rect.width() / self.preview_scene.width()
-                    h = rect.height() / self.preview_scene.height()
-                    # 建对应的BBox对象用于比较
-                    yolo_box = BBox(item.class_id, x, y, w, h)
+                    # 计算标注框在YOLO格式下的坐标，用于与标注文件比较
+                    yolo_box = item.to_bbox(self.preview_scene.width(),
+                                            self.preview_scene.height())
                     box_items.append((label, item, yolo_box))
 
         # 获取当前标注文件的问题
         image_name = Path(self.current_image).stem
-        anno_path = self.annotation_files[image_name]
-        annotation = AnnotationFile(anno_path)
+        annotation = self.open_annotation(image_name)
         issues = self.checker.check_annotation(annotation)
+        types = box_types(issues, len(annotation.boxes))
+        type_colors = {rule.box_type: rule.box_color for rule in RULES.values()}
 
         # 加到列表
         for label, scene_box, yolo_box in box_items:
@@ -948,13 +2142,8 @@ class MainWindow(QMainWindow):
                     break
 
             # 根据问题类型设置颜色
-            if box_index >= 0:
-                if any(box_index in (a, b) for a, b, _ in issues['overlaps']):
-                    # 重叠问题 - 红色
-                    item.setForeground(Qt.red)
-                elif any(box_index == idx for idx, _, _ in issues['invalid_labels']):
-                    # 标签问题 - 黄色
-                    item.setForeground(Qt.yellow)
+            if box_index >= 0 and types[box_index] in type_colors:
+                item.setForeground(QColor(type_colors[types[box_index]]))
 
             self.category_list.addItem(item)
 
@@ -988,6 +2177,8 @@ class MainWindow(QMainWindow):
 
     def table_key_press_event(self, event):
         """件列表的键盘事件处理"""
+        if self.handle_issue_nav_key(event):
+            return
         if event.key() == Qt.Key_A:
             self.prev_image()
         elif event.key() == Qt.Key_D:
@@ -999,17 +2190,9 @@ class MainWindow(QMainWindow):
     def update_status_counts(self):
         """更新状态栏的统计信息"""
         total_files = len(self.image_files)
-        total_overlaps = 0
-        total_invalid_labels = 0
-
-        # 统计所有文件的问题
-        for image_path in self.image_files:
-            image_name = Path(image_path).stem
-            if image_name in self.annotation_files:
-                annotation = AnnotationFile(self.annotation_files[image_name])
-                issues = self.checker.check_annotation(annotation)
-                total_overlaps += len(issues['overlaps'])
-                total_invalid_labels += len(issues['invalid_labels'])
+        # 使用随每行结果增量维护的总数，不再重新读取所有文件
+        total_overlaps = self.issue_totals.get('overlaps', 0)
+        total_invalid_labels = self.issue_totals.get('invalid_labels', 0)
 
         # 更新状态栏显示
         self.total_files_label.setText(f"文件总数: {total_files}")
@@ -1058,6 +2241,8 @@ class MainWindow(QMainWindow):
 
     def view_key_press(self, event):
         """预览视图的键盘事件处理"""
+        if self.handle_issue_nav_key(event):
+            return
         # 处理 A、D 键切换图片
         if event.key() == Qt.Key_A:
             self.prev_image()
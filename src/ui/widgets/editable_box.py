@@ -1,8 +1,11 @@
 from PySide6.QtWidgets import QGraphicsRectItem, QGraphicsItem
 from PySide6.QtCore import Qt, QRectF, QPointF, QTimer
-from PySide6.QtGui import QPen, QColor
+from PySide6.QtGui import QPen, QColor, QPolygonF
 from typing import Optional, Callable
+import dataclasses
 import math
+from core.rules import RULES
+from core.annotation import BBox
 
 
 class EditableBox(QGraphicsRectItem):
@@ -25,7 +28,9 @@ class EditableBox(QGraphicsRectItem):
                  class_id: int = 0,
                  editable: bool = False,
                  box_type: str = 'normal',
-                 main_window=None):
+                 main_window=None,
+                 rotation: float = 0,
+                 polygon: Optional[list] = None):
         # 先调用父类初始化
         super().__init__(0, 0, w, h)
 
@@ -44,8 +49,13 @@ class EditableBox(QGraphicsRectItem):
         self.mouse_press_rect = None
         self.rotation_angle = 0
         self.label_item = None
+        self.box_index: Optional[int] = None  # 在标注文件中的下标，新建的框为 None
         self.selected_handle = None  # 添加选中的锚点标记
         self.hovered_handle = None  # 添加悬浮的锚点标记
+        # 分割多边形顶点，以框内相对位置 (u, v) 保存，随框移动、缩放和旋转
+        self.polygon = polygon
+        self.source: Optional[BBox] = None  # 从标注文件加载的原始标注，新建的框为 None
+        self.source_geometry = None  # 加载时的几何状态，未改变时保存原始坐标
 
         # 设置缓存模式
         self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
@@ -53,8 +63,12 @@ class EditableBox(QGraphicsRectItem):
         # 初始化手柄
         self.setup_handles()
 
-        # 设置位置
+        # 设置位置，旋转以框中心为原点
         self.setPos(x, y)
+        self.setTransformOriginPoint(self.rect().center())
+        if rotation:
+            self.setRotation(rotation)
+            self.rotation_angle = rotation
 
         # 最后设置标志位，因为这会触发 itemChange
         self.setFlags(QGraphicsItem.ItemIsSelectable)
@@ -98,6 +112,69 @@ class EditableBox(QGraphicsRectItem):
         # 旋转手柄
         self.handles[8] = QRectF(rect.center().x() - s / 2, rect.top() - b - s, s, s)
 
+    def update_transform_origin(self):
+        """将旋转原点移到框中心，同时调整位置使框在场景中保持不动"""
+        center = self.rect().center()
+        if self.transformOriginPoint() == center:
+            return
+        before = self.mapToScene(center)
+        self.setTransformOriginPoint(center)
+        self.setPos(self.pos() + before - self.mapToScene(center))
+
+    @property
+    def rotated(self) -> bool:
+        return abs(math.remainder(self.rotation_angle, 360)) > 1e-3
+
+    def scene_corners(self):
+        """场景坐标中的四个角点(左上、右上、右下、左下)"""
+        rect = self.rect()
+        return [self.mapToScene(p) for p in
+                (rect.topLeft(), rect.topRight(), rect.bottomRight(), rect.bottomLeft())]
+
+    def polygon_points(self):
+        """多边形顶点在框局部坐标中的位置"""
+        rect = self.rect()
+        return [QPointF(rect.left() + u * rect.width(), rect.top() + v * rect.height())
+                for u, v in self.polygon]
+
+    def geometry(self) -> tuple:
+        """位置、大小、角度和多边形顶点，用于判断框是否被编辑过"""
+        rect = self.rect()
+        return (self.pos().x(), self.pos().y(), rect.x(), rect.y(), rect.width(), rect.height(),
+                self.rotation_angle, self.polygon and [tuple(p) for p in self.polygon])
+
+    def set_source(self, bbox: BBox):
+        """记录加载时的原始标注"""
+        self.source = bbox
+        self.source_geometry = self.geometry()
+
+    def to_bbox(self, scene_width: float, scene_height: float) -> BBox:
+        """转换为归一化的 YOLO 标注
+
+        未编辑过的框原样保留加载时的坐标(OBB 角点、多边形顶点不会被重新拟合)；
+        以 OBB 加载的框始终保存为四个角点，其他旋转后的框转换为 OBB 角点，分割标注保留多边形。
+        """
+        if self.source is not None and self.geometry() == self.source_geometry:
+            return dataclasses.replace(self.source, class_id=self.class_id)
+        if self.polygon:
+            points = []
+            for p in self.polygon_points():
+                p = self.mapToScene(p)
+                points += [p.x() / scene_width, p.y() / scene_height]
+            return BBox.from_polygon(self.class_id, points)
+        if self.rotated or (self.source is not None and self.source.corners is not None):
+            corners = []
+            for p in self.scene_corners():
+                corners += [p.x() / scene_width, p.y() / scene_height]
+            return BBox.from_corners(self.class_id, corners)
+        rect = self.rect()
+        pos = self.pos()
+        return BBox(self.class_id,
+                    (pos.x() + rect.center().x()) / scene_width,
+                    (pos.y() + rect.center().y()) / scene_height,
+                    rect.width() / scene_width,
+                    rect.height() / scene_height)
+
     def handle_at(self, point: QPointF) -> int:
         """返回当前的手柄索引"""
         for i, handle in enumerate(self.handles):
@@ -138,9 +215,11 @@ class EditableBox(QGraphicsRectItem):
     def mouseMoveEvent(self, event):
         if self.handle_selected is not None:
             if self.handle_selected == 8:  # 旋转手柄
-                center = self.rect().center()
-                angle = math.degrees(math.atan2(event.pos().y() - center.y(),
-                                                event.pos().x() - center.x()))
+                # 在场景坐标中计算鼠标相对框中心的角度，手柄在正上方时为 0 度
+                self.update_transform_origin()
+                center = self.mapToScene(self.rect().center())
+                angle = math.degrees(math.atan2(event.scenePos().y() - center.y(),
+                                                event.scenePos().x() - center.x())) + 90
                 self.setRotation(angle)
                 self.rotation_angle = angle
             else:
@@ -158,6 +237,7 @@ class EditableBox(QGraphicsRectItem):
 
                 self.setRect(rect.normalized())
                 self.update_handles()
+                self.update_transform_origin()
 
             self.notify_change()
         else:
@@ -179,16 +259,17 @@ class EditableBox(QGraphicsRectItem):
 
     def paint(self, painter, option, widget=None):
         """绘制标注框和手柄"""
-        # 根据类型设置颜色
-        if self.box_type == 'overlap':
-            pen = QPen(Qt.red, 2)
-        elif self.box_type == 'invalid_label':
-            pen = QPen(Qt.yellow, 2)
-        else:
-            pen = QPen(Qt.green, 2)
-        self.setPen(pen)
+        # 根据类型设置颜色(问题框颜色由检查规则定义)
+        color = Qt.green
+        for rule in RULES.values():
+            if rule.box_type == self.box_type:
+                color = QColor(rule.box_color)
+                break
+        self.setPen(QPen(color, 2))
 
         super().paint(painter, option, widget)
+        if self.polygon:
+            painter.drawPolygon(QPolygonF(self.polygon_points()))
 
         # 只在编辑模式且有焦点时显示手柄
         if self.editable and self.hasFocus():
@@ -0,0 +1,200 @@
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF, QSize, QTimer, Signal
+from PySide6.QtGui import QPixmap, QPen, QColor
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+
+# 叠加框: (x, y, w, h) 为相对缩略图的中心坐标，与 YOLO 格式相同
+Overlay = List[Tuple[Tuple[float, float, float, float], QColor]]
+
+CAPTION_HEIGHT = 18
+CELL_PADDING = 6
+MAX_PIXMAPS = 1000  # 内存中保留的缩略图数
+
+
+class ThumbnailModel(QAbstractListModel):
+    """缩略图网格的数据模型
+
+    视图只为可见单元格调用 data()，因此只有滚动到的单元格才会读取缓存或请求生成；
+    未命中的单元格攒成一批后通过 thumbnails_wanted 发出，由生成线程填回 set_thumbnail()。
+    """
+    thumbnails_wanted = Signal(object)  # 需要生成缩略图的条目
+
+    def __init__(self, lookup: Callable[[Hashable], Optional[bytes]],
+                 caption: Callable[[Hashable], str],
+                 overlay: Optional[Callable[[Hashable], Overlay]] = None,
+                 background: Optional[Callable[[Hashable], Optional[QColor]]] = None,
+                 parent=None):
+        super().__init__(parent)
+        self.lookup = lookup  # 条目 -> 缓存中的图片数据(未缓存时为 None)
+        self.caption = caption
+        self.overlay = overlay
+        self.background = background
+        self.items: List[Hashable] = []
+        self.rows = {}
+        self.pixmaps: "OrderedDict[Hashable, QPixmap]" = OrderedDict()
+        self.overlays: "OrderedDict[Hashable, Overlay]" = OrderedDict()
+        self.failed = set()  # 无法生成缩略图的条目，不再重复请求
+        self.wanted = {}
+        self.wanted_timer = QTimer(self)
+        self.wanted_timer.setSingleShot(True)
+        self.wanted_timer.timeout.connect(self.emit_wanted)
+
+    def set_items(self, items: List[Hashable]):
+        self.beginResetModel()
+        self.items = list(items)
+        self.rows = {item: row for row, item in enumerate(self.items)}
+        self.wanted.clear()
+        self.endResetModel()
+
+    def clear_cache(self):
+        """切换数据目录时丢弃内存中的缩略图"""
+        self.pixmaps.clear()
+        self.overlays.clear()
+        self.failed.clear()
+        self.set_items([])
+
+    def item(self, row: int) -> Hashable:
+        return self.items[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return self.caption(item)
+        if role == Qt.ToolTipRole:
+            return self.caption(item)
+        if role == Qt.DecorationRole:
+            return self.pixmap(item)
+        if role == Qt.BackgroundRole and self.background:
+            return self.background(item)
+        return None
+
+    def pixmap(self, item: Hashable) -> Optional[QPixmap]:
+        """内存中或磁盘缓存中的缩略图，都没有时记入待生成列表"""
+        pixmap = self.pixmaps.get(item)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(item)
+            return pixmap
+        if item in self.failed:
+            return None
+        data = self.lookup(item)
+        if data is None:
+            if item not in self.wanted:
+                self.wanted[item] = None
+                self.wanted_timer.start(30)
+            return None
+        return self.store_pixmap(item, data)
+
+    def store_pixmap(self, item: Hashable, data: bytes) -> Optional[QPixmap]:
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            return None
+        self.pixmaps[item] = pixmap
+        while len(self.pixmaps) > MAX_PIXMAPS:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def emit_wanted(self):
+        """最近请求的排在最前，使当前可见的单元格优先生成"""
+        items = list(reversed(self.wanted))
+        self.wanted.clear()
+        if items:
+            self.thumbnails_wanted.emit(items)
+
+    def set_thumbnail(self, item: Hashable, data: Optional[bytes]):
+        """生成线程填回缩略图"""
+        if data is None:
+            self.failed.add(item)
+            return
+        self.store_pixmap(item, data)
+        row = self.rows.get(item)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def overlay_for(self, item: Hashable) -> Overlay:
+        """叠加框，按条目缓存，refresh() 时失效"""
+        overlay = self.overlays.get(item)
+        if overlay is None:
+            overlay = self.overlays[item] = self.overlay(item)
+            while len(self.overlays) > MAX_PIXMAPS:
+                self.overlays.popitem(last=False)
+        return overlay
+
+    def refresh(self, item: Hashable):
+        """条目的标注或状态变化后重绘"""
+        self.overlays.pop(item, None)
+        row = self.rows.get(item)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    """绘制缩略图、叠加的标注框和文件名"""
+
+    def __init__(self, model: ThumbnailModel, cell_size: int, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.cell_size = cell_size
+
+    def sizeHint(self, option, index) -> QSize:
+        return QSize(self.cell_size + CELL_PADDING, self.cell_size + CAPTION_HEIGHT + CELL_PADDING)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(2, 2, -2, -2)
+        background = index.data(Qt.BackgroundRole)
+        if background is not None:
+            painter.fillRect(rect, background)
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, option.palette.highlight())
+
+        image_rect = QRectF(rect.x(), rect.y(), rect.width(), rect.height() - CAPTION_HEIGHT)
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is not None:
+            scale = min(image_rect.width() / pixmap.width(), image_rect.height() / pixmap.height())
+            w, h = pixmap.width() * scale, pixmap.height() * scale
+            target = QRectF(image_rect.center().x() - w / 2, image_rect.center().y() - h / 2, w, h)
+            painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+            if self.model.overlay:
+                for (x, y, bw, bh), color in self.model.overlay_for(self.model.item(index.row())):
+                    painter.setPen(QPen(color, 1))
+                    painter.drawRect(QRectF(target.x() + (x - bw / 2) * w, target.y() + (y - bh / 2) * h,
+                                            bw * w, bh * h))
+        else:
+            painter.setPen(option.palette.mid().color())
+            painter.drawRect(image_rect.adjusted(4, 4, -4, -4))
+
+        painter.setPen(option.palette.highlightedText().color() if option.state & QStyle.State_Selected
+                       else option.palette.text().color())
+        caption_rect = QRectF(rect.x(), rect.bottom() - CAPTION_HEIGHT, rect.width(), CAPTION_HEIGHT)
+        text = option.fontMetrics.elidedText(index.data(Qt.DisplayRole), Qt.ElideMiddle, rect.width())
+        painter.drawText(caption_rect, Qt.AlignCenter, text)
+        painter.restore()
+
+
+class ThumbnailGrid(QListView):
+    """虚拟化的缩略图网格：单元格尺寸固定，只绘制可见的单元格"""
+    item_activated = Signal(object)  # 被点击的条目
+
+    def __init__(self, model: ThumbnailModel, cell_size: int, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(2000)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setModel(model)
+        self.delegate = ThumbnailDelegate(model, cell_size, self)
+        self.setItemDelegate(self.delegate)
+        self.setGridSize(self.delegate.sizeHint(None, None))
+        self.clicked.connect(lambda index: self.item_activated.emit(model.item(index.row())))
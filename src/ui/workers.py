@@ -1,60 +1,454 @@
 from PySide6.QtCore import QThread, Signal
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from core.annotation import AnnotationFile
 from core.checker import AnnotationChecker
+from core.rules import issue_counts
+from core.class_index import ClassIndex
+from core.statistics import DatasetStats
+from core.file_cache import FileCache, cache_path_for
+from core.image_hash import compute_hashes_parallel, find_duplicate_groups
+from core.integrity import scan_images, CACHE_FILE_NAME
+from core.thumbnails import thumbnail_job
+from core.packed_store import PackedLabelStore
+from core.temporal import scan_sequences, DEFAULT_IOU_THRESHOLD
+from core.autofix import plan_fixes, apply_fixes
+from core.remap import remap_files, write_labels
+from core.converter import export_coco, import_coco, import_voc, staged_import
+from core.profiling import traced, span
+from core.daemon import DaemonClient
 
 
 class CheckWorker(QThread):
-    """标注检查工作线程"""
-    progress = Signal(int, str, str, str)  # row, status, details, color
-    finished = Signal()
+    """标注检查工作线程
+
+    每次检查带有一个代号(generation)，所有信号都附带该代号，
+    界面据此丢弃已被新检查取代的旧结果。类别索引由界面和新的检查共用，
+    停止后不再写入(与 stop 使用同一把锁)，已取消的检查不会覆盖新数据。
+    """
+    progress = Signal(int, int, object)  # generation, row, {rule_name: count}
+    stats_ready = Signal(int, object)  # generation, DatasetStats
+    check_finished = Signal(int)  # generation
 
     def __init__(self, image_files: List[str], annotation_files: Dict[str, str],
-                 checker: AnnotationChecker):
+                 checker: AnnotationChecker,
+                 label_store: Optional[PackedLabelStore] = None,
+                 generation: int = 0,
+                 class_index: Optional[ClassIndex] = None):
         super().__init__()
         self.image_files = image_files
         self.annotation_files = annotation_files
         self.checker = checker
+        self.label_store = label_store
+        self.generation = generation
+        self.class_index = class_index
+        self.stats = DatasetStats()
+        self._running = True
+        self._priority: List[int] = []  # 优先检查的行，倒序存放以便从末尾取出
+        self._priority_lock = threading.Lock()
+        # 与界面线程共用类别索引的锁，界面保存或修复文件时不会与检查线程同时写入
+        self._index_lock = class_index.lock if class_index is not None else threading.Lock()
+
+    def stop(self):
+        """停止检查，返回后线程不会再写入类别索引"""
+        with self._index_lock:
+            self._running = False
+
+    def set_priority_rows(self, rows: Iterable[int]):
+        """设置优先检查的行(当前预览和可见的行)，可在界面线程中随时调用"""
+        with self._priority_lock:
+            self._priority = list(rows)[::-1]
+
+    def take_priority_row(self, checked: bytearray) -> Optional[int]:
+        """取出下一个尚未检查的优先行"""
+        with self._priority_lock:
+            while self._priority:
+                row = self._priority.pop()
+                if 0 <= row < len(checked) and not checked[row]:
+                    return row
+        return None
+
+    @traced("CheckWorker.run")
+    def run(self):
+        """执行检查任务，优先检查界面提示的行，其余按顺序检查"""
+        image_files = sorted(self.image_files)
+        checked = bytearray(len(image_files))
+        cursor = 0
+        while self._running:
+            row = self.take_priority_row(checked)
+            if row is None:
+                while cursor < len(image_files) and checked[cursor]:
+                    cursor += 1
+                if cursor >= len(image_files):
+                    break
+                row = cursor
+            checked[row] = 1
+            self.check_row(row, image_files[row])
+
+        if self._running:
+            self.stats_ready.emit(self.generation, self.stats)
+        self.check_finished.emit(self.generation)
+
+    def check_row(self, row: int, image_path: str):
+        """检查单个文件并发送结果"""
+        image_name = Path(image_path).stem
+        anno_path = self.annotation_files[image_name]
+
+        # 加载标注文件，有打包标注库时直接使用内存映射数据
+        annotation = (self.label_store.annotation(image_name, anno_path)
+                      if self.label_store is not None else None)
+        if annotation is None:
+            annotation = AnnotationFile(anno_path)
+
+        # 检查标注，规则共享同一份列式数据
+        context = self.checker.make_context(annotation)
+        issues = self.checker.check_context(context)
+
+        # 顺带累加统计信息并记录各文件的类别，避免再次读取数据集
+        self.stats.add(annotation, context.iou)
+        self.stats.add_issues(issues)
+        if self.class_index is not None:
+            with self._index_lock:
+                if self._running:
+                    self.class_index.update(row, context.class_ids, context.xywh)
+
+        # 发送进度信号
+        with span("CheckWorker.emit"):
+            self.progress.emit(self.generation, row, issue_counts(issues))
+
+
+class DuplicateWorker(QThread):
+    """近似重复图片查找线程"""
+    progress = Signal(int, int)  # done, total
+    groups_ready = Signal(object)  # List[List[str]]
+
+    def __init__(self, image_files: List[str], directory: str, max_distance: int):
+        super().__init__()
+        self.image_files = image_files
+        self.directory = directory
+        self.max_distance = max_distance
+        self._running = True
+
+    def stop(self):
+        """停止查找"""
+        self._running = False
+
+    def run(self):
+        """计算哈希并分组"""
+        cache = FileCache(cache_path_for(self.directory, "image_hashes.json"))
+        hashes = compute_hashes_parallel(
+            self.image_files, cache,
+            progress=self.progress.emit,
+            should_stop=lambda: not self._running
+        )
+        if self._running:
+            self.groups_ready.emit(find_duplicate_groups(hashes, self.max_distance))
+
+
+class IntegrityWorker(QThread):
+    """图片完整性扫描线程，结果按文件修改时间和大小缓存"""
+    progress = Signal(int, int)  # done, total
+    problems_ready = Signal(object)  # {图片路径: 问题类型}
+
+    def __init__(self, image_files: List[str], directory: str):
+        super().__init__()
+        self.image_files = image_files
+        self.directory = directory
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    @traced("IntegrityWorker.run")
+    def run(self):
+        cache = FileCache(cache_path_for(self.directory, CACHE_FILE_NAME))
+        problems = scan_images(self.image_files, cache, progress=self.progress.emit,
+                               should_stop=lambda: not self._running)
+        if self._running:
+            self.problems_ready.emit(problems)
+
+
+class ThumbnailWorker(QThread):
+    """缩略图生成线程：在进程池中降采样解码，写入缓存后逐个发回；最新的请求优先处理"""
+    thumbnail_ready = Signal(object, object)  # 条目, 缩略图数据(无法生成时为 None)
+    MAX_QUEUE = 2000
+    SAVE_INTERVAL = 5.0  # 缓存索引的保存间隔(秒)
+
+    def __init__(self, store, job: Callable = thumbnail_job, max_workers: Optional[int] = None):
+        super().__init__()
+        self.store = store
+        self.job = job  # (路径, ...) -> (条目名, 签名, 内容哈希, 数据)
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.queue: Dict = {}  # 条目 -> 任务参数，按请求先后排列
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self._running = True
+
+    def request(self, jobs: List[Tuple]):
+        """加入一批 (条目, 路径, ...) 请求，排在已有请求之前"""
+        with self.lock:
+            queue = {job[0]: job[1:] for job in jobs}
+            for item, args in self.queue.items():
+                if item not in queue and len(queue) < self.MAX_QUEUE:
+                    queue[item] = args
+            self.queue = queue
+        self.wakeup.set()
+
+    def take(self, count: int) -> List[Tuple]:
+        with self.lock:
+            batch = list(islice(self.queue.items(), count))
+            for item, _ in batch:
+                del self.queue[item]
+            if not self.queue:
+                self.wakeup.clear()
+        return batch
+
+    def stop(self):
+        self._running = False
+        self.wakeup.set()
+
+    @traced("ThumbnailWorker.run")
+    def run(self):
+        last_save = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            while self._running:
+                self.wakeup.wait(self.SAVE_INTERVAL)
+                batch = self.take(self.max_workers * 2)
+                futures = [(item, executor.submit(self.job, *args)) for item, args in batch]
+                for item, future in futures:
+                    if not self._running:
+                        future.cancel()
+                        continue
+                    name, signature, key, data = future.result()
+                    if data is not None:
+                        self.store.put(name, signature, key, data)
+                    self.thumbnail_ready.emit(item, data)
+                if time.monotonic() - last_save > self.SAVE_INTERVAL:
+                    self.store.save()
+                    last_save = time.monotonic()
+        self.store.save()
+
+
+class GalleryWorker(QThread):
+    """收集指定类别的全部标注框，供类别画廊显示；有打包标注库时直接使用内存映射数据"""
+    progress = Signal(int, int)  # done, total
+    boxes_ready = Signal(object)  # [(行, 框下标, (x, y, w, h)), ...]
+
+    def __init__(self, rows: List[int], image_files: List[str], annotation_files: Dict[str, str],
+                 class_id: int, label_store: Optional[PackedLabelStore] = None):
+        super().__init__()
+        self.rows = rows
+        self.image_files = image_files
+        self.annotation_files = annotation_files
+        self.class_id = class_id
+        self.label_store = label_store
         self._running = True
 
     def stop(self):
-        """停止检查"""
         self._running = False
 
+    @traced("GalleryWorker.run")
     def run(self):
-        """执行检查任务"""
-        for row, image_path in enumerate(sorted(self.image_files)):
+        boxes = []
+        for done, row in enumerate(self.rows, 1):
             if not self._running:
-                break
+                return
+            name = Path(self.image_files[row]).stem
+            arrays = self.label_store.get(name) if self.label_store is not None else None
+            if arrays is None:
+                arrays = AnnotationFile(self.annotation_files[name]).to_arrays()
+            class_ids, xywh = arrays
+            for i in (class_ids == self.class_id).nonzero()[0].tolist():
+                boxes.append((row, i, tuple(xywh[i].tolist())))
+            if done % 1000 == 0:
+                self.progress.emit(done, len(self.rows))
+        self.boxes_ready.emit(boxes)
 
-            image_name = Path(image_path).stem
-            anno_path = self.annotation_files[image_name]
 
-            # 加载标注文件
-            annotation = AnnotationFile(anno_path)
+class TemporalWorker(QThread):
+    """视频帧序列的时序一致性检查线程，逐帧读取标注，只保留相邻的三帧"""
+    progress = Signal(int, int)  # done, total
+    issues_ready = Signal(object)  # List[TemporalIssues]
+
+    def __init__(self, image_files: List[str], annotation_files: Dict[str, str],
+                 label_store: Optional[PackedLabelStore] = None,
+                 threshold: float = DEFAULT_IOU_THRESHOLD):
+        super().__init__()
+        self.image_files = image_files
+        self.annotation_files = annotation_files
+        self.label_store = label_store
+        self.threshold = threshold
+        self._running = True
+        self._loaded = 0
+
+    def stop(self):
+        """停止检查"""
+        self._running = False
+
+    def load(self, index: int):
+        """读取一帧的 (class_ids, xywh)，有打包标注库时直接使用内存映射数据"""
+        self._loaded += 1
+        if self._loaded % 1000 == 0:
+            self.progress.emit(self._loaded, len(self.image_files))
+        name = Path(self.image_files[index]).stem
+        arrays = self.label_store.get(name) if self.label_store is not None else None
+        if arrays is None:
+            arrays = AnnotationFile(self.annotation_files[name]).to_arrays()
+        return arrays
+
+    @traced("TemporalWorker.run")
+    def run(self):
+        issues = list(scan_sequences(self.image_files, self.load, self.threshold,
+                                     should_stop=lambda: not self._running))
+        if self._running:
+            self.issues_ready.emit(issues)
+
+
+class AutoFixWorker(QThread):
+    """批量修复线程：未给出修复计划时在进程池中试运行生成计划，否则应用计划"""
+    progress = Signal(int, int)  # done, total
+    plan_ready = Signal(object)  # List[FileFix]
+    fixes_applied = Signal(object, object)  # 已应用, 跳过
+
+    def __init__(self, paths: List[str], ops: List[str], iou_threshold: float,
+                 fixes: Optional[list] = None):
+        super().__init__()
+        self.paths = paths
+        self.ops = ops
+        self.iou_threshold = iou_threshold
+        self.fixes = fixes
+        self._running = True
+
+    def stop(self):
+        """停止试运行(应用修改时不可中断)"""
+        self._running = False
+
+    @traced("AutoFixWorker.run")
+    def run(self):
+        if self.fixes is not None:
+            applied, skipped = apply_fixes(self.fixes, progress=self.progress.emit)
+            self.fixes_applied.emit(applied, skipped)
+            return
+        fixes = plan_fixes(self.paths, self.ops, self.iou_threshold,
+                           progress=self.progress.emit,
+                           should_stop=lambda: not self._running)
+        if self._running:
+            self.plan_ready.emit(fixes)
+
+
+class RemapWorker(QThread):
+    """类别重映射线程，在进程池中改写标注文件，全部完成后改写类别文件
+
+    开始后不可中断，关闭窗口时等待其完成，标注文件与类别文件始终一致。
+    """
+    progress = Signal(int, int)  # done, total
+    remapped = Signal(object)  # [(路径, 修改的框数, 删除的框数, 未处理的行数, 无法解析的行数)]
+    failed = Signal(str)
+
+    def __init__(self, paths: List[str], mapping: Dict[int, int], labels_path: str,
+                 new_names: List[str]):
+        super().__init__()
+        self.paths = paths
+        self.mapping = mapping
+        self.labels_path = labels_path
+        self.new_names = new_names
+
+    @traced("RemapWorker.run")
+    def run(self):
+        results = remap_files(self.paths, self.mapping, progress=self.progress.emit)
+        try:
+            write_labels(self.labels_path, self.new_names)
+        except OSError as e:
+            self.failed.emit(str(e))
+            return
+        self.remapped.emit(results)
+
+
+class ConvertWorker(QThread):
+    """格式转换线程：导出 COCO JSON，或将 COCO JSON / VOC 目录导入为 YOLO 标注"""
+    EXPORT_COCO = 'export_coco'
+    IMPORT_COCO = 'import_coco'
+    IMPORT_VOC = 'import_voc'
+
+    progress = Signal(int, int)  # done, total
+    converted = Signal(object)  # 导出结果或导入的 (结果, 备份目录)，被中断时为 None
+    failed = Signal(str)
+
+    def __init__(self, mode: str, source, output: str, label_names: Optional[List[str]] = None):
+        super().__init__()
+        self.mode = mode
+        self.source = source  # 导出时为 (图片列表, 标注文件字典)，导入时为源文件或目录
+        self.output = output
+        self.label_names = label_names
+        self._running = True
 
-            # 检查标注
-            issues = self.checker.check_annotation(annotation)
+    def stop(self):
+        self._running = False
 
-            # 发送进度信号
-            if not any(issues.values()):
-                self.progress.emit(row, "正常", "", "#FFFFFF")
+    @traced("ConvertWorker.run")
+    def run(self):
+        options = dict(progress=self.progress.emit, should_stop=lambda: not self._running)
+        try:
+            if self.mode == self.EXPORT_COCO:
+                result = export_coco(*self.source, self.output, self.label_names, **options)
+            elif self.mode == self.IMPORT_COCO:
+                result = staged_import(
+                    lambda staging: import_coco(self.source, staging, **options), self.output)
             else:
-                details = []
-                if issues['overlaps']:
-                    details.append(f"发现 {len(issues['overlaps'])} 处重叠")
-                    self.progress.emit(
-                        row, "重叠问题",
-                        "; ".join(details),
-                        "#FFD0D0"
-                    )
-                if issues['invalid_labels']:
-                    details.append(f"发现 {len(issues['invalid_labels'])} 个无效标签")
-                    self.progress.emit(
-                        row, "标签问题",
-                        "; ".join(details),
-                        "#FFFFD0"
-                    )
-
-        self.finished.emit()
+                result = staged_import(
+                    lambda staging: import_voc(self.source, staging, self.label_names, **options),
+                    self.output)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.converted.emit(result)
+
+
+class StoreBuildWorker(QThread):
+    """打包标注库构建线程"""
+    progress = Signal(int, int)  # done, total
+    store_ready = Signal(object)  # PackedLabelStore
+
+    def __init__(self, annotation_files: Dict[str, str], store_path: str):
+        super().__init__()
+        self.annotation_files = dict(annotation_files)
+        self.store_path = store_path
+        self._running = True
+
+    def stop(self):
+        """停止构建"""
+        self._running = False
+
+    def run(self):
+        """读取所有标注文件并写入打包库"""
+        store = PackedLabelStore.build(self.annotation_files, self.store_path,
+                                       progress=self.progress.emit,
+                                       should_stop=lambda: not self._running)
+        if store is not None:
+            self.store_ready.emit(store)
+
+
+class DaemonLoadWorker(QThread):
+    """从检查服务获取文件列表和检查结果(可先请求重新检查)"""
+    files_ready = Signal(object)  # /files 的返回结果
+    failed = Signal(str)
+
+    def __init__(self, client: DaemonClient, check: bool = False,
+                 threshold: Optional[float] = None):
+        super().__init__()
+        self.client = client
+        self.check = check
+        self.threshold = threshold
+
+    def run(self):
+        try:
+            if self.check:
+                self.client.check(self.threshold)
+            self.files_ready.emit(self.client.files())
+        except Exception as e:
+            self.failed.emit(str(e))